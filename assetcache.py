@@ -0,0 +1,145 @@
+# description: one cache for the images the scenes load (sounds have their own,
+# see soundbank.py). a file is decoded and converted once for each way it's used
+# (convert mode, scale and colorkey) and shared by every scene asking for it.
+# game.py tells the cache which scene is loading, so each image knows the scenes
+# using it and the ones no scene on the stack uses anymore can be let go after a
+# scene change.
+
+import os
+import threading
+from contextlib import contextmanager
+
+import pygame
+
+# cached images by key, ("image", path, alpha, scale, colorkey)
+_assets: dict[tuple, pygame.Surface] = {}
+_sizes: dict[tuple, int] = {}  # bytes per key
+_owners: dict[tuple, set] = {}  # the scene names using each key
+# scenes preloading in the background load images while the main thread loads
+# and releases its own
+_lock = threading.RLock()
+
+# the scene name loads are counted against, per thread as scenes can be
+# preloaded in the background. an image loaded while no scene is loading stays
+# cached
+_local = threading.local()
+
+hits = 0
+misses = 0
+
+
+@contextmanager
+def loading(name: str):
+    """Count everything loaded inside the block on this thread against a scene"""
+    previous = getattr(_local, "owner", None)
+    _local.owner = name
+    try:
+        yield
+    finally:
+        _local.owner = previous
+
+
+def _claim(key: tuple):
+    owners = _owners.setdefault(key, set())
+    owners.add(getattr(_local, "owner", None))
+
+
+def image(
+    path: str,
+    alpha: bool | None = None,
+    scale: float = 1,
+    colorkey: tuple | int | None = None,
+) -> pygame.Surface:
+    """Load an image, converted for the screen. The surface is shared with every
+    other caller loading it the same way, copy() it before changing it
+    (set_alpha, drawing on it and so on).
+
+    Args:
+        path (str): Path to the image, from the game's folder
+        alpha (bool | None, optional): convert_alpha() when True, convert() when False. Defaults to None, whichever suits the file.
+        scale (float, optional): Scale the image by this much. Defaults to 1.
+        colorkey (tuple | int | None, optional): The transparent color, -1 for the top left pixel. Defaults to None.
+
+    Returns:
+        pygame.Surface: the image
+    """
+    global hits, misses
+
+    key = ("image", path, alpha, scale, colorkey)
+    with _lock:
+        surface = _assets.get(key)
+        if surface is not None:
+            hits += 1
+            _claim(key)
+            return surface
+
+        misses += 1
+
+    # decode outside the lock so a preload doesn't hold up the main thread
+    surface = pygame.image.load(path)
+
+    if alpha or (alpha is None and surface.get_alpha() is not None):
+        surface = surface.convert_alpha()
+    else:
+        surface = surface.convert()
+
+    if colorkey is not None:
+        if colorkey == -1:
+            colorkey = surface.get_at((0, 0))
+        surface.set_colorkey(colorkey)
+
+    if scale != 1:
+        surface = pygame.transform.scale(
+            surface,
+            (int(surface.get_width() * scale), int(surface.get_height() * scale)),
+        )
+
+    with _lock:
+        # another thread may have loaded it meanwhile, everyone shares the first
+        surface = _assets.setdefault(key, surface)
+        _sizes[key] = surface.get_pitch() * surface.get_height()
+        _claim(key)
+        return surface
+
+
+def images(path: str, **kwargs) -> list[pygame.Surface]:
+    """Every image in a folder in name order, loaded like image()"""
+    path = path.rstrip("/")
+
+    # sorted for the same order on every os
+    return [image(path + "/" + name, **kwargs) for name in sorted(os.listdir(path))]
+
+
+def release(keep) -> int:
+    """Forget the scenes not in keep and drop every asset only they used. Scenes
+    still holding one keep it alive, it just isn't shared anymore.
+
+    Args:
+        keep (Iterable[str]): The names of the scenes still loaded
+
+    Returns:
+        int: the number of assets dropped
+    """
+    keep = set(keep)
+    keep.add(None)
+    dropped = 0
+
+    with _lock:
+        for key in list(_owners):
+            owners = _owners[key]
+            owners &= keep
+            if not owners:
+                del _owners[key], _assets[key], _sizes[key]
+                dropped += 1
+
+    return dropped
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "hits": hits,
+            "misses": misses,
+            "images": len(_assets),
+            "bytes": sum(_sizes.values()),
+        }
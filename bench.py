@@ -0,0 +1,199 @@
+# description: headless benchmark for the scenes, run with `python main.py bench`.
+# boots the game on sdl's dummy video and audio drivers, drives each scene for a
+# number of frames with scripted key presses and reports update and draw times
+# and allocations per scene, as a table and optionally as json.
+
+import contextlib
+import io
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+# scenes that only make sense on top of another
+SKIP = ["Console", "Debug"]
+
+# keys pressed at random while a scene runs, escape and ` are left out so the
+# scenes don't quit or open the console under the benchmark
+KEYS = [
+    "K_LEFT",
+    "K_RIGHT",
+    "K_UP",
+    "K_DOWN",
+    "K_SPACE",
+    "K_RETURN",
+    "K_z",
+    "K_x",
+    "K_a",
+    "K_d",
+    "K_w",
+    "K_s",
+]
+
+
+def resident_mb() -> float | None:
+    """The memory the process holds right now, None where we can't tell"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        pass
+
+    # the most it has held, in kb on linux and bytes on mac
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def scene_names() -> list[str]:
+    import scenes
+
+    return [name for name in sorted(scenes.SCENES) if name not in SKIP]
+
+
+def press_keys(pygame, rng: random.Random, held: set):
+    """Post a random key down or up as if a player were mashing"""
+    if held and rng.random() < 0.5:
+        key = held.pop()
+        pygame.event.post(pygame.event.Event(pygame.KEYUP, key=key, mod=0))
+    else:
+        key = getattr(pygame, rng.choice(KEYS))
+        held.add(key)
+        pygame.event.post(
+            pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode="", scancode=0)
+        )
+
+
+def bench_scene(game, pygame, name: str, frames: int, seed: int) -> dict:
+    result = {"scene": name, "frames": frames}
+    rng = random.Random(seed)
+    held = set()
+
+    start = time.perf_counter()
+    game.scene = [game.load_scene(name)]
+    result["load_ms"] = (time.perf_counter() - start) * 1000
+
+    game.profiler.reset()
+    blocks = sys.getallocatedblocks()
+
+    for _ in range(frames):
+        if game.quit:
+            break
+        press_keys(pygame, rng, held)
+        game.step()
+
+    result["blocks_per_frame"] = (sys.getallocatedblocks() - blocks) / frames
+
+    # a key press can move a title scene on to the next, so count the frames
+    # the scene itself actually ran
+    result["frames"] = game.profiler.percentiles(f"update:{name}").get("frames", 0)
+
+    for phase in ["update", "draw"]:
+        stats = game.profiler.percentiles(f"{phase}:{name}")
+        result[f"{phase}_mean_ms"] = stats.get("mean", 0)
+        result[f"{phase}_p99_ms"] = stats.get("p99", 0)
+
+    stats = game.profiler.percentiles("frame")
+    result["frame_mean_ms"] = stats.get("mean", 0)
+    result["frame_p99_ms"] = stats.get("p99", 0)
+
+    # a short second run under tracemalloc for the memory the scene allocates,
+    # kept apart as tracing slows everything down
+    tracemalloc.start()
+    for _ in range(min(frames, 30)):
+        if game.quit:
+            break
+        press_keys(pygame, rng, held)
+        game.step()
+    result["alloc_peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+
+    for scene in game.scene:
+        with contextlib.suppress(Exception):
+            scene.quit()
+
+    return result
+
+
+def run(frames: int = 300, names: list[str] | None = None, seed: int = 0) -> dict:
+    """Benchmark scenes headless.
+
+    Args:
+        frames (int, optional): Frames to run each scene for. Defaults to 300.
+        names (list[str] | None, optional): The scenes to run. Defaults to every registered scene.
+        seed (int, optional): Seed for the scripted key presses. Defaults to 0.
+
+    Returns:
+        dict: the machine the benchmark ran on and a result per scene
+    """
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+    # keep the game's logging out of the report
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        # startup counts importing the scenes as well as building the game
+        start = time.perf_counter()
+        import pygame
+        from game import Game
+
+        game = Game()
+        startup_ms = (time.perf_counter() - start) * 1000
+        startup_mb = resident_mb()
+
+        results = []
+        for name in names or scene_names():
+            try:
+                results.append(bench_scene(game, pygame, name, frames, seed))
+            except Exception as e:
+                results.append({"scene": name, "error": repr(e)})
+            game.quit = False
+
+        sound_stats = game.sfx.stats()
+        resident = resident_mb()
+        pygame.quit()
+
+    import assetcache
+    import textrender
+
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "startup_ms": startup_ms,
+        "startup_mb": startup_mb,
+        "resident_mb": resident,
+        "text_cache": textrender.stats(),
+        "asset_cache": assetcache.stats(),
+        "sounds": sound_stats,
+        "scenes": results,
+    }
+
+
+def print_report(report: dict):
+    print(f"python {report['python']}, pygame {report['pygame']}, {report['platform']}")
+    startup = f"startup {report['startup_ms']:.1f} ms"
+    if report["startup_mb"] is not None:
+        startup += f", {report['startup_mb']:.1f} mb resident"
+        startup += f" ({report['resident_mb']:.1f} mb after the scenes)"
+    print(startup + "\n")
+    print(
+        f"{'scene':<24}{'load':>8}{'update':>8}{'p99':>8}{'draw':>8}{'p99':>8}"
+        f"{'frame':>8}{'p99':>8}{'alloc kb':>10}"
+    )
+
+    for r in report["scenes"]:
+        if "error" in r:
+            print(f"{r['scene']:<24} error: {r['error']}")
+            continue
+
+        print(
+            f"{r['scene']:<24}{r['load_ms']:>8.1f}{r['update_mean_ms']:>8.2f}"
+            f"{r['update_p99_ms']:>8.2f}{r['draw_mean_ms']:>8.2f}{r['draw_p99_ms']:>8.2f}"
+            f"{r['frame_mean_ms']:>8.2f}{r['frame_p99_ms']:>8.2f}{r['alloc_peak_kb']:>10.1f}"
+        )
@@ -37,7 +37,8 @@ echo ------------------------------------------------------
 timeout /t 1 /nobreak
 
 REM make the new dist folder
-pyinstaller --onefile --noconsole --name=JackGamesMulticart main.py
+REM the scenes are imported by name when first loaded, collect them all
+pyinstaller --onefile --noconsole --collect-submodules scenes --name=JackGamesMulticart main.py
 
 echo ------------------------------------------------------
 echo Build complete, packaging up assets
@@ -1,5 +1,5 @@
 import pygame
-import os
+import assetcache
 
 
 class Animation(pygame.sprite.Sprite):
@@ -47,20 +47,9 @@ class Animation(pygame.sprite.Sprite):
         self.done = False
         self.image = self.images[0]
 
-    # load a single image
-    def __load_image(self, path) -> pygame.Surface:
-        img = pygame.image.load(path).convert_alpha()
-        return img
-
-    # load all images in a directory
+    # load all images in a directory, shared with any other animation of the folder
     def load_images(self, path) -> list[pygame.Surface]:
-        images = []
-
-        for img_name in sorted(os.listdir(path)):
-            # sorted is used for OS interoperability
-            images.append(self.__load_image(path + "/" + img_name))
-
-        return images
+        return assetcache.images(path, alpha=True)
 
     def draw(self, surface: pygame.Surface):
         surface.blit(self.image, self.rect)
@@ -1,18 +1,13 @@
 import pygame
 import os
+import assetcache
 
 
 class SpriteSheet:
     def __init__(self, asset_path: str, colorkey: tuple = None):
         self.asset_path = "assets/" + asset_path
-        self.sheet = pygame.image.load(self.asset_path).convert_alpha()
-        if colorkey is not None:
-            if colorkey == -1:
-                colorkey = self.sheet.get_at((0, 0))
-
-            # check if color is a tuple now
-            if type(colorkey) is tuple:
-                self.sheet.set_colorkey(colorkey)
+        # a colorkey of -1 takes the top left pixel
+        self.sheet = assetcache.image(self.asset_path, alpha=True, colorkey=colorkey)
 
     def get_at(self, x, y, width, height):
         return self.sheet.subsurface(x, y, width, height)
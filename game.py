@@ -1,13 +1,17 @@
 import os
 import pygame
 import settings
+import assetcache
 from scene import Scene
 import scenes
 import sys
 import asyncio
+import threading
 import configparser
 import time
 from gamecontrollerdb import GameController, mappings_by_guid
+from profiler import Profiler
+from soundbank import SoundBank
 
 
 class InputAction:
@@ -20,6 +24,27 @@ class InputAction:
         self.axis = 0.0  # For analog values (-1.0 to 1.0)
 
 
+class PreloadedScene:
+    """A scene being built on a background thread, see Game.preload"""
+
+    def __init__(self, game: "Game", name: str):
+        self.name = name
+        self.scene: Scene | None = None
+        self.error: Exception | None = None
+        self.thread = threading.Thread(target=self.__build, args=(game,), daemon=True)
+        self.thread.start()
+
+    def __build(self, game: "Game"):
+        try:
+            with assetcache.loading(self.name):
+                self.scene = getattr(scenes, self.name)(game)
+        except Exception as e:
+            self.error = e
+
+    def done(self) -> bool:
+        return not self.thread.is_alive()
+
+
 class Game:
     def __init__(self):
         # initialize pygame
@@ -39,6 +64,11 @@ class Game:
         self.debug_scene = None
         self.console = None
 
+        # scenes being built in the background and the one a scene change is
+        # waiting on, see preload
+        self.preloads: dict[str, PreloadedScene] = {}
+        self.loading: str | None = None
+
         # hardcode some default values
 
         self.WIDTH = settings.RESOLUTION[0]
@@ -63,7 +93,7 @@ class Game:
         self.just_released = []
         self.just_mouse_down = []
         self.just_mouse_up = []
-        self.sfx = {}
+        self.sfx: SoundBank | None = None
         self.volume_music = self.__DEFAULT_VOLUME
         self.volume_effects = self.__DEFAULT_VOLUME
         self.winner = None
@@ -77,6 +107,9 @@ class Game:
         self.__perf_results = [0] * 640
         self.__perf_surface = pygame.Surface((640, 360))
 
+        # named timing spans for the parts of each frame, see profiler.py
+        self.profiler = Profiler()
+
         if settings.DEBUG:
             self.__test_performance()
 
@@ -84,15 +117,9 @@ class Game:
         self.config = configparser.ConfigParser()
         self.__load_config()
 
-        # load all sounds in assets/sounds as sound effects
-        for sound in os.listdir("assets/sounds"):
-            if (
-                sound.endswith(".wav")
-                or sound.endswith(".ogg")
-                or sound.endswith(".mp3")
-            ):
-                sound_name = sound.split(".")[0]
-                self.sfx[sound_name] = pygame.mixer.Sound("assets/sounds/" + sound)
+        # find the sounds in assets/sounds, each is decoded when it's first
+        # played or preloaded by a scene listing it in its sounds
+        self.sfx = SoundBank("assets/sounds")
 
         # create a window
         # check if browser or desktop
@@ -159,81 +186,101 @@ class Game:
         self.console = scenes.Console(self)
 
         while not self.quit:
+            self.step()
+
+            # pygbag requires this to run the game
+            await asyncio.sleep(0)
+
+            # limit the game to 60 fps
+            self.clock.tick(settings.FPS)
+
+        # quit the game
+        self.__quit()
+
+    def step(self):
+        """Run a single frame: scene changes, input, update, draw and flip.
+        Doesn't wait for the next frame so a benchmark can drive it flat out."""
+        profiler = self.profiler
 
-            # process scene change requests (if any)
+        # start the performance update
+        self.__update_performance_start()
+
+        # process scene change requests (if any)
+        with profiler.span("change_scenes"):
             self.__change_scenes()
 
-            # handle events and input
+        # handle events and input
+        with profiler.span("events"):
             self.get_events_and_input()
 
-            # check if tilde was pressed to open the console
-            if pygame.K_BACKQUOTE in self.just_pressed:
-                self.__toggle_console()
-
-            # set all scenes to inactive except the top scene in the stack
-            for scene in self.scene:
-                scene.active = False
-            self.scene[-1].active = True
-
-            # if mouse_lock then we hide and set grab true
-            # else if mouse_hide then we hide and set grab false
-            # else we show and set grab false
-
-            # check the mouse_lock property of the top scene.
-            # If it is true, lock the mouse to the window if we
-            # have focus
-
-            # check if the current scene is using mouse lock
-            if self.scene[-1].mouse_lock:
-                if pygame.mouse.get_focused():
-                    if pygame.mouse.get_visible():
-                        pygame.mouse.set_visible(False)
-                        pygame.event.set_grab(True)
-                else:
-                    if not pygame.mouse.get_visible():
-                        pygame.mouse.set_visible(True)
-                        pygame.event.set_grab(False)
+        # check if tilde was pressed to open the console
+        if pygame.K_BACKQUOTE in self.just_pressed:
+            self.__toggle_console()
+
+        # set all scenes to inactive except the top scene in the stack
+        for scene in self.scene:
+            scene.active = False
+        self.scene[-1].active = True
+
+        # if mouse_lock then we hide and set grab true
+        # else if mouse_hide then we hide and set grab false
+        # else we show and set grab false
+
+        # check the mouse_lock property of the top scene.
+        # If it is true, lock the mouse to the window if we
+        # have focus
+
+        # check if the current scene is using mouse lock
+        if self.scene[-1].mouse_lock:
+            if pygame.mouse.get_focused():
+                if pygame.mouse.get_visible():
+                    pygame.mouse.set_visible(False)
+                    pygame.event.set_grab(True)
             else:
-                # the current scene was NOT using mouse lock, check if it's using mouse hide
-                if self.scene[-1].mouse_hide:
+                if not pygame.mouse.get_visible():
+                    pygame.mouse.set_visible(True)
+                    pygame.event.set_grab(False)
+        else:
+            # the current scene was NOT using mouse lock, check if it's using mouse hide
+            if self.scene[-1].mouse_hide:
 
-                    # the current scene is using mouse hide, hide the mouse if it's visible
-                    if pygame.mouse.get_visible():
-                        pygame.mouse.set_visible(False)
-                        pygame.event.set_grab(False)
-                else:
-                    # the current scene is not using mouse lock or hide, show the mouse if it's hidden
-                    if not pygame.mouse.get_visible():
-                        pygame.mouse.set_visible(True)
-                        pygame.event.set_grab(False)
-            # process update for the top scene in the stack
+                # the current scene is using mouse hide, hide the mouse if it's visible
+                if pygame.mouse.get_visible():
+                    pygame.mouse.set_visible(False)
+                    pygame.event.set_grab(False)
+            else:
+                # the current scene is not using mouse lock or hide, show the mouse if it's hidden
+                if not pygame.mouse.get_visible():
+                    pygame.mouse.set_visible(True)
+                    pygame.event.set_grab(False)
+        # process update for the top scene in the stack
+        # anything the top scene loads while updating is counted against it
+        name = self.scene[-1].__class__.__name__
+        with profiler.span("update:" + name), assetcache.loading(name):
             self.scene[-1].update()
 
-            # draw all scenes in the stack from bottom to top
-            for scene in self.scene:
+        # draw all scenes in the stack from bottom to top
+        for scene in self.scene:
+            with profiler.span("draw:" + scene.__class__.__name__):
                 scene.draw()
 
-            # draw the debug panel
-            if settings.DEBUG:
+        # show the top scene's loading screen while waiting on a preload
+        if self.loading is not None:
+            self.scene[-1].draw_loading(self.loading)
+
+        # draw the debug panel
+        if settings.DEBUG:
+            with profiler.span("debug"):
                 self.debug_scene.update()
                 self.debug_scene.draw()
 
-            self.__update_performance_finish()
+        self.__update_performance_finish()
 
+        with profiler.span("flip"):
             pygame.display.flip()
-            self.__frame_count += 1
-
-            # pygbag requires this to run the game
-            await asyncio.sleep(0)
-
-            # limit the game to 60 fps
-            self.clock.tick(settings.FPS)
+        self.__frame_count += 1
 
-            # start the performance update
-            self.__update_performance_start()
-
-        # quit the game
-        self.__quit()
+        profiler.end_frame()
 
     def __update_performance_start(self):
 
@@ -249,6 +296,7 @@ class Game:
         self.frame_time_ms = self.frame_time_ns / 1000000
 
         self.frame_load = self.frame_time_ms / (1000 / settings.FPS) * 100
+        self.profiler.record("frame", self.__perf_start, self.frame_time_ns)
 
         self.__perf_results[self.__perf_index] = self.frame_load
 
@@ -598,7 +646,8 @@ class Game:
         update_action("cancel", kb_cancel_pressed, kb_cancel_just, ctrl_cancel_pressed, ctrl_cancel_just)
 
     def valid_scene_name(self, scene: str):
-        found: bool = scene in dir(scenes)
+        # checks the registry without importing the scene
+        found: bool = scene in scenes.SCENES
         if found:
             self.log(f"valid scene name: {scene}")
         else:
@@ -616,11 +665,65 @@ class Game:
                     f"failed to run scene's quit method: {scene.__class__.__name__}"
                 )
 
+    def __scene_requests(self) -> list[str]:
+        """The names of the scenes the pending scene changes will load"""
+        names = []
+        for request in [self.scene_replace, self.scene_push, self.scene_push_under]:
+            if isinstance(request, str):
+                names.append(request)
+            elif isinstance(request, list):
+                names += request
+        return names
+
+    def preload(self, scene: str):
+        """Start building a scene on a background thread so changing to it
+        later doesn't stall the frame. A scene change to it waits for it to
+        finish while the current scenes keep running and draw their loading
+        screen. Only scenes with preload set are built early, and there are no
+        threads in the browser, the rest are built when changed to as usual.
+
+        Args:
+            scene (str): The name of the scene to build
+        """
+        if scene in self.preloads or settings.WASM or not self.valid_scene_name(scene):
+            return
+
+        scene_class = getattr(scenes, scene)
+        if not scene_class.preload:
+            return
+
+        self.log("preload: " + scene)
+        self.sfx.preload(scene_class.sounds)
+        self.preloads[scene] = PreloadedScene(self, scene)
+
     def __change_scenes(self):
+        # hold any change to a scene that's still being preloaded until it's
+        # built, the current scenes keep running with a loading screen on top
+        self.loading = None
+        for name in self.__scene_requests():
+            preload = self.preloads.get(name)
+            if preload is not None and not preload.done():
+                self.loading = name
+                return
+
         # check for scene changes
+        changed = any(
+            request is not None
+            for request in [
+                self.scene_replace,
+                self.scene_pop,
+                self.scene_push,
+                self.scene_push_under,
+            ]
+        )
 
         # start off by looking for a replacement scene to rebuild the stack
         if self.scene_replace is not None:
+            # forget any scenes preloaded for a change that never came
+            requested = self.__scene_requests()
+            for name in list(self.preloads):
+                if name not in requested:
+                    del self.preloads[name]
 
             if type(self.scene_replace) == str:
                 self.log("scene_replace: " + self.scene_replace)
@@ -737,6 +840,13 @@ class Game:
                         )
             self.scene_push_under = None
 
+        # let go of the images and sounds only the scenes that just left used
+        if changed:
+            keep = [s.__class__.__name__ for s in self.scene] + list(self.preloads)
+            dropped = assetcache.release(keep)
+            if dropped:
+                self.log(f"released {dropped} assets")
+
     # return type is Scene
     def load_scene(self, scene: str) -> Scene:
 
@@ -755,8 +865,28 @@ class Game:
 
         # check if the string passed in matches the name of a class in the scenes module
         if self.valid_scene_name(scene):
-            # create our new scene
-            new_scene = eval("scenes." + scene + "(self)")
+            preload = self.preloads.pop(scene, None)
+            if preload is not None:
+                # scene changes wait for it, so this only blocks when a scene
+                # was preloaded and then loaded some other way
+                preload.thread.join()
+                if preload.error is not None:
+                    self.log(f"preload failed, loading {scene}: {preload.error!r}")
+
+            if preload is not None and preload.scene is not None:
+                new_scene = preload.scene
+
+                # the scene's time starts when it's entered rather than built
+                new_scene.start = time.time()
+            else:
+                # start decoding the scene's sounds while it's being built
+                self.sfx.preload(getattr(scenes, scene).sounds)
+
+                # create our new scene, the assets it loads are counted against it
+                with assetcache.loading(scene):
+                    new_scene = eval("scenes." + scene + "(self)")
+
+            new_scene.entered()
 
             # store a reference the jackwizards game scene for easy access
             if scene == "JackWizards":
@@ -765,7 +895,10 @@ class Game:
             return new_scene
         else:
             self.log("WARNING: Invalid scene name! Loading start scene!")
-            return eval("scenes." + settings.SCENE_START + "(self)")
+            with assetcache.loading(settings.SCENE_START):
+                new_scene = eval("scenes." + settings.SCENE_START + "(self)")
+            new_scene.entered()
+            return new_scene
 
     def get_scene_by_name(self, scene: str) -> Scene:
 
@@ -16,6 +16,11 @@ scene new                       Make a new scene
 scene run <scene_name>          Run the game with the specified scene
 scene list                      List all the scenes
 
+>> Benchmark Commands
+bench [frames] [scene_name ...] [--json <file>]
+                                Run scenes headless and report their frame
+                                times, optionally saving the results as json
+
 >> Sprite Commands
 dice <image.png> <width> <height> <output_folder>
 """
@@ -42,26 +47,14 @@ def scene():
 
 
 def scene_list():
-    """List all detected scenes by parsing scenes/__init__.py and scanning for unregistered ones"""
+    """List the scenes in the registry in scenes/__init__.py and scan for unregistered ones"""
     import re
+    import scenes
 
-    # Parse registered scenes from __init__.py
+    # the registry, without importing any of the scenes
     registered = {}  # class_name -> module_path
-
-    with open("scenes/__init__.py") as f:
-        for line in f:
-            # Match import patterns like:
-            # from .folder.module import ClassName
-            # from scenes.module import ClassName
-            match = re.match(
-                r"from\s+([\w.]+)\s+import\s+(\w+)", line.strip()
-            )
-            if match:
-                module_path, class_name = match.groups()
-                # Clean up module path for display
-                module_path = module_path.lstrip(".")
-                module_path = module_path.replace("scenes.", "")
-                registered[class_name] = module_path
+    for class_name, module_path in scenes.SCENES.items():
+        registered[class_name] = module_path.lstrip(".")
 
     # Scan for all scene classes in the scenes directory
     all_scenes = {}  # class_name -> (module_path, file_path)
@@ -121,7 +114,7 @@ def scene_list():
         for class_name, module_path, file_path in unregistered:
             print(f"{class_name:<{max_name_len + 2}} {file_path}")
 
-        print("\nTo register a scene, add an import to scenes/__init__.py")
+        print("\nTo register a scene, add it to SCENES in scenes/__init__.py")
     else:
         print("\nAll scenes are registered.")
 
@@ -156,13 +149,37 @@ def scene_new():
         with open(file_path, "w") as f:
             f.write(content)
 
-    # append a new import statement for the scene into scenes/__init__.py
+    # register the scene in scenes/__init__.py
     with open("scenes/__init__.py", "a") as f:
         # remove the leading scenes/ from the folder
         import_path = (
             "." + folder.replace("scenes/", "").replace("/", ".") + name.lower()
         )
-        f.write(f"\nfrom {import_path} import {name} # auto-generated")
+        f.write(f'\nSCENES["{name}"] = "{import_path}"  # auto-generated\n')
+
+
+def bench():
+    import json
+    import bench
+
+    args = sys.argv[2:]
+    json_path = None
+    if "--json" in args:
+        i = args.index("--json")
+        json_path = args[i + 1] if i + 1 < len(args) else "bench.json"
+        del args[i : i + 2]
+
+    frames = 300
+    if args and args[0].isdigit():
+        frames = int(args.pop(0))
+
+    report = bench.run(frames, args or None)
+    bench.print_report(report)
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nsaved {json_path}")
 
 
 def dice():
@@ -180,6 +197,8 @@ def main():
         help()
     elif sys.argv[1] == "scene":
         scene()
+    elif sys.argv[1] == "bench":
+        bench()
     elif sys.argv[1] == "dice":
         dice()
     else:
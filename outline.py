@@ -0,0 +1,80 @@
+# description: outlines, text strokes and drop shadows. an outline is the source's
+# mask grown by the thickness in one convolve, rather than blitting the whole
+# surface at every offset, and is kept alongside the surface it was made from so
+# sprites drawn every frame reuse it.
+
+import functools
+import weakref
+
+import pygame
+
+# outlines by source surface, then by (color, thickness, square), dropped along
+# with the surface they were made from
+_outlines: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+@functools.lru_cache(maxsize=16)
+def kernel(thickness: int, square: bool = True) -> pygame.mask.Mask:
+    """The shape a pixel grows into, a filled square or a plus sign"""
+    size = thickness * 2 + 1
+    if square:
+        return pygame.mask.Mask((size, size), fill=True)
+
+    mask = pygame.mask.Mask((size, size))
+    for i in range(size):
+        mask.set_at((i, thickness))
+        mask.set_at((thickness, i))
+    return mask
+
+
+def silhouette(
+    source: pygame.Surface, color, thickness: int = 1, square: bool = True
+) -> pygame.Surface:
+    """The shape of source in a solid color grown by thickness pixels. It's
+    thickness * 2 bigger than source, so blit it thickness pixels up and left of
+    where source goes. Cached per source surface, don't change it.
+
+    Args:
+        source (pygame.Surface): The surface to outline
+        color (tuple): The outline color
+        thickness (int, optional): The outline thickness in pixels. Defaults to 1.
+        square (bool, optional): Fill the corners diagonally. Defaults to True.
+
+    Returns:
+        pygame.Surface: the outline
+    """
+    key = (tuple(color), thickness, square)
+    cached = _outlines.get(source)
+    if cached is not None and key in cached:
+        return cached[key]
+
+    # every pixel the kernel touches when centred on an opaque pixel of source
+    grown = pygame.mask.from_surface(source).convolve(kernel(thickness, square))
+    surface = grown.to_surface(setcolor=color, unsetcolor=(0, 0, 0, 0))
+
+    _outlines.setdefault(source, {})[key] = surface
+    return surface
+
+
+@functools.lru_cache(maxsize=64)
+def drop_shadow(size: tuple[int, int], depth: int, intensity: int) -> pygame.Surface:
+    """A drop shadow for a box of the given size, as stacked translucent
+    rectangles offset 1 to depth pixels down and right. Blit it at the box's
+    position, before the box.
+
+    Args:
+        size (tuple[int, int]): The box size
+        depth (int): How far the shadow reaches
+        intensity (int): The alpha of each rectangle
+
+    Returns:
+        pygame.Surface: the shadow, depth pixels bigger than size
+    """
+    surface = pygame.Surface((size[0] + depth, size[1] + depth), pygame.SRCALPHA)
+    layer = pygame.Surface(size, pygame.SRCALPHA)
+    layer.fill((0, 0, 0, intensity))
+
+    for i in range(1, depth + 1):
+        surface.blit(layer, (i, i))
+
+    return surface
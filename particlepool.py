@@ -0,0 +1,133 @@
+# description: a pool of simple particles for any scene. positions, velocities
+# and alphas live in numpy arrays and are updated for every particle at once,
+# each particle is drawn with one of a set of tiles made up front (one per kind,
+# in a few alpha levels each) and the lot go to the screen in one fblits call,
+# so spawning a burst or fading particles out never makes or changes a surface.
+
+import numpy as np
+import pygame
+
+ALPHA_LEVELS = 32  # alpha steps each tile is made in, 8 apart
+
+
+class ParticlePool:
+    """Particles that drift and fade out, drawn from prepared tiles.
+
+    Args:
+        tiles (list[pygame.Surface]): The image for each kind of particle, a particle's kind indexes into this.
+        capacity (int, optional): Particles to make room for up front, the pool grows past this if it has to. Defaults to 1024.
+        gravity (float, optional): Added to every particle's vertical speed each update. Defaults to 0.
+    """
+
+    def __init__(
+        self, tiles: list[pygame.Surface], capacity: int = 1024, gravity: float = 0
+    ):
+        self.gravity = gravity
+        self.count = 0
+
+        # every kind's tile at every alpha level, tile n of kind k at
+        # k * ALPHA_LEVELS + n
+        self.tiles = []
+        for tile in tiles:
+            for level in range(ALPHA_LEVELS):
+                faded = tile.copy()
+                faded.set_alpha(level * 256 // ALPHA_LEVELS + 256 // ALPHA_LEVELS // 2)
+                self.tiles.append(faded)
+
+        self.allocate(capacity)
+
+    @classmethod
+    def squares(cls, colors: list, size: int, **kwargs) -> "ParticlePool":
+        """A pool of solid squares, one kind per color"""
+        tiles = []
+        for color in colors:
+            tile = pygame.Surface((size, size)).convert()
+            tile.fill(color)
+            tiles.append(tile)
+        return cls(tiles, **kwargs)
+
+    def allocate(self, capacity: int):
+        """Make room for capacity particles, keeping the ones there are"""
+        n = self.count
+        previous = getattr(self, "positions", None)
+
+        positions = np.zeros((capacity, 2), np.float32)
+        velocities = np.zeros((capacity, 2), np.float32)
+        alphas = np.zeros(capacity, np.float32)
+        fades = np.zeros(capacity, np.float32)
+        kinds = np.zeros(capacity, np.int32)
+
+        if previous is not None:
+            positions[:n] = self.positions[:n]
+            velocities[:n] = self.velocities[:n]
+            alphas[:n] = self.alphas[:n]
+            fades[:n] = self.fades[:n]
+            kinds[:n] = self.kinds[:n]
+
+        self.positions = positions
+        self.velocities = velocities
+        self.alphas = alphas
+        self.fades = fades
+        self.kinds = kinds
+
+    def emit(self, positions, velocities, kinds, alphas=255, fades=3):
+        """Spawn a burst of particles. Every argument is an array (or list)
+        with a value per particle or a single value for all of them.
+
+        Args:
+            positions: The particles' top left corners, (n, 2).
+            velocities: Pixels moved each update, (n, 2).
+            kinds: The tile each particle is drawn with.
+            alphas (optional): Starting alpha, 0-255. Defaults to 255.
+            fades (optional): Alpha lost each update, the particle goes at 0. Defaults to 3.
+        """
+        positions = np.asarray(positions, np.float32).reshape(-1, 2)
+        n = len(positions)
+        start = self.count
+        end = start + n
+
+        if end > len(self.positions):
+            self.allocate(max(end, len(self.positions) * 2))
+
+        self.positions[start:end] = positions
+        self.velocities[start:end] = velocities
+        self.kinds[start:end] = kinds
+        self.alphas[start:end] = alphas
+        self.fades[start:end] = fades
+        self.count = end
+
+    def update(self):
+        n = self.count
+        if not n:
+            return
+
+        self.velocities[:n, 1] += self.gravity
+        self.positions[:n] += self.velocities[:n]
+        self.alphas[:n] -= self.fades[:n]
+
+        # pack the ones still showing to the front, most frames nothing fades out
+        alive = self.alphas[:n] > 0
+        if alive.all():
+            return
+
+        kept = int(alive.sum())
+        for array in [self.positions, self.velocities, self.alphas, self.fades, self.kinds]:
+            array[:kept] = array[:n][alive]
+        self.count = kept
+
+    def draw(self, surface: pygame.Surface):
+        n = self.count
+        if not n:
+            return
+
+        levels = np.minimum(self.alphas[:n], 255).astype(np.int32) * ALPHA_LEVELS // 256
+        tiles = (self.kinds[:n] * ALPHA_LEVELS + levels).tolist()
+        positions = self.positions[:n].astype(np.int32).tolist()
+
+        surface.fblits(zip(map(self.tiles.__getitem__, tiles), positions))
+
+    def clear(self):
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
@@ -0,0 +1,163 @@
+# description: frame time profiler for the game loop. code wrapped in a named span
+# is timed every frame, kept as a rolling window per span for p50/p95/p99 and can
+# be traced to a file to open in chrome://tracing or perfetto, or as csv.
+
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+
+class Span:
+    """Times a block of code into its profiler. One Span is kept per name and
+    reused so timing a block doesn't allocate."""
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns() - self.start)
+
+
+class Profiler:
+    def __init__(self, window: int = 600, max_events: int = 200_000):
+        """Create a profiler.
+
+        Args:
+            window (int, optional): Frames kept per span for the percentiles. Defaults to 600.
+            max_events (int, optional): The most events a trace keeps before it stops. Defaults to 200_000.
+        """
+        self.window = window
+        self.max_events = max_events
+        self.frame = 0
+        self.spans: dict[str, Span] = {}
+        self.samples: dict[str, deque] = {}  # ns per frame for each span
+        self.totals: dict[str, int] = {}  # ns so far this frame for each span
+        self.tracing = False
+        self.events: list[tuple] = []  # (name, start ns, duration ns, frame)
+        # only the game loop's thread is timed, not scenes preloading
+        self.thread = threading.get_ident()
+
+    def span(self, name: str) -> Span:
+        """The span for a name, to use as a context manager:
+
+        with game.profiler.span("draw"):
+            ...
+        """
+        span = self.spans.get(name)
+        if span is None:
+            span = self.spans[name] = Span(self, name)
+        return span
+
+    def record(self, name: str, start: int, duration: int):
+        if threading.get_ident() != self.thread:
+            return
+
+        # a span can run many times in a frame (text), these add up
+        self.totals[name] = self.totals.get(name, 0) + duration
+
+        if self.tracing:
+            self.events.append((name, start, duration, self.frame))
+            if len(self.events) >= self.max_events:
+                self.tracing = False
+
+    def end_frame(self):
+        """Move this frame's span totals into the rolling windows"""
+        for name, total in self.totals.items():
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append(total)
+
+        self.totals.clear()
+        self.frame += 1
+
+    def reset(self):
+        self.samples.clear()
+        self.totals.clear()
+        self.events.clear()
+
+    def percentiles(self, name: str) -> dict:
+        """The mean, p50, p95, p99 and max in milliseconds over the window"""
+        samples = sorted(self.samples.get(name, ()))
+        if not samples:
+            return {}
+
+        def p(q: float) -> float:
+            return samples[min(len(samples) - 1, int(len(samples) * q))] / 1e6
+
+        return {
+            "frames": len(samples),
+            "mean": sum(samples) / len(samples) / 1e6,
+            "p50": p(0.5),
+            "p95": p(0.95),
+            "p99": p(0.99),
+            "max": samples[-1] / 1e6,
+        }
+
+    def report(self) -> dict[str, dict]:
+        """Percentiles for every span, slowest p99 first"""
+        report = {name: self.percentiles(name) for name in self.samples}
+        return dict(sorted(report.items(), key=lambda item: -item[1]["p99"]))
+
+    def report_lines(self, count: int | None = None, match: str = "") -> list[str]:
+        """The report as text lines for the console"""
+        lines = [f"{'span':<28}{'p50':>7}{'p95':>7}{'p99':>7}{'max':>7}"]
+
+        for name, stats in list(self.report().items()):
+            if match.lower() not in name.lower():
+                continue
+            lines.append(
+                f"{name[:27]:<28}{stats['p50']:>7.2f}{stats['p95']:>7.2f}"
+                f"{stats['p99']:>7.2f}{stats['max']:>7.2f}"
+            )
+
+        return lines[: count + 1] if count else lines
+
+    def start_trace(self):
+        self.events.clear()
+        self.tracing = True
+
+    def stop_trace(self):
+        self.tracing = False
+
+    def export(self, path: str):
+        """Write the traced events to a file. A .csv path gets one row per
+        event, anything else gets the chrome trace event format.
+
+        Args:
+            path (str): Where to write the trace
+        """
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["frame", "span", "start_ms", "duration_ms"])
+                for name, start, duration, frame in self.events:
+                    writer.writerow([frame, name, start / 1e6, duration / 1e6])
+            return
+
+        # complete ("X") events, timestamps in microseconds
+        trace = {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": start / 1000,
+                    "dur": duration / 1000,
+                    "pid": 0,
+                    "tid": 0,
+                    "args": {"frame": frame},
+                }
+                for name, start, duration, frame in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+        with open(path, "w") as f:
+            json.dump(trace, f)
@@ -0,0 +1,98 @@
+# qbbench - microbenchmark of the quadblox boards, the list of lists qb.Board
+# against the bitboard qbbits.BitBoard. plays the same seeded games of random
+# hard drops on each and reports how many pieces a second each places and scores
+import random
+import sys
+import time
+
+import scenes.quadblox.scripts.qb as qb
+import scenes.quadblox.scripts.qbbits as qbbits
+
+help_message = """
+qbbench - time placing and scoring pieces on each quadblox board
+
+Usage: qbbench.py [pieces] [seed]
+
+Optional arguments:
+pieces: how many pieces to drop on each board, defaults to 20000
+seed: seed for the pieces and where they're dropped, defaults to 0
+
+"""
+
+
+def play(board_class, piece_class, pieces: int, seed: int) -> dict:
+    """Drop pieces at random columns and rotations straight down, starting over
+    whenever the board dies.
+
+    Returns:
+        dict: the seconds spent in place() (which scores), overall and the board
+    """
+    random.seed(seed)
+    board = board_class()
+    board.clear()
+    place_time = 0
+    games = 1
+
+    start = time.perf_counter()
+    for _ in range(pieces):
+        piece = piece_class()
+        for _ in range(random.randint(0, 3)):
+            piece.rotate()
+
+        # somewhere it fits at the top
+        piece.x = random.randint(-1, board.cols - 1)
+        while piece.collides(board):
+            piece.x = random.randint(-1, board.cols - 1)
+
+        while not piece.collides(board):
+            piece.y += 1
+        piece.y -= 1
+
+        placed = time.perf_counter()
+        board.place(piece)
+        place_time += time.perf_counter() - placed
+
+        if board.dead():
+            board.clear()
+            games += 1
+
+    return {
+        "total": time.perf_counter() - start,
+        "place": place_time,
+        "games": games,
+        "board": board,
+    }
+
+
+def main():
+    if "-h" in sys.argv or "--help" in sys.argv:
+        print(help_message)
+        return
+
+    pieces = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    results = {
+        "qb.Board": play(qb.Board, qb.Piece, pieces, seed),
+        "qbbits.BitBoard": play(qbbits.BitBoard, qbbits.BitPiece, pieces, seed),
+    }
+
+    print(f"{pieces} pieces, seed {seed}\n")
+    print(f"{'board':<18}{'place+score/s':>15}{'drops/s':>12}{'lines':>8}{'games':>7}")
+    for name, r in results.items():
+        print(
+            f"{name:<18}{pieces / r['place']:>15,.0f}{pieces / r['total']:>12,.0f}"
+            f"{r['board'].lines_cleared:>8}{r['games']:>7}"
+        )
+
+    # the same pieces landing in the same places should leave the same boards
+    boards = [r["board"] for r in results.values()]
+    same = all(
+        board.grid == boards[0].grid and board.points == boards[0].points
+        for board in boards
+    )
+    print(f"\nboards match: {'yes' if same else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,124 @@
+import asyncio
+import collections
+import contextlib
 import os
+import time
 
 # .env support
 from dotenv import load_dotenv
 
 # fastapi
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import RedirectResponse
 
-# Postgres
-import psycopg
-from psycopg.rows import dict_row
-
-# my custom quadblox and namebuilder
+# my custom quadblox, lobby, leaderboard and namebuilder
 import scenes.quadblox.scripts.qb as qb
+import scenes.quadblox.scripts.qbreplay as qbreplay
+import qblobby
+import qbleaderboard
 import namebuilder
 
 TIMEOUT = 30  # seconds
+PURGE_INTERVAL = 5  # seconds
+# seconds without a publish before another process's lobbies are hidden
+WORKER_TIMEOUT = 3 * PURGE_INTERVAL
 STARTING_LOBBY_COUNT = 3
+MAX_LOBBIES = 100  # per server process
+LOBBY_EXPIRY = 10 * 60  # seconds idle before a lobby is removed
+REAP_INTERVAL = 60  # seconds
+MAX_REPLAY_BYTES = 64 * 1024  # minutes of busy keys, more than a 40 line rush takes
+
+
+class LobbyElsewhere(Exception):
+    """Raised for a lobby hosted by another server process"""
+
+    def __init__(self, worker: str):
+        super().__init__(worker)
+        self.worker = worker
+
+
+class RequestRates:
+    """Requests per second for each route averaged over the last window
+    seconds, counted in one second buckets."""
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self.buckets: dict[int, collections.Counter] = collections.defaultdict(
+            collections.Counter
+        )
+
+    def count(self, route: str):
+        self.buckets[int(time.time())][route] += 1
+
+    def rates(self) -> dict[str, float]:
+        oldest = int(time.time()) - self.window
+        for second in [s for s in self.buckets if s <= oldest]:
+            del self.buckets[second]
+
+        total = collections.Counter()
+        for counts in self.buckets.values():
+            total.update(counts)
+
+        return {route: round(n / self.window, 2) for route, n in total.most_common()}
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # join the lobby list shared with any other server processes and host a few
+    # lobbies of our own
+    global leaderboard, lobby_store
+    lobby_store = qblobby.open_lobby_store(os.getenv("LOBBY_STORE"))
+    if not isinstance(lobby_store, qblobby.MemoryLobbyStore) and not WORKER_URL:
+        raise RuntimeError("WORKER_URL must be set when LOBBY_STORE is shared")
+
+    for _ in range(STARTING_LOBBY_COUNT):
+        create_new_board()
+
+    # open the database once and load the top scores into memory
+    leaderboard = qbleaderboard.Leaderboard(
+        qbleaderboard.open_store(os.getenv("DATABASE"))
+    )
+    leaderboard.load()
+    writer = asyncio.create_task(leaderboard.run())
+    purger = asyncio.create_task(purge_dead_boards())
+    reaper = asyncio.create_task(reap_lobbies())
+
+    yield
+
+    # write any scores still queued before closing the database
+    reaper.cancel()
+    purger.cancel()
+    writer.cancel()
+    await leaderboard.flush()
+    leaderboard.store.close()
+
+    # hand our lobbies back, their players have lost their seats anyway
+    lobby_store.remove_worker(worker)
+    lobby_store.close()
+    lobbies.clear()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(LobbyElsewhere)
+async def redirect_to_worker(request: Request, exc: LobbyElsewhere):
+    # send the client on to the process hosting the lobby, 307 keeps the method
+    url = exc.worker + request.url.path
+    if request.url.query:
+        url += "?" + request.url.query
+    return RedirectResponse(url=url, status_code=307)
+
 
-app = FastAPI()
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    response = await call_next(request)
+
+    # count by route so /games/0 and /games/1 are counted together
+    route = request.scope.get("route")
+    rates.count(route.path if route else "unmatched")
+    return response
 
 
 @app.get("/", status_code=301)
@@ -28,32 +127,79 @@ def read_root():
 
 
 @app.get("/leaderboard")
-def read_leaderboard():
-    return high_scores
+async def read_leaderboard():
+    return leaderboard.top
 
 
 @app.post("/leaderboard")
-def update_leaderboard(
+async def update_leaderboard(
     player: str, time: float, lines: int, pieces: int, score: int, frames: int
 ):
-    with psycopg.connect(conninfo=os.getenv("DATABASE")) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO
-                high_scores
+    # the score is written to the database in the background with others
+    return leaderboard.submit(
+        {
+            "player": player,
+            "time": time,
+            "lines": lines,
+            "pieces": pieces,
+            "score": score,
+            "frames": frames,
+        }
+    )
+
+
+async def play_replay(request: Request) -> dict:
+    """Play the replay in a request's body back and return what it comes to"""
+    data = await request.body()
+    if len(data) > MAX_REPLAY_BYTES:
+        raise HTTPException(status_code=413, detail="Replay too large")
+
+    try:
+        replay = qbreplay.Replay.decode(data)
+    except qbreplay.ReplayError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # playing it back is all cpu, keep it off the event loop
+    game = await asyncio.to_thread(qbreplay.play, replay)
+    return qbreplay.results(game)
+
+
+@app.post("/replays/verify")
+async def verify_replay(
+    request: Request, time: float | None = None, lines: int | None = None
+):
+    """Plays back a replay sent as the request body (see qbreplay.py) and
+    returns its time, lines, pieces and score. Given the time and lines a
+    client claims, `verified` says whether the replay bears them out."""
+    results = await play_replay(request)
+
+    if time is not None or lines is not None:
+        results["verified"] = (time is None or abs(results["time"] - time) < 1e-6) and (
+            lines is None or results["lines"] == lines
+        )
 
-                (player, time, lines, pieces, score, frames)
+    return results
 
-                VALUES
 
-                (%s, %s, %s, %s, %s, %s)
+@app.post("/leaderboard/replay")
+async def submit_replay(request: Request, player: str):
+    """Puts a finished 40 line rush on the leaderboard from its replay, with
+    the time and lines it plays back to rather than any the client claims"""
+    results = await play_replay(request)
 
-                """,
-                (player, time, lines, pieces, score, frames),
-            )
-    refresh_high_scores()
-    return high_scores
+    if results["mode"] != qb.QBMode.SoloForty.name or not results["finished"]:
+        return {"status": "error", "message": "Not a finished 40 line rush"}
+
+    return leaderboard.submit(
+        {
+            "player": player,
+            "time": results["time"],
+            "lines": results["lines"],
+            "pieces": results["pieces"],
+            "score": results["score"],
+            "frames": results["frames"],
+        }
+    )
 
 
 @app.get("/games")
@@ -62,135 +208,322 @@ def active_games():
 
 
 @app.get("/games/{game_id}/sit")
-def seat(game_id: int):
+async def seat(game_id: int):
     # check for a valid game
-    if game_id >= len(games) or game_id < 0:
+    try:
+        lobby = find_lobby(game_id)
+    except HTTPException:
         return {"status": "error", "message": "Invalid game_id"}
 
-    purge_dead_boards(game_id)
-
     # check for an open seat
-    for i in range(len(games[game_id])):
-        if games[game_id][i].dead():
-            # make a new board for the player
-            games[game_id][i] = qb.Board()
-            games[game_id][i].clear()
-            return {"status": "ok", "seat": i}
+    i = lobby.sit()
+    if i is None:
+        return {"status": "error", "message": "No open seats"}
+
+    # let the websocket seats know the seat was reset
+    await broadcast_board(game_id, i)
 
-    # if no open seats return an error
-    return {"status": "error", "message": "No open seats"}
+    # clients talk to the process hosting their lobby directly from here on
+    if WORKER_URL:
+        return {"status": "ok", "seat": i, "server": WORKER_URL}
+    return {"status": "ok", "seat": i}
 
 
 @app.get("/games/new")
-def new_board():
-    create_new_board()
-    return {"status": "ok", "game_id": len(games) - 1, "name": lobbies[-1]}
+async def new_board():
+    # hand out a lobby nobody has played in for a while before making another
+    game_id = reuse_empty_lobby()
+
+    if game_id is None:
+        if len(lobbies) >= MAX_LOBBIES:
+            return {"status": "error", "message": "Too many lobbies"}
+        game_id = create_new_board()
+
+    return {"status": "ok", "game_id": game_id, "name": lobbies[game_id].name}
+
+
+@app.get("/stats")
+async def stats():
+    """What this server process is hosting, for sizing servers"""
+    hosted = list(lobbies.values())
+    memory = [lobby.memory() for lobby in hosted]
+
+    return {
+        "lobbies": len(hosted),
+        "max_lobbies": MAX_LOBBIES,
+        "seats": len(hosted) * qblobby.SEATS,
+        "players": sum(lobby.players() for lobby in hosted),
+        "websockets": sum(len(lobby.sockets) for lobby in hosted),
+        "bytes_per_lobby": sum(memory) // len(memory) if memory else 0,
+        "requests_per_second": rates.rates(),
+    }
 
 
 @app.get("/games/{game_id}")
-def read_board(game_id: int):
-    board_states = []
+def read_board(game_id: int, version: int = qb.CODEC_TEXT, since: int | None = None):
+    """Without `since` returns every board in the lobby. With `since` returns
+    only the rows that changed after that revision, as export_rows strings
+    keyed by seat, plus the revision to pass as `since` next time:
 
-    purge_dead_boards(game_id)
+        {"revision": <revision>, "boards": {"<seat>": "<rows>", ...}}
+    """
+    if since is not None:
+        return find_lobby(game_id).changes(since)
 
-    for board in games[game_id]:
-        board_states.append(board.export_board())
-    return board_states
+    return find_lobby(game_id).export(version)
 
 
 @app.post("/games/update/{game_id}/{board_number}")
-def update_board(game_id: int, board_number: int, board_state: str):
-    # pick a random board to update
-    # board = random.choice(boards[game_id])
-    games[game_id][board_number].import_board(board_state)
-    return {"status": "ok"}
-
+async def update_board(
+    game_id: int, board_number: int, board_state: str, base: int | None = None
+):
+    """Updates a seat's board with any format import_board understands. Clients
+    sending only their changed rows pass the revision from their last update as
+    `base`, if the server's board has moved on since (the seat was reset) the
+    update is refused and the client should send its full board again.
+    """
+    lobby = find_lobby(game_id)
+    try:
+        revision = lobby.update(board_number, board_state, base)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/games/line-clear-attack/{game_id}/{board_number}/{lines}")
-def attack_board(game_id: int, board_number: int, lines: int):
-    for i in range(9):
-        if i != board_number:
-            games[game_id][i].attacks_waiting += lines
+    if revision is None:
+        return {"status": "resync", "revision": lobby.revision(board_number)}
 
-    attacks_waiting = []
+    # push the changed rows to any seats listening on a websocket
+    await broadcast_board(game_id, board_number)
+    return {"status": "ok", "revision": revision}
 
-    for board in games[game_id]:
-        attacks_waiting.append(board.attacks_waiting)
 
-    return attacks_waiting
+@app.post("/games/line-clear-attack/{game_id}/{board_number}/{lines}")
+async def attack_board(game_id: int, board_number: int, lines: int):
+    find_lobby(game_id)
+    await send_attack(game_id, board_number, lines)
+    return lobbies[game_id].attacks_waiting()
 
 
 @app.get("/games/get-attacks/{game_id}/{board_number}")
 def get_attacks(game_id: int, board_number: int):
-    n = games[game_id][board_number].attacks_waiting
-    games[game_id][board_number].attacks_waiting -= n
-    return {"lines": n}
+    return {"lines": find_lobby(game_id).take_attacks(board_number)}
+
+
+@app.websocket("/games/{game_id}/ws")
+async def lobby_socket(websocket: WebSocket, game_id: int):
+    """Event driven alternative to polling the REST routes. The client is
+    seated on connect and then pushes json messages to the server:
+
+        {"board": "<export_board() string>", "attack": <lines>}
+
+    Both keys are optional and the board may be in any format import_board
+    understands, including only the changed rows from export_rows. The server
+    pushes frames back as they happen, with the full boards in the packed format
+    on welcome and only the changed rows after that:
+
+        {"type": "welcome", "seat": <seat>, "boards": [<board>, ...]}
+        {"type": "board", "seat": <seat>, "board": "<rows>"}
+        {"type": "attack", "lines": <lines>}
+        {"type": "error", "message": "<message>"}
+    """
+    try:
+        find_lobby(game_id)
+    except LobbyElsewhere as e:
+        # refuse the handshake with a redirect to the process hosting the
+        # lobby, QBClient.socket follows it (not every websocket client does)
+        url = e.worker.replace("https://", "wss://").replace("http://", "ws://")
+        await websocket.send_denial_response(
+            RedirectResponse(url=url + websocket.url.path, status_code=307)
+        )
+        return
+    except HTTPException:
+        pass  # seat() reports it below
+
+    await websocket.accept()
+
+    r = await seat(game_id)
+    if r["status"] != "ok":
+        await websocket.send_json({"type": "error", "message": r["message"]})
+        await websocket.close()
+        return
+
+    board_number = r["seat"]
+    lobby = lobbies[game_id]
+
+    await websocket.send_json(
+        {
+            "type": "welcome",
+            "seat": board_number,
+            "boards": lobby.join(board_number, websocket),
+        }
+    )
+
+    try:
+        while True:
+            message = await websocket.receive_json()
+            rates.count("websocket message")
+
+            # valid json isn't always an object, drop anything else
+            if not isinstance(message, dict):
+                await websocket.send_json(
+                    {"type": "error", "message": "messages must be json objects"}
+                )
+                continue
+
+            # any message counts as a keep alive for the seat, one with a field
+            # of the wrong type or a board that doesn't import is dropped
+            try:
+                board_state = message.get("board")
+                if board_state is not None and not isinstance(board_state, str):
+                    raise ValueError("board must be a string")
+                attack = message.get("attack", 0)
+                if isinstance(attack, bool) or not isinstance(attack, int):
+                    raise ValueError("attack must be a whole number of lines")
+                lobby.update(board_number, board_state)
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "message": str(e)})
+                continue
+
+            if "board" in message:
+                await broadcast_board(game_id, board_number)
+
+            if attack > 0:
+                await send_attack(game_id, board_number, attack)
+
+    except (WebSocketDisconnect, ValueError, TypeError):
+        pass
+
+    finally:
+        lobby.leave(board_number, websocket)
+
+
+async def broadcast_board(game_id: int, board_number: int):
+    # push the rows each websocket seat hasn't seen yet to every other seat
+    lobby = lobbies[game_id]
+
+    for i, websocket in lobby.listeners(board_number):
+        try:
+            frame = lobby.board_frame(board_number, websocket)
+            if frame is None:
+                continue
+
+            await websocket.send_json(frame)
+        except Exception:
+            lobby.leave(i, websocket)
+
+
+async def send_attack(game_id: int, board_number: int, lines: int):
+    # websocket seats get their attack pushed right away, polling seats
+    # pick it up from attacks_waiting on their next get-attacks call
+    lobby = lobbies[game_id]
+
+    for i, websocket in lobby.attack(board_number, lines):
+        try:
+            await websocket.send_json({"type": "attack", "lines": lines})
+        except Exception:
+            # the seat missed this attack but gets the next ones by polling
+            lobby.leave(i, websocket)
+
+
+def create_new_board() -> int:
+    # the store hands out the id so it's unique across every server process
+    name = nb.build("ac")
+    game_id = lobby_store.create(name, worker)
+    lobbies[game_id] = qblobby.Lobby(name, TIMEOUT)
+    return game_id
+
+
+def reuse_empty_lobby() -> int | None:
+    for game_id, lobby in lobbies.items():
+        if lobby.idle() > TIMEOUT:
+            # restart the clock so the reaper leaves it for its new players
+            lobby.active = time.time()
+            return game_id
+
+    return None
+
+
+def find_lobby(game_id: int) -> qblobby.Lobby:
+    """The lobby if this process hosts it. Raises LobbyElsewhere for a lobby
+    on another process and a 404 for one that doesn't exist."""
+    lobby = lobbies.get(game_id)
+    if lobby is not None:
+        return lobby
+
+    entry = lobby_store.get(game_id)
+    if entry is None or entry["worker"] == worker:
+        raise HTTPException(status_code=404, detail="Invalid game_id")
+
+    raise LobbyElsewhere(entry["worker"])
 
 
-def create_new_board():
-    # create our list to hold our new set of boards
-    new_game = []
+async def purge_dead_boards():
+    """Free the seats of disconnected players every PURGE_INTERVAL seconds,
+    rather than on every read, and publish our player counts to the lobby store
+    so every process can list them. Runs until cancelled."""
+    while True:
+        await asyncio.sleep(PURGE_INTERVAL)
 
-    for _ in range(9):
-        # create each board and zero out it's timeout so it's not active
-        new_board = qb.Board()
-        new_board.zero_timeout()
-        new_game.append(new_board)
+        for game_id, lobby in list(lobbies.items()):
+            for i in lobby.purge():
+                await broadcast_board(game_id, i)
 
-    games.append(new_game)
+            await asyncio.to_thread(lobby_store.publish, game_id, lobby.players())
 
-    lobbies.append(nb.build("ac"))
 
+async def reap_lobbies():
+    """Remove the lobbies nobody has played in for LOBBY_EXPIRY seconds, newest
+    first, while keeping STARTING_LOBBY_COUNT around to join. Runs until
+    cancelled."""
+    while True:
+        await asyncio.sleep(REAP_INTERVAL)
 
-def purge_dead_boards(game_id):
+        for game_id in sorted(lobbies, reverse=True):
+            if len(lobbies) <= STARTING_LOBBY_COUNT:
+                break
 
-    # purge any disconnected boards / dead boards
-    for i in range(len(games[game_id])):
-        if not games[game_id][i].dead():
-            if games[game_id][i].timeout() > TIMEOUT:
-                games[game_id][i] = qb.Board()
+            if lobbies[game_id].idle() > LOBBY_EXPIRY:
+                del lobbies[game_id]
+                await asyncio.to_thread(lobby_store.remove, game_id)
 
 
 def get_active_games():
     lobby_list = []
 
-    for i, lobby in enumerate(lobbies):
-        player_count = 0
-        for board in games[i]:
-            if board.timeout() < TIMEOUT:
-                player_count += 1
+    for entry in lobby_store.all():
+        lobby = lobbies.get(entry["game_id"])
+
+        if lobby is not None:
+            player_count = lobby.players()
+        elif time.time() - entry["seen"] < WORKER_TIMEOUT:
+            player_count = entry["players"]
+        else:
+            # the process hosting it has stopped publishing, it's likely gone
+            continue
 
         lobby_list.append(
             {
-                "game_id": i,
-                "name": lobby,
+                "game_id": entry["game_id"],
+                "name": entry["name"],
                 "players": player_count,
-                "seats_available": 9 - player_count,
+                "seats_available": qblobby.SEATS - player_count,
             }
         )
 
-    return {"active_games": len(games), "lobbies": lobby_list}
-
-
-def refresh_high_scores():
-    global high_scores
-    with psycopg.connect(conninfo=os.getenv("DATABASE"), row_factory=dict_row) as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT * FROM high_scores ORDER BY time ASC LIMIT 10")
-            high_scores = cur.fetchall()
+    return {"active_games": len(lobby_list), "lobbies": lobby_list}
 
 
 load_dotenv()
 
-nb = namebuilder.NameBuilder()
-lobbies = []
-games = []
-high_scores = []
-
-refresh_high_scores()
+# the url clients reach this process on, needed when several processes share
+# a LOBBY_STORE so they can send clients to the one hosting their lobby
+WORKER_URL = os.getenv("WORKER_URL")
+worker = WORKER_URL or "local"
 
-for _ in range(STARTING_LOBBY_COUNT):
-    create_new_board()
+nb = namebuilder.NameBuilder()
+lobbies: dict[int, qblobby.Lobby] = {}  # the lobbies this process hosts by game_id
+lobby_store = None  # opened in lifespan
+leaderboard: qbleaderboard.Leaderboard = None  # opened in lifespan
+rates = RequestRates()
 
 
 if __name__ == "__main__":
@@ -198,4 +531,7 @@ if __name__ == "__main__":
 
     port = int(os.getenv("PORT", default=8000))
     print(f"Starting server on port http://localhost:{port}")
-    uvicorn.run(app="qbfastapi:app", host="0.0.0.0", port=port, reload=True)
+    # reload is for development, turn it off with RELOAD=0 when running
+    # several processes against a shared LOBBY_STORE
+    reload = os.getenv("RELOAD", default="1") == "1"
+    uvicorn.run(app="qbfastapi:app", host="0.0.0.0", port=port, reload=reload)
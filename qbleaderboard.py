@@ -0,0 +1,199 @@
+# description: leaderboard storage for the quadblox server (qbfastapi.py). keeps the
+# top scores in memory so reads never touch the database and batches new scores
+# into the database in the background. with several server processes each only
+# sees its own submissions right away, the others' reach it when it reads the
+# top scores back from the database every refresh_interval.
+
+import asyncio
+import bisect
+import sqlite3
+import threading
+import time
+
+COLUMNS = ("player", "time", "lines", "pieces", "score", "frames")
+
+
+class PostgresStore:
+    """High scores in Postgres through a connection pool opened once at startup."""
+
+    def __init__(self, conninfo: str, min_size: int = 1, max_size: int = 4):
+        # imported here so the server can run against sqlite without the pool installed
+        from psycopg.rows import dict_row
+        from psycopg_pool import ConnectionPool
+
+        self.pool = ConnectionPool(
+            conninfo,
+            min_size=min_size,
+            max_size=max_size,
+            kwargs={"row_factory": dict_row},
+        )
+
+    def top(self, n: int) -> list[dict]:
+        with self.pool.connection() as conn:
+            return conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM high_scores ORDER BY time ASC LIMIT %s",
+                (n,),
+            ).fetchall()
+
+    def insert_many(self, entries: list[dict]):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(
+                    f"INSERT INTO high_scores ({', '.join(COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s)",
+                    [tuple(entry[c] for c in COLUMNS) for entry in entries],
+                )
+
+    def close(self):
+        self.pool.close()
+
+
+class SQLiteStore:
+    """High scores in a SQLite file, for running the server locally and testing.
+    Creates the table if it doesn't exist yet."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS high_scores (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    player TEXT,
+                    time REAL,
+                    lines INTEGER,
+                    pieces INTEGER,
+                    score INTEGER,
+                    frames INTEGER
+                )
+                """
+            )
+
+    def top(self, n: int) -> list[dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM high_scores ORDER BY time ASC LIMIT ?",
+                (n,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def insert_many(self, entries: list[dict]):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO high_scores ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                [tuple(entry[c] for c in COLUMNS) for entry in entries],
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def open_store(database: str | None):
+    """Open the store for the DATABASE setting. A value starting with sqlite:///
+    is a SQLite file path, no value is a throwaway in memory SQLite database and
+    anything else is a Postgres conninfo string."""
+    if not database:
+        print("DATABASE is not set, high scores will not be kept between runs")
+        return SQLiteStore()
+
+    if database.startswith("sqlite:///"):
+        return SQLiteStore(database[len("sqlite:///") :])
+
+    return PostgresStore(database)
+
+
+class Leaderboard:
+    """The fastest times, kept sorted in memory and updated as scores come in.
+    New scores are queued and written to the store in batches by run()."""
+
+    def __init__(
+        self,
+        store,
+        size: int = 10,
+        batch_size: int = 50,
+        flush_interval: float = 2,
+        refresh_interval: float = 10,
+    ):
+        """Create a leaderboard over a store.
+
+        Args:
+            store (PostgresStore | SQLiteStore): where scores are kept
+            size (int, optional): How many scores to keep in memory. Defaults to 10.
+            batch_size (int, optional): Queued scores that trigger an early write. Defaults to 50.
+            flush_interval (float, optional): Seconds between writes. Defaults to 2.
+            refresh_interval (float, optional): Seconds between reading the top scores back, to pick up other processes' scores. Defaults to 10.
+        """
+        self.store = store
+        self.size = size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self.top: list[dict] = []
+        self.pending: list[dict] = []
+        self.wake = asyncio.Event()
+
+    def load(self):
+        self.top = self.store.top(self.size)
+
+    async def refresh(self):
+        """Read the top scores back from the store, keeping any of ours still
+        waiting to be written"""
+        try:
+            top = await asyncio.to_thread(self.store.top, self.size)
+        except Exception as e:
+            print(f"leaderboard refresh failed: {e}")
+            return
+
+        self.top = sorted(top + self.pending, key=lambda e: e["time"])[: self.size]
+
+    def submit(self, entry: dict) -> list[dict]:
+        """Queue a score for writing and slot it into the top scores.
+
+        Returns:
+            list[dict]: the top scores
+        """
+        self.pending.append(entry)
+        if len(self.pending) >= self.batch_size:
+            self.wake.set()
+
+        # most submissions are slower than the whole board, skip those
+        if len(self.top) < self.size or entry["time"] < self.top[-1]["time"]:
+            bisect.insort(self.top, entry, key=lambda e: e["time"])
+            del self.top[self.size :]
+
+        return self.top
+
+    async def flush(self):
+        if not self.pending:
+            return
+
+        batch = self.pending
+        self.pending = []
+
+        try:
+            await asyncio.to_thread(self.store.insert_many, batch)
+        except Exception as e:
+            # keep the scores to try again on the next flush
+            print(f"leaderboard flush failed: {e}")
+            self.pending = batch + self.pending
+
+    async def run(self):
+        """Write queued scores every flush_interval, or sooner once batch_size
+        scores are waiting, and read the top scores back every
+        refresh_interval. Runs until cancelled."""
+        refreshed = time.monotonic()
+
+        while True:
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+
+            self.wake.clear()
+            await self.flush()
+
+            if time.monotonic() - refreshed >= self.refresh_interval:
+                refreshed = time.monotonic()
+                await self.refresh()
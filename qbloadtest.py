@@ -0,0 +1,207 @@
+# qbloadtest - load test for the quadblox server (qbfastapi.py)
+# simulates lobbies full of polling players, each seat a thread making the same
+# calls the quadblox scene does, and reports latency percentiles and throughput
+import random
+import sys
+import threading
+import time
+
+import scenes.quadblox.scripts.qb as qb
+from scenes.quadblox.scripts.qbclient import QBClient
+
+SEATS = 9
+
+help_message = """
+qbloadtest - hammer a quadblox server with simulated players
+
+Usage: qbloadtest.py <server> [lobbies] [seconds] [tick]
+
+Required arguments:
+server: the server's base url such as http://localhost:8000
+
+Optional arguments:
+lobbies: how many lobbies of 9 seats to fill, defaults to 3
+seconds: how long to run for, defaults to 10
+tick: seconds each seat waits between rounds of calls, defaults to 0.5
+      (the quadblox scene's polling rate), 0 to go flat out
+
+"""
+
+
+class Seat(threading.Thread):
+    """One simulated player. Sits in a lobby, then every tick sends the rows of
+    its board that changed, reads the other boards' changes, picks up its
+    attacks and now and then sends one.
+    """
+
+    def __init__(self, server: str, game_id: int, tick: float, stop: threading.Event):
+        super().__init__(daemon=True)
+        self.client = QBClient(server, pool_size=1)
+        self.game_id = game_id
+        self.tick = tick
+        self.stop = stop
+        self.board = qb.Board()
+        self.board.clear()
+        self.latencies: dict[str, list[float]] = {}
+        self.errors = 0
+
+    def call(self, name: str, method: str, path: str, **params):
+        start = time.perf_counter()
+        try:
+            r = self.client.request(method, path, params=params)
+        except Exception:
+            self.errors += 1
+            return None
+
+        self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+        return r
+
+    def sit(self) -> int | None:
+        """Take a seat in the lobby, returns the seat or None if there wasn't one"""
+        r = self.call("sit", "GET", f"/games/{self.game_id}/sit")
+        if r is None or r.get("status") != "ok":
+            self.errors += 1
+            return None
+
+        # a server sharing its lobbies with other processes names the one hosting
+        # ours, talk to it directly rather than being redirected every call
+        if "server" in r:
+            self.client.server = r["server"].rstrip("/")
+
+        return r["seat"]
+
+    def run(self):
+        seat = self.sit()
+        if seat is None:
+            self.client.close()
+            return
+
+        base = None
+        since = 0
+        sent = self.board.revision
+
+        while not self.stop.is_set():
+            # change a row near the bottom as if a piece landed
+            row = random.randint(12, self.board.rows - 1)
+            self.board.grid[row] = [
+                random.randint(0, len(qb.colors) - 1) for _ in range(self.board.cols)
+            ]
+            self.board.touch([row])
+
+            if base is None:
+                state = self.board.export_board(qb.CODEC_PACKED)
+            else:
+                state = self.board.export_rows(self.board.rows_since(sent))
+            sent = self.board.revision
+
+            r = self.call(
+                "update",
+                "POST",
+                f"/games/update/{self.game_id}/{seat}",
+                board_state=state,
+                **({} if base is None else {"base": base}),
+            )
+            base = r["revision"] if r and r.get("status") == "ok" else None
+
+            r = self.call("read", "GET", f"/games/{self.game_id}", since=since)
+            if r:
+                since = r["revision"]
+
+            self.call("get-attacks", "GET", f"/games/get-attacks/{self.game_id}/{seat}")
+
+            if random.random() < 0.1:
+                self.call(
+                    "attack",
+                    "POST",
+                    f"/games/line-clear-attack/{self.game_id}/{seat}/{random.randint(1, 4)}",
+                )
+
+            if self.tick:
+                self.stop.wait(self.tick)
+
+        self.client.close()
+
+
+def percentile(values: list[float], p: float) -> float:
+    # nan when every call failed, so the report still gets to the errors
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def report(name: str, values: list[float], seconds: float):
+    values.sort()
+    print(
+        f"{name:<12} {len(values):>8} {len(values) / seconds:>10.1f}"
+        f" {percentile(values, 0.5) * 1000:>9.2f} {percentile(values, 0.99) * 1000:>9.2f}"
+    )
+
+
+def load_test(
+    server: str, lobby_count: int, seconds: float, tick: float, seat_class=Seat
+) -> list[Seat]:
+    client = QBClient(server)
+
+    # fill the server's empty lobbies and ask for more. /games/new hands out
+    # idle lobbies again before making new ones, so the ids aren't 0..n-1
+    games = client.request("GET", "/games")["lobbies"]
+    game_ids = [g["game_id"] for g in games if g["seats_available"] >= SEATS]
+    game_ids = game_ids[:lobby_count]
+
+    for _ in range(lobby_count * 2):
+        if len(game_ids) >= lobby_count:
+            break
+        r = client.request("GET", "/games/new")
+        if r.get("status") != "ok":
+            print(f"couldn't get another lobby: {r.get('message')}")
+            break
+        if r["game_id"] not in game_ids:
+            game_ids.append(r["game_id"])
+    client.close()
+
+    stop = threading.Event()
+    seats = [
+        seat_class(server, game_id, tick, stop)
+        for game_id in game_ids
+        for _ in range(SEATS)
+    ]
+
+    print(f"{len(seats)} seats in {len(game_ids)} lobbies for {seconds}s")
+    start = time.perf_counter()
+    for s in seats:
+        s.start()
+
+    time.sleep(seconds)
+    stop.set()
+    for s in seats:
+        s.join()
+    elapsed = time.perf_counter() - start
+
+    latencies: dict[str, list[float]] = {}
+    for s in seats:
+        for name, values in s.latencies.items():
+            latencies.setdefault(name, []).extend(values)
+
+    print(f"{'call':<12} {'requests':>8} {'per sec':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, values in latencies.items():
+        report(name, values, elapsed)
+    report("all", [v for values in latencies.values() for v in values], elapsed)
+    print(f"errors: {sum(s.errors for s in seats)}")
+    return seats
+
+
+def main():
+    if not 2 <= len(sys.argv) <= 5:
+        print(help_message)
+        sys.exit(1)
+
+    server = sys.argv[1]
+    lobby_count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    tick = float(sys.argv[4]) if len(sys.argv) > 4 else 0.5
+
+    load_test(server, lobby_count, seconds, tick)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+# description: lobby state for the quadblox server (qbfastapi.py). each lobby owns its
+# nine boards and the websockets seated at them behind its own lock, so the sync
+# routes fastapi runs on its threadpool and the async routes on the event loop
+# can't interleave halfway through a change. the list of every lobby, and which
+# server process hosts it, lives in a lobby store shared by all of them.
+
+import itertools
+import sqlite3
+import sys
+import threading
+import time
+
+import scenes.quadblox.scripts.qb as qb
+
+SEATS = 9
+
+
+class Lobby:
+    """One QuadBlox lobby. Every read or change of the boards goes through a
+    method that holds the lobby's lock, the websocket sends themselves happen
+    after the lock is released so a slow client never holds up the lobby."""
+
+    def __init__(self, name: str, timeout: float = 30):
+        """Create an empty lobby.
+
+        Args:
+            name (str): The name shown in the lobby list
+            timeout (float, optional): Seconds without an update before a seat is freed. Defaults to 30.
+        """
+        self.name = name
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.boards: list[qb.Board] = []
+        self.sockets = {}  # websocket connections keyed by seat
+        self.active = time.time()  # when the lobby was created or handed out again
+
+        for _ in range(SEATS):
+            # zero out each board's timeout so it's not active
+            board = qb.Board()
+            board.zero_timeout()
+            self.boards.append(board)
+
+    def open_seat(self, i: int) -> bool:
+        board = self.boards[i]
+        return board.dead() or board.timeout() > self.timeout
+
+    def sit(self) -> int | None:
+        """Take the first open seat with a fresh board.
+
+        Returns:
+            int | None: the seat or None when the lobby is full
+        """
+        with self.lock:
+            for i in range(SEATS):
+                if self.open_seat(i):
+                    # make a new board for the player
+                    self.boards[i] = qb.Board()
+                    self.boards[i].clear()
+                    return i
+
+        return None
+
+    def purge(self) -> list[int]:
+        """Empty the boards of any disconnected players. Their seats are open
+        once they time out, this just stops everyone else seeing the old board.
+
+        Returns:
+            list[int]: the seats whose boards were emptied
+        """
+        purged = []
+
+        with self.lock:
+            for i, board in enumerate(self.boards):
+                # boards that topped out or were never sat at stay as they are
+                if board.dead() or board.timeout() <= self.timeout:
+                    continue
+
+                # only the rows with blocks change, so only those get sent on
+                filled = [row for row, cells in enumerate(board.grid) if any(cells)]
+                if not filled:
+                    continue
+
+                for row in filled:
+                    board.grid[row] = [0] * board.cols
+                board.attacks_waiting = 0
+                board.touch(filled)
+                purged.append(i)
+
+        return purged
+
+    def players(self) -> int:
+        with self.lock:
+            return sum(1 for board in self.boards if board.timeout() < self.timeout)
+
+    def idle(self) -> float:
+        """Seconds since anyone updated a board or the lobby was handed out"""
+        with self.lock:
+            last = max([self.active] + [board.last_update for board in self.boards])
+            if self.sockets:
+                last = time.time()
+        return time.time() - last
+
+    def memory(self) -> int:
+        """Rough bytes held by the lobby's boards, for sizing servers"""
+        with self.lock:
+            total = sys.getsizeof(self) + sys.getsizeof(self.boards)
+            for board in self.boards:
+                total += sys.getsizeof(board) + sys.getsizeof(board.__dict__)
+                total += sys.getsizeof(board.grid) + sys.getsizeof(board.row_revisions)
+                total += sum(sys.getsizeof(row) for row in board.grid)
+            return total
+
+    def export(self, version: int = qb.CODEC_TEXT) -> list[str]:
+        with self.lock:
+            return [board.export_board(version) for board in self.boards]
+
+    def changes(self, since: int) -> dict:
+        """The rows that changed after a revision, see read_board in qbfastapi.py"""
+        revision = since
+        changes = {}
+
+        with self.lock:
+            for i, board in enumerate(self.boards):
+                if board.revision <= since:
+                    continue
+
+                changes[i] = board.export_rows(board.rows_since(since))
+                revision = max(revision, board.revision)
+
+        return {"revision": revision, "boards": changes}
+
+    def update(
+        self, seat: int, board_state: str | None, base: int | None = None
+    ) -> int | None:
+        """Import a seat's board, or just keep the seat alive when board_state is
+        None.
+
+        Args:
+            seat (int): The seat to update
+            board_state (str | None): Any format import_board understands
+            base (int | None, optional): The revision the rows were based on. Defaults to None.
+
+        Returns:
+            int | None: the board's new revision, None if base is stale and the
+            full board is needed
+        """
+        with self.lock:
+            board = self.boards[seat]
+
+            if base is not None and base != board.revision:
+                return None
+
+            if board_state is None:
+                board.last_update = time.time()
+            else:
+                board.import_board(board_state)
+
+            return board.revision
+
+    def revision(self, seat: int) -> int:
+        with self.lock:
+            return self.boards[seat].revision
+
+    def attack(self, seat: int, lines: int) -> list:
+        """Send lines from a seat to everyone else. Polling seats get them added
+        to attacks_waiting, the websockets that should be pushed the attack are
+        returned for the caller to send to.
+
+        Returns:
+            list[tuple[int, WebSocket]]: the seats and websockets to push to
+        """
+        pushes = []
+
+        with self.lock:
+            for i, board in enumerate(self.boards):
+                if i == seat:
+                    continue
+
+                websocket = self.sockets.get(i)
+                if websocket is not None:
+                    pushes.append((i, websocket))
+                else:
+                    board.attacks_waiting += lines
+
+        return pushes
+
+    def attacks_waiting(self) -> list[int]:
+        with self.lock:
+            return [board.attacks_waiting for board in self.boards]
+
+    def take_attacks(self, seat: int) -> int:
+        """Read and reset a seat's waiting attack lines in one step"""
+        with self.lock:
+            board = self.boards[seat]
+            n = board.attacks_waiting
+            board.attacks_waiting = 0
+            return n
+
+    def join(self, seat: int, websocket) -> list[str]:
+        """Register a websocket for a seat and mark every board as sent to it.
+
+        Returns:
+            list[str]: every board in the packed format for the welcome frame
+        """
+        with self.lock:
+            # the revision of each board this socket has been sent, so later
+            # frames only carry the rows it is missing
+            websocket.state.revisions = [board.revision for board in self.boards]
+            self.sockets[seat] = websocket
+            return [board.export_board(qb.CODEC_PACKED) for board in self.boards]
+
+    def leave(self, seat: int, websocket):
+        with self.lock:
+            # only forget the socket if the seat wasn't taken over by a new connection
+            if self.sockets.get(seat) is websocket:
+                del self.sockets[seat]
+
+    def listeners(self, seat: int) -> list:
+        """The seats and websockets of every seat other than this one"""
+        with self.lock:
+            return [(i, ws) for i, ws in self.sockets.items() if i != seat]
+
+    def board_frame(self, seat: int, websocket) -> dict | None:
+        """The rows of a seat's board this websocket hasn't been sent yet, and mark
+        them as sent. Build each frame right before sending it so frames reach a
+        socket in the order their revisions were taken.
+
+        Returns:
+            dict | None: the frame or None when the socket is up to date
+        """
+        with self.lock:
+            board = self.boards[seat]
+            seen = websocket.state.revisions[seat]
+            if board.revision <= seen:
+                return None
+
+            websocket.state.revisions[seat] = board.revision
+            return {
+                "type": "board",
+                "seat": seat,
+                "board": board.export_rows(board.rows_since(seen)),
+            }
+
+
+class MemoryLobbyStore:
+    """The lobby list for a single server process, the default."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = itertools.count()
+        self.lobbies: dict[int, dict] = {}
+
+    def create(self, name: str, worker: str) -> int:
+        with self.lock:
+            game_id = next(self.ids)
+            self.lobbies[game_id] = {
+                "game_id": game_id,
+                "name": name,
+                "worker": worker,
+                "players": 0,
+                "seen": time.time(),
+            }
+            return game_id
+
+    def publish(self, game_id: int, players: int):
+        with self.lock:
+            self.lobbies[game_id].update(players=players, seen=time.time())
+
+    def get(self, game_id: int) -> dict | None:
+        with self.lock:
+            lobby = self.lobbies.get(game_id)
+            return dict(lobby) if lobby else None
+
+    def all(self) -> list[dict]:
+        with self.lock:
+            return [dict(lobby) for lobby in self.lobbies.values()]
+
+    def remove(self, game_id: int):
+        with self.lock:
+            self.lobbies.pop(game_id, None)
+
+    def remove_worker(self, worker: str):
+        with self.lock:
+            for game_id, lobby in list(self.lobbies.items()):
+                if lobby["worker"] == worker:
+                    del self.lobbies[game_id]
+
+    def close(self):
+        pass
+
+
+class SQLiteLobbyStore:
+    """The lobby list in a SQLite file shared by several server processes on one
+    machine. Lobby ids start at 0 like the in memory store and are never reused."""
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+
+        with self.lock, self.conn:
+            # readers don't block the other processes writing
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS lobbies (
+                    game_id INTEGER PRIMARY KEY,
+                    name TEXT,
+                    worker TEXT,
+                    players INTEGER,
+                    seen REAL
+                )
+                """
+            )
+            # hands out the ids, kept apart from the lobbies so a removed
+            # lobby's id isn't given to the next one
+            self.conn.execute("CREATE TABLE IF NOT EXISTS lobby_ids (next INTEGER)")
+            self.conn.execute(
+                "INSERT INTO lobby_ids SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM lobby_ids)"
+            )
+
+    def create(self, name: str, worker: str) -> int:
+        # the update takes the write lock so no other process reads the same id
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE lobby_ids SET next = next + 1")
+            game_id = self.conn.execute("SELECT next - 1 FROM lobby_ids").fetchone()[0]
+            self.conn.execute(
+                "INSERT INTO lobbies VALUES (?, ?, ?, 0, ?)",
+                (game_id, name, worker, time.time()),
+            )
+            return game_id
+
+    def publish(self, game_id: int, players: int):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE lobbies SET players = ?, seen = ? WHERE game_id = ?",
+                (players, time.time(), game_id),
+            )
+
+    def get(self, game_id: int) -> dict | None:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM lobbies WHERE game_id = ?", (game_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def all(self) -> list[dict]:
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM lobbies ORDER BY game_id").fetchall()
+        return [dict(row) for row in rows]
+
+    def remove(self, game_id: int):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM lobbies WHERE game_id = ?", (game_id,))
+
+    def remove_worker(self, worker: str):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM lobbies WHERE worker = ?", (worker,))
+
+    def close(self):
+        self.conn.close()
+
+
+def open_lobby_store(lobby_store: str | None):
+    """Open the store for the LOBBY_STORE setting. No value keeps the lobbies in
+    this process, a value starting with sqlite:/// is a SQLite file the server
+    processes share."""
+    if not lobby_store:
+        return MemoryLobbyStore()
+
+    if lobby_store.startswith("sqlite:///"):
+        return SQLiteLobbyStore(lobby_store[len("sqlite:///") :])
+
+    raise ValueError(f"unknown LOBBY_STORE {lobby_store}")
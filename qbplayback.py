@@ -0,0 +1,56 @@
+# qbplayback - plays quadblox replays (see scenes/quadblox/scripts/qbreplay.py)
+# back with no window as fast as they'll go and reports what they come to, the
+# same check the server makes before a 40 line rush goes on the leaderboard
+import sys
+import time
+
+from scenes.quadblox.scripts.qbreplay import Replay, ReplayError, play, results
+
+help_message = """
+qbplayback - play a quadblox replay back without a window
+
+Usage: qbplayback.py <replay> [times]
+
+Required arguments:
+replay: a .qbr file, the game saves one to replays/ after every solo game
+
+Optional arguments:
+times: how many times to play it, to time the playback. defaults to 1
+
+"""
+
+
+def main():
+    if not 2 <= len(sys.argv) <= 3:
+        print(help_message)
+        sys.exit(1)
+
+    path = sys.argv[1]
+    times = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    try:
+        replay = Replay.decode(data)
+    except ReplayError as e:
+        print(f"{path}: {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    for _ in range(times):
+        game = play(replay)
+    elapsed = (time.perf_counter() - start) / times
+
+    r = results(game)
+    ending = "finished" if r["finished"] else "topped out" if r["dead"] else "still going"
+    print(f"{path}: {r['mode']}, seed {replay.seed}, {len(data)} bytes")
+    print(
+        f"{r['time']:.3f}s ({r['frames']} frames), {r['lines']} lines,"
+        f" {r['pieces']} pieces, {r['score']} points, {ending}"
+    )
+    print(f"played back in {elapsed * 1000:.1f} ms, {r['frames'] / elapsed:,.0f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,537 @@
+# qbsim - headless quadblox bots. the bots press keys in qbgame's PlayerGame,
+# the rules the scene and the server's replay checks play by (7 piece bags,
+# gravity from level_speed, a line clear of n lines attacking every other
+# player with n - 1), with no window or server, across a process pool, and
+# writes a csv row per player per game for tuning level_speed and the attack
+# rules. pointed at a server instead the bots sit in its lobbies and play over
+# the same calls the scene makes, as realistic load.
+import abc
+import concurrent.futures
+import csv
+import os
+import random
+import sys
+import time
+
+from scenes.quadblox.scripts.qbbits import WALL, BitBoard, BitPiece
+from scenes.quadblox.scripts.qbgame import DROP, LEFT, RIGHT, ROTATE, PlayerGame
+
+FPS = 60  # the scene's frame rate, gravity is counted in frames
+INPUT_FRAMES = 4  # frames between a bot's key presses, about a quick human
+MAX_PIECES = 2000  # a game still going after this many pieces is called off
+
+# the columns set in a row's cells, qb boards are 10 wide
+COLUMNS = [[col for col in range(10) if mask >> col & 1] for mask in range(1 << 10)]
+
+help_message = """
+qbsim - play quadblox with bots, locally or against a server
+
+Usage: qbsim.py [games] [players] [bots] [csv] [processes]
+       qbsim.py <server> [lobbies] [seconds] [bots]
+
+Play locally:
+games: how many games to play, defaults to 1000
+players: players in each game, 1 for solo games until the player tops out,
+         more for matches until one is left. defaults to 1
+bots: the bot for each seat, placement or random, or a comma separated
+      list to cycle through the seats. defaults to placement
+csv: file to write a row per player per game to, defaults to qbsim.csv
+processes: worker processes, defaults to one per cpu
+
+Against a server (a url such as http://localhost:8000):
+lobbies: how many lobbies of 9 bots to fill, defaults to 3
+seconds: how long to play for, defaults to 30
+bots: as above
+
+"""
+
+
+class Bot(abc.ABC):
+    """Decides where each piece goes. Subclasses fill in choose()."""
+
+    name = ""
+
+    @abc.abstractmethod
+    def choose(self, board: BitBoard, piece: BitPiece) -> tuple[int, int]:
+        """Pick a place for a piece that's just come in at the top.
+
+        Returns:
+            tuple[int, int]: the rotation and column to move the piece to before hard dropping it
+        """
+
+
+class RandomBot(Bot):
+    """Any rotation, any column. A floor for the other bots and cheap load."""
+
+    name = "random"
+
+    def choose(self, board: BitBoard, piece: BitPiece) -> tuple[int, int]:
+        return random.randint(0, 3), random.randint(-1, board.cols - 1)
+
+
+class PlacementBot(Bot):
+    """Tries every rotation in every column, dropped straight down, and picks
+    the board it likes best by its lines, holes, height and bumpiness.
+
+    Args:
+        lines (float, optional): Weight of each line cleared.
+        height (float, optional): Weight of the columns' heights added up.
+        holes (float, optional): Weight of each empty cell with a block above it.
+        bumpiness (float, optional): Weight of the height differences between neighbouring columns.
+    """
+
+    name = "placement"
+
+    def __init__(
+        self,
+        lines: float = 0.760666,
+        height: float = -0.510066,
+        holes: float = -0.35663,
+        bumpiness: float = -0.184483,
+    ):
+        self.weights = (lines, height, holes, bumpiness)
+
+    def choose(self, board: BitBoard, piece: BitPiece) -> tuple[int, int]:
+        best = None
+        best_score = 0.0
+        tried = set()
+        top = stack_top(board)
+
+        for rotation, bits in enumerate(piece.rotation_bits):
+            # o, i, s and z look the same after some of their turns
+            if bits in tried:
+                continue
+            tried.add(bits)
+
+            for x in range(-1, board.cols):
+                y = landing_row(board, bits, x, top)
+                if y is None:
+                    continue
+
+                score = self.score(board, bits, x, y, top)
+                if best is None or score > best_score:
+                    best = (rotation, x)
+                    best_score = score
+
+        # nowhere fits, it's game over wherever it goes
+        return best or (piece.rotation, piece.x)
+
+    def score(
+        self, board: BitBoard, bits: tuple[int, ...], x: int, y: int, top: int = 0
+    ) -> float:
+        """How much the bot likes the board with the piece placed there. The
+        empty rows above top (see stack_top) change nothing and are skipped."""
+        # heights count up from the bottom, so leaving out empty rows at the
+        # top doesn't change them
+        start = min(top, y)
+        rows = board.bits[start:]
+        for row, piece_bits in enumerate(bits):
+            if piece_bits:
+                rows[y - start + row] |= piece_bits << (x + WALL)
+
+        kept = [row for row in rows if row != board.full_row]
+        lines = len(rows) - len(kept)
+
+        # walk down the board keeping the columns that have had a block so far,
+        # an empty cell in one of those is a hole. after the clear the kept rows
+        # sit at the bottom so row n of them is len(kept) - n high
+        mask = (1 << board.cols) - 1
+        covered = 0
+        holes = 0
+        heights = [0] * board.cols
+        for n, row in enumerate(kept):
+            cells = (row >> WALL) & mask
+            holes += (covered & ~cells).bit_count()
+            tops = cells & ~covered
+            if tops:
+                covered |= tops
+                for col in COLUMNS[tops]:
+                    heights[col] = len(kept) - n
+
+        bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+
+        w_lines, w_height, w_holes, w_bumpiness = self.weights
+        return (
+            w_lines * lines
+            + w_height * sum(heights)
+            + w_holes * holes
+            + w_bumpiness * bumpiness
+        )
+
+
+BOTS = {bot.name: bot for bot in [PlacementBot, RandomBot]}
+
+
+def stack_top(board: BitBoard) -> int:
+    """The highest row with a block in it, board.rows for an empty board"""
+    for y, row in enumerate(board.bits):
+        if row != board.walls:
+            return y
+    return board.rows
+
+
+def landing_row(
+    board: BitBoard, bits: tuple[int, ...], x: int, top: int = 0
+) -> int | None:
+    """The row a piece's rows land on dropped straight down in column x, None
+    if it doesn't fit at the top. top is stack_top(board) or any row above
+    it, the piece falls freely through the empty rows above it."""
+    shift = x + WALL
+    if shift < 0:
+        return None
+
+    rows = [
+        (row, piece_bits << shift) for row, piece_bits in enumerate(bits) if piece_bits
+    ]
+
+    def fits(y: int) -> bool:
+        for row, piece_bits in rows:
+            if y + row >= board.rows or piece_bits & board.bits[y + row]:
+                return False
+        return True
+
+    if not fits(0):
+        return None
+
+    # a piece (4 rows at most) wholly above top fits wherever it fits at the top
+    y = max(0, top - 4)
+    while fits(y + 1):
+        y += 1
+    return y
+
+
+class Player:
+    """A bot playing a PlayerGame, the same rules engine the scene, the replays
+    and the server's replay checks run. The bot presses its keys a few frames
+    apart and the game's own gravity, kicks and locking do the rest, so frames
+    pass just as they would for a player in the scene.
+
+    Args:
+        bot (Bot): The bot choosing where the pieces go.
+        seed (int | None, optional): Seed for the game's bags. Defaults to a random one.
+    """
+
+    def __init__(self, bot: Bot, seed: int | None = None):
+        self.bot = bot
+        self.game = PlayerGame(seed, project=False)
+        self.board = self.game.board
+        self.died_frame: int | None = None
+        self.attacks_sent: list[int] = []
+        self.attack_lines_received = 0
+
+    @property
+    def frames(self) -> int:
+        return self.game.frame
+
+    def take_attacks(self):
+        if self.board.attacks_waiting:
+            self.attack_lines_received += self.board.attacks_waiting
+            self.board.add_line_to_bottom(self.board.attacks_waiting)
+            self.board.attacks_waiting = 0
+
+    def play_piece(self) -> int:
+        """Play the next piece through to it locking.
+
+        Returns:
+            int: the lines of attack the piece sends
+        """
+        game = self.game
+        board = self.board
+        self.take_attacks()
+
+        rotation, x = self.bot.choose(board, game.piece)
+        placed = board.blocks_placed
+
+        # one key press at a time, rotating first then moving over then hard
+        # dropping, with the piece falling as the frames go by. a press that's
+        # blocked ends the bot's plans for the piece and it drops where it is
+        while not game.over and board.blocks_placed == placed:
+            piece = game.piece
+            if piece.rotation != rotation:
+                key = ROTATE
+            elif piece.x != x:
+                key = LEFT if x < piece.x else RIGHT
+            else:
+                key = DROP
+
+            game.step(key, key)
+            if board.blocks_placed != placed:
+                break
+
+            if key == ROTATE and game.piece.rotation == piece.rotation:
+                rotation = piece.rotation
+            elif key in (LEFT, RIGHT) and game.piece.x == piece.x:
+                x = piece.x
+
+            # a hard dropped piece waits out gravity to lock
+            game.wait(game.drop_at if key == DROP else INPUT_FRAMES - 1)
+
+        attack = board.outgoing_attack_queue
+        board.outgoing_attack_queue = 0
+        if attack:
+            self.attacks_sent.append(attack)
+
+        # a piece placed while it's stuck at the top tops out on the next frame,
+        # call it now
+        game.check_for_death()
+        if game.dead and self.died_frame is None:
+            self.died_frame = self.frames
+        return attack
+
+    def stats(self) -> dict:
+        board = self.board
+        minutes = self.frames / FPS / 60
+        return {
+            "bot": self.bot.name,
+            "pieces": board.blocks_placed,
+            "frames": self.frames,
+            "seconds": round(self.frames / FPS, 2),
+            "lines": board.lines_cleared,
+            "lines_per_min": round(board.lines_cleared / minutes, 2) if minutes else 0,
+            "pieces_per_sec": (
+                round(board.blocks_placed / minutes / 60, 3) if minutes else 0
+            ),
+            "level": board.level,
+            "points": board.points,
+            "singles": board.clears[0],
+            "doubles": board.clears[1],
+            "triples": board.clears[2],
+            "quads": board.clears[3],
+            "attacks_1": self.attacks_sent.count(1),
+            "attacks_2": self.attacks_sent.count(2),
+            "attacks_3": self.attacks_sent.count(3),
+            "attack_lines_sent": sum(self.attacks_sent),
+            "attack_lines_received": self.attack_lines_received,
+            "topped_out": self.died_frame is not None,
+        }
+
+
+def play_game(
+    game: int, seed: int, bots: list[str], max_pieces: int = MAX_PIECES
+) -> list[dict]:
+    """Play a game with a bot per seat. Whoever's furthest behind in frames
+    moves next, so attacks land about when they would have in real time.
+
+    Returns:
+        list[dict]: each player's stats, with the place they finished in
+    """
+    random.seed(seed)
+    players = [Player(BOTS[name](), random.getrandbits(32)) for name in bots]
+    alive = list(players)
+    places = {}
+
+    # a solo game runs until the player tops out, a match until one is left
+    while alive and (len(players) == 1 or len(alive) > 1):
+        player = min(alive, key=lambda p: p.frames)
+        if player.board.blocks_placed >= max_pieces:
+            break
+
+        attack = player.play_piece()
+        if attack:
+            for other in alive:
+                if other is not player:
+                    other.board.attacks_waiting += attack
+
+        if player.game.dead:
+            places[player] = len(alive)
+            alive.remove(player)
+
+    for player in alive:
+        places[player] = 1
+
+    return [
+        {
+            "game": game,
+            "seed": seed,
+            "players": len(players),
+            "seat": seat,
+            "place": places[player],
+        }
+        | player.stats()
+        for seat, player in enumerate(players)
+    ]
+
+
+def simulate(games: int, bots: list[str], path: str, processes: int):
+    start = time.perf_counter()
+    rows = []
+
+    # seeds by game number so any one game can be played again on its own
+    jobs = [(game, game, bots) for game in range(games)]
+    if processes == 1:
+        for job in jobs:
+            rows.extend(play_game(*job))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+            chunksize = max(1, games // (processes * 8))
+            for result in pool.map(play_game, *zip(*jobs), chunksize=chunksize):
+                rows.extend(result)
+
+    elapsed = time.perf_counter() - start
+
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    pieces = sum(row["pieces"] for row in rows)
+    print(
+        f"{games} games of {len(bots)} in {elapsed:.2f}s on {processes} processes,"
+        f" {games / elapsed:,.1f} games/s, {pieces / elapsed:,.0f} pieces/s"
+    )
+
+    print(
+        f"\n{'bot':<12}{'players':>8}{'lines/min':>11}{'pieces/s':>10}{'lines':>8}"
+        f"{'level':>7}{'wins':>6}  attacks 1/2/3"
+    )
+    for name in dict.fromkeys(bots):
+        mine = [row for row in rows if row["bot"] == name]
+        count = len(mine)
+        wins = sum(row["place"] == 1 for row in mine) if len(bots) > 1 else 0
+        print(
+            f"{name:<12}{count:>8}"
+            f"{sum(row['lines_per_min'] for row in mine) / count:>11.1f}"
+            f"{sum(row['pieces_per_sec'] for row in mine) / count:>10.2f}"
+            f"{sum(row['lines'] for row in mine) / count:>8.1f}"
+            f"{sum(row['level'] for row in mine) / count:>7.1f}"
+            f"{wins:>6}  "
+            + "/".join(str(sum(row[f"attacks_{n}"] for row in mine)) for n in [1, 2, 3])
+        )
+    print(f"\nwrote {len(rows)} rows to {path}")
+
+
+def serve(server: str, lobby_count: int, seconds: float, bots: list[str]):
+    # only needed against a server, the local games run without requests
+    import qbloadtest
+
+    class BotSeat(qbloadtest.Seat):
+        """A seat played by a bot in real time, sending its board, picking up
+        attacks and sending its own every tick like the scene does. Starts a
+        new game whenever it tops out."""
+
+        count = 0
+
+        def __init__(self, *args):
+            super().__init__(*args)
+            self.bot = BOTS[bots[BotSeat.count % len(bots)]]()
+            BotSeat.count += 1
+            self.games = 0
+            self.pieces = 0
+            self.lines = 0
+
+        def run(self):
+            seat = self.sit()
+            if seat is None:
+                self.client.close()
+                return
+
+            player = None
+            attack = 0
+
+            while not self.stop.is_set():
+                if player is None or player.game.dead:
+                    if player is not None:
+                        self.pieces += player.board.blocks_placed
+                        self.lines += player.board.lines_cleared
+                    player = Player(self.bot)
+                    start = time.perf_counter()
+                    self.board = player.board
+                    self.games += 1
+                    base = None
+                    since = 0
+                    sent = self.board.revision
+
+                # catch up on the pieces a player would have placed by now
+                now = (time.perf_counter() - start) * FPS
+                while player.frames < now and not player.game.dead:
+                    attack += player.play_piece()
+
+                if base is None:
+                    state = self.board.export_board(qbloadtest.qb.CODEC_PACKED)
+                else:
+                    state = self.board.export_rows(self.board.rows_since(sent))
+                sent = self.board.revision
+
+                r = self.call(
+                    "update",
+                    "POST",
+                    f"/games/update/{self.game_id}/{seat}",
+                    board_state=state,
+                    **({} if base is None else {"base": base}),
+                )
+                base = r["revision"] if r and r.get("status") == "ok" else None
+
+                r = self.call("read", "GET", f"/games/{self.game_id}", since=since)
+                if r:
+                    since = r["revision"]
+
+                r = self.call(
+                    "get-attacks", "GET", f"/games/get-attacks/{self.game_id}/{seat}"
+                )
+                if r:
+                    self.board.attacks_waiting += r["lines"]
+
+                if attack:
+                    self.call(
+                        "attack",
+                        "POST",
+                        f"/games/line-clear-attack/{self.game_id}/{seat}/{attack}",
+                    )
+                    attack = 0
+
+                if self.tick:
+                    self.stop.wait(self.tick)
+
+            if player is not None:
+                self.pieces += player.board.blocks_placed
+                self.lines += player.board.lines_cleared
+            self.client.close()
+
+    seats = qbloadtest.load_test(server, lobby_count, seconds, 0.5, BotSeat)
+    print(
+        f"bots played {sum(s.games for s in seats)} games, placing"
+        f" {sum(s.pieces for s in seats)} pieces and clearing {sum(s.lines for s in seats)} lines"
+    )
+
+
+def main():
+    if "-h" in sys.argv or "--help" in sys.argv or len(sys.argv) > 6:
+        print(help_message)
+        sys.exit(1)
+
+    args = sys.argv[1:]
+
+    if args and "://" in args[0]:
+        bots = args[3].split(",") if len(args) > 3 else ["placement"]
+    else:
+        bots = args[2].split(",") if len(args) > 2 else ["placement"]
+
+    unknown = [name for name in bots if name not in BOTS]
+    if unknown:
+        print(f"unknown bots {', '.join(unknown)}, try {', '.join(BOTS)}")
+        sys.exit(1)
+
+    if args and "://" in args[0]:
+        lobby_count = int(args[1]) if len(args) > 1 else 3
+        seconds = float(args[2]) if len(args) > 2 else 30
+        serve(args[0], lobby_count, seconds, bots)
+        return
+
+    games = int(args[0]) if len(args) > 0 else 1000
+    players = int(args[1]) if len(args) > 1 else 1
+    path = args[3] if len(args) > 3 else "qbsim.csv"
+    processes = int(args[4]) if len(args) > 4 else os.cpu_count() or 1
+
+    # the bots take the seats in turn, any past the last seat would never play
+    if len(bots) > players:
+        print(
+            f"{len(bots)} bots for {players} players, give at most one bot per player"
+        )
+        sys.exit(1)
+
+    seats = [bots[seat % len(bots)] for seat in range(players)]
+    simulate(games, seats, path, processes)
+
+
+if __name__ == "__main__":
+    main()
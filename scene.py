@@ -1,8 +1,12 @@
 import time
 import math
+import threading
 import pygame
 import settings
 import os
+import assetcache
+import outline
+import textrender
 
 
 class FastText(pygame.sprite.Sprite):
@@ -45,6 +49,12 @@ class FastText(pygame.sprite.Sprite):
 
 
 class Scene:
+    # the sound effects the scene plays, decoded in the background as it loads
+    sounds: list[str] = []
+    # the scene can be built on a background thread by game.preload, only for
+    # scenes whose __init__ leaves the scene stack and other scenes' state alone.
+    # anything shared with the rest of the game goes in entered() instead
+    preload = False
 
     def __init__(self, game):
         # prevent circular import by importing game here for type hinting
@@ -72,6 +82,7 @@ class Scene:
             "test": self.default_command,
         }  # console command dictionary of callable functions
         self.mouse_cursor, _ = self.load_png("pointer-outlined-small.png")
+        self.pending_music = None  # started once a preloaded scene is entered
 
     def draw_mouse(self):
 
@@ -184,13 +195,7 @@ class Scene:
             return
 
         # create a drop shadow for the box
-
-        for i in range(1, self.shadow_depth + 1):
-            self.draw_rect_alpha(
-                self.game.screen,
-                (0, 0, 0, self.shadow_intensity),
-                (position[0] + i, position[1] + i, size[0], size[1]),
-            )
+        self.draw_shadow((position[0], position[1], size[0], size[1]))
 
         # draw the blue background
         pygame.draw.rect(
@@ -246,17 +251,9 @@ class Scene:
             return
 
         # create a drop shadow for the box
-        for i in range(1, self.shadow_depth + 1):
-            self.draw_rect_alpha(
-                self.game.screen,
-                (0, 0, 0, self.shadow_intensity),
-                (
-                    position[0] - size[0] / 2 + i,
-                    position[1] - size[1] / 2 + i,
-                    size[0],
-                    size[1],
-                ),
-            )
+        self.draw_shadow(
+            (position[0] - size[0] / 2, position[1] - size[1] / 2, size[0], size[1])
+        )
 
         # draw the blue background
         pygame.draw.rect(
@@ -274,6 +271,14 @@ class Scene:
             width=2,
         )
 
+    def draw_shadow(self, rect):
+        """Draw the drop shadow for a box, built once per size and depth"""
+        rect = pygame.Rect(rect)
+        shadow = outline.drop_shadow(
+            rect.size, self.shadow_depth, self.shadow_intensity
+        )
+        self.game.screen.blit(shadow, rect.topleft)
+
     def draw_rect_alpha(self, surface, color, rect):
         shape_surf = pygame.Surface(pygame.Rect(rect).size, pygame.SRCALPHA)
         pygame.draw.rect(shape_surf, color, shape_surf.get_rect())
@@ -307,40 +312,11 @@ class Scene:
         strokeColor=(0, 0, 0),
         strokeThickness=1,
     ):
-        if font is None:
-            font = "assets/fonts/" + settings.FONT
-
-        if font == "system-ui":
-            font = None
-
-        # if we aren't stroking return the text directly
-        if not stroke:
-            return pygame.font.Font(font, fontSize).render(text, 1, color)
-
-        # if we are stroking, render the text with the stroke
-        # first render the text without the stroke
-
-        # create a version of the text in the stroke color and blit it to the surface
-        surf_text = pygame.font.Font(font, fontSize).render(text, 1, color)
-        surf_text_stroke = pygame.font.Font(font, fontSize).render(text, 1, strokeColor)
-
-        # create a transparent surface to draw the text and stroke on
-        size = (
-            surf_text.get_width() + strokeThickness * 3,
-            surf_text.get_height() + strokeThickness * 3,
-        )
-        surface = self.make_transparent_surface(size)
-
-        # blit the stroke text to the surface
-        for i in range(strokeThickness * 2 + 1):
-            for j in range(strokeThickness * 2 + 1):
-                surface.blit(surf_text_stroke, (i, j))
-
-        # blit the text on top of the stroke
-        surface.blit(surf_text, (strokeThickness, strokeThickness))
-
-        # return the surface
-        return surface
+        # the surface is cached and shared, copy() it before changing it
+        with self.game.profiler.span("text"):
+            return textrender.render(
+                text, color, fontSize, font, stroke, strokeColor, strokeThickness
+            )
 
     def blit_centered(self, source, target, position=(0.5, 0.5)):
         """
@@ -372,12 +348,20 @@ class Scene:
             self.log("play_sound: Sound not found: " + sound)
             return
 
+        # decodes the sound if this is the first time it's played
+        effect = self.game.sfx[sound]
+
         # set the volume of the sound based on the settings
-        self.game.sfx[sound].set_volume(self.game.volume_effects / 100)
+        effect.set_volume(self.game.volume_effects / 100)
 
-        pygame.mixer.Sound.play(self.game.sfx[sound])
+        pygame.mixer.Sound.play(effect)
 
     def play_music(self, path_in_assets):  # play a sound in an endless loop
+        # a scene being preloaded waits until it's entered to change the music
+        if threading.current_thread() is not threading.main_thread():
+            self.pending_music = path_in_assets
+            return
+
         # stop any music that is currently playing
         pygame.mixer.music.stop()
 
@@ -398,19 +382,43 @@ class Scene:
     # from the pygame tutorial:
     # https://www.pygame.org/docs/tut/tom_games3.html
     def load_png(self, name):
-        """Load image and return image object"""
+        """Load image and return image object. The image is shared through
+        assetcache, copy() it before changing it."""
         fullname = os.path.join("assets/images", name)
         try:
-            image = pygame.image.load(fullname)
-            if image.get_alpha() is None:
-                image = image.convert()
-            else:
-                image = image.convert_alpha()
+            image = assetcache.image(fullname)
         except FileNotFoundError:
             self.log(f"Cannot load image: {fullname}")
             raise SystemExit
         return image, image.get_rect()
 
+    def entered(self):
+        """Called on the main thread when the scene is loaded onto the stack,
+        whether it was preloaded or just built. Override it to set up state
+        shared with other scenes or the game, which a preloading __init__
+        must leave alone."""
+        if self.pending_music is not None:
+            self.play_music(self.pending_music)
+            self.pending_music = None
+
+    def draw_loading(self, scene: str):
+        """Drawn on top of the scene while the game waits on a preloading scene
+        to change to. Override it for a loading screen of your own.
+
+        Args:
+            scene (str): The name of the scene being loaded
+        """
+        # placed by the widest text so it doesn't move as the dots change
+        widest = self.standard_text("loading...", 20)
+        text = self.standard_text("loading" + "." * (int(self.elapsed() * 4) % 4), 20)
+        self.screen.blit(
+            text,
+            (
+                self.screen.get_width() - widest.get_width() - 10,
+                self.screen.get_height() - widest.get_height() - 10,
+            ),
+        )
+
     def log(self, message: str):
         """Calls the game objects log method with the message to make it easier to log messages from scenes.
 
@@ -1,43 +1,68 @@
-from .backgrounds.fractal import Mandelbrot
-from .backgrounds.golden import Golden
-from .backgrounds.julia import Julia
-from .backgrounds.lavalamp import LavaLamp
-from .backgrounds.plasma import Plasma
-from .backgrounds.warp import Warp
-from .console import Console
-from .fonttest.fonttest import FontTest
-from .fourjacks.fourjacksgameboard import FourJacksGameBoard
-from .fourjacks.fourjacksgameover import FourJacksGameOver
-from .fourjacks.fourjackstitle import FourJacksTitle
-from .gameselect import GameSelect
-from .jackblackjack.jackblackjack import JackBlackJack
-from .jackblackjack.jackblackjacktitle import JackBlackJackTitle
-from .jackdefense.jackdefensegameboard import JackDefenseGameBoard
-from .jackdefense.jackdefensegameover import JackDefenseGameOver
-from .jackdefense.jackdefensetitle import JackDefenseTitle
-from .jackgames import JackGames
-from .jackninjas.jackninjas import JackNinjas
-from .jackninjas.jackninjaseditor import JackNinjasEditor
-from .jackninjas.jackninjasinventory import JackNinjasInventory
-from .jackninjas.jackninjastitle import JackNinjasTitle
-from .jackninjas.jackninjaswinner import JackNinjasWinner
-from .jackwizards.jackwizards import JackWizards
-from .jackwizards.jackwizardsmap import JackWizardsMap
-from .multitest.multitest import MultiTest
-from .quadblox.quadblox import QuadBlox
-from .quadblox.quadleadearboard import QuadLeaderboard
-from .quadblox.quadmenu import QuadMenu
-from .raycaster.raycaster import RayCaster
-from .superball.superballfield import SuperBallField
-from .superball.superballtitle import SuperBallTitle
-from .tvstatic import TVStatic
-from .viagalactica.vialevel import ViaLevel
-from .viagalactica.viastarfield import ViaStarfield
-from .viagalactica.viatitle import ViaTitle
-from scenes.debug import Debug
-from scenes.logo import Logo
-from scenes.menu import Menu
-
-from .solitaire.solitaire import Solitaire # auto-generated
-from .triballer.triballer import TriBaller
-from .geometryblast.geometryblast import GeometryBlast
\ No newline at end of file
+# the scenes by class name and the module each lives in, relative to this
+# package. a scene's module is only imported the first time the scene is used,
+# so starting the game doesn't pay for importing every game (and numpy, PIL and
+# requests along with them). `scenes.RayCaster`, getattr(scenes, name) and
+# dir(scenes) work as if every scene had been imported here.
+
+import importlib
+
+SCENES = {
+    "Console": ".console",
+    "Debug": ".debug",
+    "FontTest": ".fonttest.fonttest",
+    "FourJacksGameBoard": ".fourjacks.fourjacksgameboard",
+    "FourJacksGameOver": ".fourjacks.fourjacksgameover",
+    "FourJacksTitle": ".fourjacks.fourjackstitle",
+    "GameSelect": ".gameselect",
+    "GeometryBlast": ".geometryblast.geometryblast",
+    "Golden": ".backgrounds.golden",
+    "JackBlackJack": ".jackblackjack.jackblackjack",
+    "JackBlackJackTitle": ".jackblackjack.jackblackjacktitle",
+    "JackDefenseGameBoard": ".jackdefense.jackdefensegameboard",
+    "JackDefenseGameOver": ".jackdefense.jackdefensegameover",
+    "JackDefenseTitle": ".jackdefense.jackdefensetitle",
+    "JackGames": ".jackgames",
+    "JackNinjas": ".jackninjas.jackninjas",
+    "JackNinjasEditor": ".jackninjas.jackninjaseditor",
+    "JackNinjasInventory": ".jackninjas.jackninjasinventory",
+    "JackNinjasTitle": ".jackninjas.jackninjastitle",
+    "JackNinjasWinner": ".jackninjas.jackninjaswinner",
+    "JackWizards": ".jackwizards.jackwizards",
+    "JackWizardsMap": ".jackwizards.jackwizardsmap",
+    "Julia": ".backgrounds.julia",
+    "LavaLamp": ".backgrounds.lavalamp",
+    "Logo": ".logo",
+    "Mandelbrot": ".backgrounds.fractal",
+    "Menu": ".menu",
+    "MultiTest": ".multitest.multitest",
+    "Plasma": ".backgrounds.plasma",
+    "QuadBlox": ".quadblox.quadblox",
+    "QuadLeaderboard": ".quadblox.quadleadearboard",
+    "QuadMenu": ".quadblox.quadmenu",
+    "RayCaster": ".raycaster.raycaster",
+    "Solitaire": ".solitaire.solitaire",
+    "SuperBallField": ".superball.superballfield",
+    "SuperBallTitle": ".superball.superballtitle",
+    "TriBaller": ".triballer.triballer",
+    "TVStatic": ".tvstatic",
+    "ViaLevel": ".viagalactica.vialevel",
+    "ViaStarfield": ".viagalactica.viastarfield",
+    "ViaTitle": ".viagalactica.viatitle",
+    "Warp": ".backgrounds.warp",
+}
+
+
+def __getattr__(name: str):
+    module = SCENES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    scene = getattr(importlib.import_module(module, __name__), name)
+
+    # later lookups find it without coming back here
+    globals()[name] = scene
+    return scene
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(SCENES))
@@ -35,10 +35,17 @@ class Console(Scene):
             "exit | quit   quit the game",
             "help | ?      show this help",
             'scene         use "scene" to commands',
+            'perf          use "perf" to commands',
             ">>HELP>>SCENE COMMANDS:",
             "scene len     show the number of scenes in the scene stack",
             "scene list    list the scenes in the scene stack",
             "scene init    call the __init__ method of scene beneath the console",
+            ">>HELP>>PERF COMMANDS (times in ms):",
+            "perf               the slowest spans by p99",
+            "perf <text>        the spans with <text> in their name",
+            "perf reset         clear the collected times",
+            "perf trace         start tracing every span",
+            "perf save [file]   stop tracing and save trace.json (or .csv)",
         ]
 
     def update(self):
@@ -128,6 +135,8 @@ class Console(Scene):
                 elif command_lower == "scene init":
                     if len(self.game.scene) > 1:
                         self.game.scene[-2].__init__(self.game)
+                elif command_lower == "perf" or command_lower.startswith("perf "):
+                    self.perf(self.command.split()[1:])
 
                 # CUSTOM PYTHON EXECUTION AND CALLBACKS: POTENTIAL DANGER
                 else:
@@ -173,6 +182,25 @@ class Console(Scene):
                 self.command = ""
                 continue
 
+    def perf(self, args: list[str]):
+        profiler = self.game.profiler
+
+        if not args:
+            self.history.extend(profiler.report_lines(self.terminal_rows - 2))
+        elif args[0] == "reset":
+            profiler.reset()
+            self.history.append(">>Profiler reset")
+        elif args[0] == "trace":
+            profiler.start_trace()
+            self.history.append(">>Tracing, use perf save to stop and save")
+        elif args[0] == "save":
+            path = args[1] if len(args) > 1 else "trace.json"
+            profiler.stop_trace()
+            profiler.export(path)
+            self.history.append(f">>Saved {len(profiler.events)} events to {path}")
+        else:
+            self.history.extend(profiler.report_lines(self.terminal_rows - 2, args[0]))
+
     def draw(self):
 
         prompt_text = f"$ {self.command}"
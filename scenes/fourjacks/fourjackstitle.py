@@ -6,11 +6,14 @@ import settings
 
 
 class FourJacksTitle(Scene):
+    sounds = ["click", "jsxfr-select"]
+
     def __init__(self, game):
         super().__init__(game)
 
         self.background = self.make_transparent_surface(self.screen.get_size())
         self.background_image, _ = self.load_png("dalle-4jacks.png")
+        self.background_image = self.background_image.copy()
         self.background_image.set_alpha(125)  # make it not so bright
         self.background.blit(self.background_image, (0, 0))
 
@@ -5,6 +5,8 @@ from scene import Scene
 
 
 class GameSelect(Scene):
+    sounds = ["click", "jsxfr-select"]
+
     def __init__(self, game):
         super().__init__(game)
 
@@ -45,7 +47,8 @@ class GameSelect(Scene):
         self.texts = {}
 
         for opt in self.opts:
-            self.texts[opt] = self.standard_text(self.opts[opt])
+            # a copy as the shared text surface gets its alpha changed in draw
+            self.texts[opt] = self.standard_text(self.opts[opt]).copy()
 
         self.selected = 0
 
@@ -76,6 +79,9 @@ class GameSelect(Scene):
                     elif opt == "Menu":
                         self.game.scene_push = "Menu"
                     else:
+                        # the heavier games are built in the background while
+                        # this menu keeps running
+                        self.game.preload(opt)
                         self.game.scene_replace = opt
                 selected_op += 1
 
@@ -576,6 +576,15 @@ class Powerup:
 class GeometryBlast(Scene):
     """GeometryBlast - A Geometry Wars inspired twin-stick shooter."""
 
+    sounds = [
+        "cute-level-up-1-189852",
+        "death1",
+        "game-over-arcade-6435",
+        "hit",
+        "level-up-bonus-sequence-2-186891",
+        "shoot",
+    ]
+
     def __init__(self, game):
         super().__init__(game)
 
@@ -1091,7 +1100,7 @@ class GeometryBlast(Scene):
         wave_text = f"WAVE {self.wave}"
         font_size = int(60 * scale)
         if font_size > 0:
-            text_surf = self.make_text(wave_text, (100, 200, 255), font_size)
+            text_surf = self.make_text(wave_text, (100, 200, 255), font_size).copy()
 
             # Apply alpha
             text_surf.set_alpha(alpha)
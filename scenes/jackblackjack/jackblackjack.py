@@ -36,6 +36,13 @@ class GameState(Enum):
 
 
 class JackBlackJack(Scene):
+    sounds = [
+        "cute-level-up-3-189853",
+        "error-126627",
+        "game-over-arcade-6435",
+        "jsfxr-drop1",
+    ]
+
     def __init__(self, game):
         super().__init__(game)
 
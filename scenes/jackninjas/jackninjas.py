@@ -15,6 +15,18 @@ from typing import List
 
 
 class JackNinjas(Scene):
+    sounds = [
+        "dash",
+        "death1",
+        "death2",
+        "death3",
+        "death4",
+        "jump",
+        "throw",
+        "wilhelm-fall",
+    ]
+    preload = True
+
     def __init__(self, game):
         super().__init__(game)
         self.throwable_weapons = ("glaive", "boomerang")
@@ -26,10 +38,9 @@ class JackNinjas(Scene):
         }
 
         # this will store the list of items the player has collected
+        # shared with the inventory scene once entered, see entered()
         self.inventory = []
         self.active_weapon = None
-        self.game.inventory = self.inventory
-        self.game.jack_ninjas_active_weapon = self.active_weapon
 
         # we will render at 320x180 and then scale it up
         self.display = pygame.Surface((320, 180), pygame.SRCALPHA)
@@ -81,10 +92,16 @@ class JackNinjas(Scene):
         # setup screenshake variables
         self.screen_shake = 0
 
+    def entered(self):
+        super().entered()
+        # the inventory scene works on these through the game, set here rather
+        # than in __init__ as we may be built on a preload thread
+        self.game.inventory = self.inventory
+        self.game.jack_ninjas_active_weapon = self.active_weapon
+
     def sync_active_weapon(self):
-        # Keep active weapon valid and mirrored to the shared game state.
+        # Keep active weapon valid, update() mirrors it to the shared game state.
         if self.active_weapon in self.throwable_weapons and self.active_weapon in self.inventory:
-            self.game.jack_ninjas_active_weapon = self.active_weapon
             return
 
         self.active_weapon = None
@@ -93,8 +110,6 @@ class JackNinjas(Scene):
                 self.active_weapon = weapon
                 break
 
-        self.game.jack_ninjas_active_weapon = self.active_weapon
-
     def load_level(self, map_id):
         self.player.health = self.player.health_max
         self.tilemap.load("assets/jackninjas/maps/" + str(map_id) + ".json")
@@ -143,6 +158,7 @@ class JackNinjas(Scene):
         if selected_weapon in self.throwable_weapons and selected_weapon in self.inventory:
             self.active_weapon = selected_weapon
         self.sync_active_weapon()
+        self.game.jack_ninjas_active_weapon = self.active_weapon
 
         # Menu
         if self.game.input["menu"].just_pressed:
@@ -7,6 +7,8 @@ from .scripts.tilemap import Tilemap
 
 
 class JackNinjasEditor(Scene):
+    sounds = ["click"]
+
     def __init__(self, game):
         super().__init__(game)
 
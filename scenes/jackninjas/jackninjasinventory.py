@@ -2,6 +2,8 @@ from scene import Scene
 
 
 class JackNinjasInventory(Scene):
+    sounds = ["click", "jsxfr-select"]
+
     EQUIPPABLE_WEAPONS = {"glaive", "boomerang"}
     ITEM_LABELS = {
         "double_jump": "Double Jump",
@@ -92,7 +94,7 @@ class JackNinjasInventory(Scene):
                     line += " (passive)"
 
                 prefix = "> " if i == self.selected else "  "
-                line_surface = self.standard_text(prefix + line, font_size=18)
+                line_surface = self.standard_text(prefix + line, font_size=18).copy()
                 line_surface.set_alpha(255 if i == self.selected else 180)
                 self.screen.blit(line_surface, (start_x, start_y + i * y_spacing))
 
@@ -9,6 +9,9 @@ class JackNinjasTitle(Scene):
 
         self.title_image = load_tpng("jackninjas/jack-ninjas-title-360p.png")
 
+        # build the game while the title is up
+        self.game.preload("JackNinjas")
+
     def update(self):
         if self.game.input["cancel"].just_pressed:
             self.game.scene_replace = "Menu"
@@ -7,6 +7,8 @@ from .scripts.map import *
 import numpy as np
 
 class JackWizards(Scene):
+    preload = True
+
     def __init__(self, game):
         super().__init__(game)
 
@@ -39,7 +41,8 @@ class JackWizards(Scene):
             "boss_placeholder": load_tpng("jackwizards/dall-e-boss-dragon-placeholder.png"),
             "torch_top": Animation(load_tpng_folder("jackwizards/animations/torch_top"), img_dur=5, loop=True),
             "torch_side": Animation(load_tpng_folder("jackwizards/animations/torch_side"), img_dur=5, loop=True),
-            "occult_symbol": load_tpng("jackwizards/dall-e-occult.png"),
+            # a copy as it gets its alpha changed when drawn
+            "occult_symbol": load_tpng("jackwizards/dall-e-occult.png").copy(),
         }
 
         self.tiles = self.sheets["tileset"].dice(16, 16)
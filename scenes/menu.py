@@ -5,6 +5,8 @@ from scene import Scene
 
 
 class Menu(Scene):
+    sounds = ["click", "jsxfr-select"]
+
     def __init__(self, game):
         super().__init__(game)
 
@@ -23,12 +25,13 @@ class Menu(Scene):
         self.standard_stroke_thickness = 2
         self.standard_stroke = True
 
+        # copies as the shared text surfaces get their alpha changed below
         self.options = [
-            self.standard_text("sfx . . . " + str(self.game.volume_effects)),
-            self.standard_text("music . . " + str(self.game.volume_music)),
-            self.standard_text("window/fullscreen"),
-            self.standard_text("return to multicart"),
-            self.standard_text("quit to desktop"),
+            self.standard_text("sfx . . . " + str(self.game.volume_effects)).copy(),
+            self.standard_text("music . . " + str(self.game.volume_music)).copy(),
+            self.standard_text("window/fullscreen").copy(),
+            self.standard_text("return to multicart").copy(),
+            self.standard_text("quit to desktop").copy(),
         ]
 
         # make text for the options menu
@@ -1,82 +1,107 @@
+import numpy as np
 import pygame
+from particlepool import ParticlePool
 from scene import Scene
 from utils import *
-from .scripts.qb import Board, colors, Piece, Shapes, QBMode
-import copy
+from .scripts.qb import Board, colors, Piece, Shapes, QBMode, CODEC_PACKED, CODEC_TEXT
+from .scripts.qbbits import BitBoard, BitPiece
+from .scripts.qbclient import QBClient
+from .scripts.qbgame import PlayerGame, LEFT, RIGHT, ROTATE, DOWN, DROP, HOLD
+from .scripts.qbreplay import Replay
+import asyncio
 import settings
 import threading
-import requests
+import json
 import time
 import os
 
 
-class BoxParticle(pygame.sprite.Sprite):
-    def __init__(self, row, col, color, board: Board):
-        super().__init__()
-
-        self.alpha = random.randint(64, 64 * 3)
+class BoardSurface:
+    """A board's cells drawn onto a surface that's kept between frames. Only
+    the rows whose revision moved on since the last draw are drawn again, so
+    a board nobody is playing on costs a blit a frame. Empty cells are the
+    colorkey, whatever is behind the board shows through."""
+
+    def __init__(self, board: Board):
+        self.board = board
+        self.block_size = board.block_size
+        self.revision = 0
+        self.surface = pygame.Surface(
+            (board.cols * self.block_size, board.rows * self.block_size)
+        ).convert()
+        self.surface.set_colorkey((0, 0, 0))
+
+    def update(self) -> pygame.Surface:
+        """Redraw the rows that changed and return the surface"""
+        board = self.board
+        bs = self.block_size
+
+        # read the revision before the rows, a row changed by the client thread
+        # in between is then drawn again next frame rather than missed
+        revision = board.revision
+        if revision == self.revision:
+            return self.surface
+
+        rows = board.rows_since(self.revision)
+        self.revision = revision
+
+        grid = board.grid
+        for y in rows:
+            self.surface.fill((0, 0, 0), (0, y * bs, board.cols * bs, bs))
+            for x, cell in enumerate(grid[y]):
+                if cell:
+                    self.surface.fill(colors[cell], (x * bs, y * bs, bs - 1, bs - 1))
 
-        self.image = pygame.Surface(
-            (board.block_size, board.block_size)
-        ).convert_alpha()
-        self.image.set_alpha(self.alpha)
-        self.speed = (random.uniform(-0.25, 0.25), random.uniform(-1.5, -0.5))
-        self.image.fill(colors[color])
-        self.rect = self.image.get_rect()
-        tlx = board.pos[0] + board.block_size * col
-        tly = board.pos[1] + board.block_size * row
-        self.rect.topleft = (tlx, tly)
+        # a red horizontal line after the first 4 rows, in the gap below row 3
+        pygame.draw.line(
+            self.surface,
+            (255, 0, 0),
+            (0, 4 * bs - 1),
+            (board.cols * bs - 1, 4 * bs - 1),
+        )
 
-    def update(self):
-        self.alpha -= 3
-        if self.alpha <= 0:
-            self.kill()
-            return
-        self.rect.x += self.speed[0]
-        self.rect.y += self.speed[1]
-        self.image.set_alpha(self.alpha)
+        return self.surface
 
 
 class QuadBlox(Scene):
+    sounds = [
+        "jsfxr-drop2",
+        "level-up-bonus-sequence-1-186890",
+        "level-up-bonus-sequence-2-186891",
+        "level-up-bonus-sequence-3-186892",
+    ]
 
     def __init__(self, game):
         super().__init__(game)
 
-        self.particle_group = pygame.sprite.Group()
-
         self.client_run = True
 
         self.game_number = 0
         self.board_number = 0
+        self.client = QBClient(self.game.config["main"]["server"])
 
-        self.player_board = Board((100, 10))
-        self.player_board.clear()
+        # our board is played on so it's a bitboard, the opponents' boards are
+        # only ever imported and drawn. the game itself is played by qbgame,
+        # which records every frame's keys so the run can be replayed exactly
+        self.player = PlayerGame(
+            mode=self.game.qb_mode or QBMode.SoloEndless, board=BitBoard((100, 10))
+        )
+        self.player_board = self.player.board
+
+        # line clear bursts, a square per color ready to go
+        self.particles = ParticlePool.squares(colors, self.player_board.block_size)
+        self.particle_rng = np.random.default_rng()
 
         self.opponents = [Board() for _ in range(8)]
         self.setup_opponents()
 
-        self.piece_queue = []
-
-        # start populating the queue
-        self.open_bag()
-        self.open_bag()
-
-        self.player_piece = self.next_piece_in_queue()
-        self.next_piece = self.next_piece_in_queue()
-        self.stored_piece = None
-
-        self.drop_at = self.player_board.level_speed()
-        self.drop_count = 0
-
-        self.das_startup_frames = 16
-        self.das_interval_frames = 6
-        self.held_down_for = 0
-        self.held_left_for = 0
-        self.held_right_for = 0
+        # every board's cells, drawn again only where they've changed
+        self.board_surfaces: dict[Board, BoardSurface] = {}
 
         self.died_at = 0
         self.died_frame = 0
         self.high_score = None
+        self.replay = None
 
         self.standard_font_size = 20
         # self.standard_stroke = False
@@ -84,14 +109,9 @@ class QuadBlox(Scene):
         self.standard_stroke_color = (0, 0, 0)
         self.standard_stroke_thickness = 1
 
-        self.projected_piece = None
-
         self.texts = {}
         self.create_text_fields()
 
-        # record our starting frame
-        self.start_frame = self.game.frame_count()
-
         # check if we have a prior client thread running from a re-init
         if hasattr(self, "game_client"):
             self.log("terminating prior client thread...")
@@ -117,7 +137,7 @@ class QuadBlox(Scene):
         )
         self.texts["clears"] = self.Text("clears", (pos[0] + bs * 11, pos[1] + 20))
         self.texts["das"] = self.Text(
-            f"das [l:d:r] {self.das_startup_frames}>>{self.das_interval_frames}]",
+            f"das [l:d:r] {self.player.das_startup_frames}>>{self.player.das_interval_frames}]",
             (settings.RESOLUTION[0] // 2, 10 + 40 * 6),
         )
         self.texts["frames"] = self.Text(
@@ -165,6 +185,11 @@ class QuadBlox(Scene):
             (pos[0] + bs * 11, pos[1] + 40 + 11 * 20),
         )
 
+        if self.game.qb_mode == QBMode.Multiplayer:
+            self.texts["ping"] = self.Text(
+                "ping", (pos[0] + bs * 11, pos[1] + 40 + 12 * 20)
+            )
+
     def shutdown_client(self):
         self.client_run = False
         self.game_client.join()
@@ -177,19 +202,15 @@ class QuadBlox(Scene):
             # check if we have a high score to send in and clear it back to None
             if self.high_score is not None:
 
-                server = self.game.config["main"]["server"]
-
-                hs_url = f"{server}/leaderboard?"
-                hs_url += f"player={self.high_score['player']}&"
-                hs_url += f"time={self.high_score['time']}&"
-                hs_url += f"lines={self.high_score['lines']}&"
-                hs_url += f"pieces={self.high_score['pieces']}&"
-                hs_url += f"score={self.high_score['score']}&"
-                hs_url += f"frames={self.high_score['frames']}"
+                self.log(f"client thread: sending high score: {self.high_score}")
 
-                self.log(f"client thread: sending high score: {hs_url}")
-
-                requests.post(hs_url)
+                # the server plays the replay back and keeps what it comes to
+                self.client.request(
+                    "POST",
+                    "/leaderboard/replay",
+                    params={"player": self.high_score["player"]},
+                    data=self.replay.encode(),
+                )
 
                 self.high_score = None
         except:
@@ -199,43 +220,48 @@ class QuadBlox(Scene):
     def client_thread(self):
         self.log("client thread: starting")
 
-        server = self.game.config["main"]["server"]
+        self.log(f"client thread: server set to {self.client.server}")
 
-        self.log(f"client thread: server set to {server}")
+        # prefer the websocket lobby and fall back to polling the rest routes
+        # if the server doesn't support it
+        try:
+            self.socket_client()
+        except Exception as e:
+            self.log(f"client thread: websocket unavailable ({e}), polling instead")
+            if self.client_run:
+                asyncio.run(self.poll_client())
 
-        r = requests.get(f"{server}/games/0/sit").json()
-        self.board_number = r["seat"]
+        self.client.close()
+        self.log("client thread: shutting down")
 
-        self.log(f"client thread: sitting at seat {self.board_number}")
+    def socket_client(self):
+        with self.client.socket(f"/games/{self.game_number}/ws") as ws:
+            r = json.loads(ws.recv(timeout=5))
+            if r["type"] != "welcome":
+                raise ConnectionError(r.get("message", "no welcome from server"))
 
-        while self.client_run:
-            try:
-                # SLEEP
-                time.sleep(0.5)
-
-                # UPDATE OPPONENTS
-                self.log("client thread: updating opponents")
-                r = requests.get(f"{server}/games/{self.game_number}")
-                # self.log(r.text)
-
-                board_to_update = 0
-                for i, board_state in enumerate(r.json()):
-                    # skip our board
-                    if i == self.board_number:
-                        continue
-
-                    # update the board
-                    if board_to_update < len(self.opponents):
-                        self.opponents[board_to_update].import_board(board_state)
-
-                    # increment the board to update
-                    board_to_update += 1
-
-                # UPDATE OUR BOARD
-                self.log(f"client thread: updating our board {self.board_number}")
-                r = requests.post(
-                    f"{server}/games/update/{self.game_number}/{self.board_number}?board_state={self.player_board.export_board()}"
-                )
+            self.board_number = r["seat"]
+            self.log(f"client thread: sitting at seat {self.board_number}")
+
+            for i, board_state in enumerate(r["boards"]):
+                self.import_opponent(i, board_state)
+
+            self.sent_grid = None
+            last_send = 0
+
+            while self.client_run:
+                message = {}
+
+                # the websocket measures its round trip with its keep alive pings
+                if ws.latency:
+                    self.client.record_latency(ws.latency)
+
+                # push the rows of our board that changed, and the full board at
+                # least once a second to keep our seat alive and correct any drift
+                full = time.time() - last_send > 1
+                board_state = self.board_changes(full)
+                if board_state is not None:
+                    message["board"] = board_state
 
                 # SEND ATTACKS
                 if self.player_board.outgoing_attack_queue > 0:
@@ -243,58 +269,169 @@ class QuadBlox(Scene):
                     attacks = self.player_board.outgoing_attack_queue
                     # deduct the pending attacks from our board
                     self.player_board.outgoing_attack_queue -= attacks
+                    message["attack"] = attacks
 
-                    # write the attack to the server
-                    r = requests.post(
-                        f"{server}/games/line-clear-attack/{self.game_number}/{self.board_number}/{attacks}"
-                    )
+                if message:
+                    ws.send(json.dumps(message))
 
-                    self.log(r.json)
+                if full:
+                    last_send = time.time()
 
-                # IF DEAD CAN STOP HERE
-                if self.died_at:
+                # wait up to one tick for the server to push something to us
+                try:
+                    r = json.loads(ws.recv(timeout=1 / settings.FPS))
+                except TimeoutError:
                     continue
 
-                # GET ATTACKS
-                r = requests.get(
-                    f"{server}/games/get-attacks/{self.game_number}/{self.board_number}"
-                ).json()
-                self.log(f"got {r['lines']} attacks")
-                if r["lines"] > 0:
-                    self.player_board.add_line_to_bottom(r["lines"])
+                if r["type"] == "board":
+                    self.import_opponent(r["seat"], r["board"])
+
+                elif r["type"] == "attack":
+                    self.log(f"got {r['lines']} attacks")
+                    # IF DEAD WE IGNORE ATTACKS
+                    if not self.died_at:
+                        self.player_board.add_line_to_bottom(r["lines"])
+
+    def board_changes(self, full: bool = False, version: int = CODEC_PACKED) -> str | None:
+        """Returns our board to send to the server, either in full using the given
+        codec version or only the rows that changed since the last call. Returns
+        None when nothing changed.
+        """
+        grid = [row.copy() for row in self.player_board.grid]
+
+        if full or self.sent_grid is None:
+            self.sent_grid = grid
+            return self.player_board.export_board(version)
 
-            except:
-                self.log("something went wrong")
+        changed = [row for row in range(len(grid)) if grid[row] != self.sent_grid[row]]
+        self.sent_grid = grid
+
+        if not changed:
+            return None
+
+        return self.player_board.export_rows(changed)
+
+    def import_opponent(self, seat: int, board_state: str):
+        # skip our board
+        if seat == self.board_number:
+            return
+
+        # opponents are stored in seat order with our seat removed
+        board_to_update = seat if seat < self.board_number else seat - 1
+
+        if board_to_update < len(self.opponents):
+            self.opponents[board_to_update].import_board(board_state)
+
+    async def poll_client(self):
+        r = await self.client.get(f"/games/{self.game_number}/sit")
+        self.board_number = r["seat"]
+
+        # a server sharing its lobbies with other processes names the one hosting
+        # ours, talk to it directly rather than being redirected every call
+        if "server" in r:
+            self.client.server = r["server"].rstrip("/")
+
+        self.log(f"client thread: sitting at seat {self.board_number}")
+
+        # servers that track board revisions return one on every update, until
+        # we see one we stick to the full text format older servers understand
+        self.sent_grid = None
+        self.sent_revision = None
+        self.sync_revision = 0
+
+        while self.client_run:
+            try:
+                # SLEEP
+                await asyncio.sleep(0.5)
+
+                # the three exchanges don't depend on each other so run them
+                # side by side over the pooled connections
+                await asyncio.gather(
+                    self.poll_opponents(), self.poll_board(), self.poll_attacks()
+                )
+
+            except Exception as e:
+                self.log(f"something went wrong: {e}")
                 pass
 
-        self.log("client thread: shutting down")
+    async def poll_opponents(self):
+        # UPDATE OPPONENTS
+        self.log("client thread: updating opponents")
+
+        # servers that predate the packed codec or revisions ignore the extra
+        # parameters and send every board as text, which import_board reads
+        # just the same
+        r = await self.client.get(
+            f"/games/{self.game_number}",
+            version=CODEC_PACKED,
+            since=self.sync_revision,
+        )
 
-    def open_bag(self, num_bags=1):
+        if isinstance(r, list):
+            for i, board_state in enumerate(r):
+                self.import_opponent(i, board_state)
+        else:
+            for i, board_state in r["boards"].items():
+                self.import_opponent(int(i), board_state)
+            self.sync_revision = r["revision"]
 
-        for _ in range(num_bags):
+    async def poll_board(self):
+        # UPDATE OUR BOARD
+        self.log(f"client thread: updating our board {self.board_number}")
+        params = {}
 
-            bag = [
-                Shapes.I,
-                Shapes.J,
-                Shapes.L,
-                Shapes.O,
-                Shapes.S,
-                Shapes.T,
-                Shapes.Z,
-            ]
+        if self.sent_revision is None:
+            params["board_state"] = self.board_changes(True, CODEC_TEXT)
+        else:
+            # an empty set of rows still keeps our seat alive
+            params["board_state"] = (
+                self.board_changes() or self.player_board.export_rows([])
+            )
+            params["base"] = self.sent_revision
+
+        r = await self.client.post(
+            f"/games/update/{self.game_number}/{self.board_number}", **params
+        )
 
-            random.shuffle(bag)
+        if r.get("status") == "ok" and "revision" in r:
+            self.sent_revision = r["revision"]
+        else:
+            # our seat was reset or the server doesn't track revisions,
+            # send the whole board next time
+            self.sent_revision = None
+
+    async def poll_attacks(self):
+        exchanges = []
+
+        # SEND ATTACKS
+        if self.player_board.outgoing_attack_queue > 0:
+            # sample this incase there is a thread/race sync issue
+            attacks = self.player_board.outgoing_attack_queue
+            # deduct the pending attacks from our board
+            self.player_board.outgoing_attack_queue -= attacks
+
+            # write the attack to the server
+            exchanges.append(
+                self.client.post(
+                    f"/games/line-clear-attack/{self.game_number}/{self.board_number}/{attacks}"
+                )
+            )
 
-            for shape in bag:
-                self.piece_queue.append(Piece(shape))
+        # GET ATTACKS, unless we are dead
+        if not self.died_at:
+            exchanges.append(
+                self.client.get(
+                    f"/games/get-attacks/{self.game_number}/{self.board_number}"
+                )
+            )
 
-    def next_piece_in_queue(self):
-        # restock the queue if we are running low
-        while len(self.piece_queue) < 10:
-            self.open_bag()
+        results = await asyncio.gather(*exchanges)
 
-        # return the next piece
-        return self.piece_queue.pop(0)
+        if not self.died_at:
+            r = results[-1]
+            self.log(f"got {r['lines']} attacks")
+            if r["lines"] > 0:
+                self.player_board.add_line_to_bottom(r["lines"])
 
     def setup_opponents(self):
         for opponent in self.opponents:
@@ -323,182 +460,38 @@ class QuadBlox(Scene):
                     x += x_step
 
     def update_player(self):
-
-        # check for death
-        self.check_for_death()
-
         # if we are dead stop the update logic here
         if self.died_at:
             return
 
-        # check if we are already colliding. If we are, place the piece
-        if self.player_piece.collides(self.player_board):
-            self.place()
-            return
-
-        # developer mode
+        # developer mode, these aren't in the replay so it won't verify
         if settings.DEBUG:
             if pygame.K_i in self.game.just_pressed:
-                self.player_piece = Piece(Shapes.I)
+                self.player.piece = BitPiece(Shapes.I)
             if pygame.K_a in self.game.just_pressed:
                 self.player_board.add_line_to_bottom()
 
-        # check to swap piece
-        if pygame.K_TAB in self.game.just_pressed:
-            # swap the piece
-            if self.stored_piece is None:
-                self.log("Storing first piece")
-                self.stored_piece = self.player_piece
-                self.player_piece = self.next_piece
-                self.next_piece = self.next_piece_in_queue()
-            else:
-                self.log("Swapping stored piece")
-                self.player_piece, self.stored_piece = (
-                    self.stored_piece,
-                    self.player_piece,
-                )
-
-            # TODO: if there is a collision swap back (needs fixes with bounds checking/collision checking)
-            # if self.player_piece.collides(self.player_board):
-            #     print("The piece collided with the board, swapping back")
-            #     self.player_piece, self.stored_piece = self.stored_piece, self.player_piece
-
-            # set the new piece to the stored location
-            self.player_piece.x = 3
-            self.player_piece.y = 0
-
-        # LEFT / RIGHT MOVEMENT
-        left_held_tick = False
-        right_held_tick = False
-
-        # if player is holding both left and right reset the held counters
-        if self.game.pressed[pygame.K_LEFT] and self.game.pressed[pygame.K_RIGHT]:
-            self.held_left_for = 0
-            self.held_right_for = 0
-        else:
-            # left hold
-            if self.game.pressed[pygame.K_LEFT]:
-                self.held_left_for += 1
-                if self.held_left_for >= self.das_startup_frames:
-                    if (
-                        self.held_left_for - self.das_startup_frames
-                    ) % self.das_interval_frames == 0:
-                        left_held_tick = True
-            else:
-                self.held_left_for = 0
-
-            # right hold
-            if self.game.pressed[pygame.K_RIGHT]:
-                self.held_right_for += 1
-                if self.held_right_for >= self.das_startup_frames:
-                    if (
-                        self.held_right_for - self.das_startup_frames
-                    ) % self.das_interval_frames == 0:
-                        right_held_tick = True
-            else:
-                self.held_right_for = 0
-
-        sim_left_right = copy.deepcopy(self.player_piece)
-        if pygame.K_LEFT in self.game.just_pressed or left_held_tick:
-            sim_left_right.x -= 1
-
-        if pygame.K_RIGHT in self.game.just_pressed or right_held_tick:
-            sim_left_right.x += 1
-
-        # if the sim piece does not collide update our piece to it
-        if not sim_left_right.collides(self.player_board):
-            self.player_piece = sim_left_right
-
-        # ROTATION
-        sim_rotate = copy.deepcopy(self.player_piece)
-
-        if pygame.K_UP in self.game.just_pressed:
-            sim_rotate.rotate()
-            if not sim_rotate.collides(self.player_board):
-                self.player_piece = sim_rotate
-            else:
-                # try right one first
-                sim_rotate.x = self.player_piece.x + 1
-
-                if not sim_rotate.collides(self.player_board):
-                    self.player_piece = sim_rotate
-                else:
-                    # try left one if that didn't work
-                    sim_rotate.x = self.player_piece.x - 1
-
-                    if not sim_rotate.collides(self.player_board):
-                        self.player_piece = sim_rotate
-                    else:
-                        # for an i piece try 2 left
-                        if sim_rotate.shape == Shapes.I:
-
-                            # try left two (from the original piece)
-                            sim_rotate.x = self.player_piece.x - 2
-                            if not sim_rotate.collides(self.player_board):
-                                self.player_piece = sim_rotate
-
-        # DOWN MOVEMENT / GRAVITY
-        # should we fall this frame?
-        try_drop = False
-        user_drop = False
-
-        # check if down has been held for a while
-        if self.game.pressed[pygame.K_DOWN]:
-            self.held_down_for += 1
-            if self.held_down_for >= self.das_startup_frames:
-                if (
-                    self.held_down_for - self.das_startup_frames
-                ) % self.das_interval_frames == 0:
-                    try_drop = True
-                    user_drop = True
-
-        else:
-            self.held_down_for = 0
-
-        # check for key press down
-        if pygame.K_DOWN in self.game.just_pressed:
-            try_drop = True
-            user_drop = True
-
-        # if the user commands a down, increment the points by 1
-        if user_drop:
-            self.player_board.points += 1
-
-        # increment drop count and see if we need to drop the piece
-        self.drop_count += 1
-        if self.drop_count >= self.drop_at:
-            try_drop = True
-
-        # perform the drop if needed
-        if try_drop:
-
-            # if we are dropping the piece, reset the drop count
-            self.drop_count = 0
-            sim_drop = copy.deepcopy(self.player_piece)
-            sim_drop.y += 1
-            if not sim_drop.collides(self.player_board):
-                self.player_piece = sim_drop
-            else:
-                self.place()
-
-        # solve projected piece and move to it if commanded to
-        projected = copy.deepcopy(self.player_piece)
-        while not projected.collides(self.player_board):
-            projected.y += 1
-
-        projected.y -= 1
-
-        if projected.y > self.player_piece.y:
-            self.projected_piece = projected
-            if pygame.K_SPACE in self.game.just_pressed:
-                self.drop_count = 0
-                self.player_board.points += self.projected_piece.y - self.player_piece.y
-                self.player_piece = self.projected_piece
-        else:
-            self.projected_piece = None
-
-        # check for death
-        self.check_for_death()
+        held = 0
+        pressed = 0
+        for key, bit in [
+            (pygame.K_LEFT, LEFT),
+            (pygame.K_RIGHT, RIGHT),
+            (pygame.K_UP, ROTATE),
+            (pygame.K_DOWN, DOWN),
+            (pygame.K_SPACE, DROP),
+            (pygame.K_TAB, HOLD),
+        ]:
+            if self.game.pressed[key]:
+                held |= bit
+            if key in self.game.just_pressed:
+                pressed |= bit
+
+        results = self.player.step(held, pressed)
+        if results is not None:
+            self.placed(results)
+
+        if self.player.over:
+            self.kill_player()
 
     def update(self):
         # if the user presses escape or F5 key, quit the event loop.
@@ -510,54 +503,49 @@ class QuadBlox(Scene):
         self.update_player()
 
         # update particle effects
-        self.particle_group.update()
-
-        # check for end of 40 line rush if we are still alive
-        if not self.died_frame:
-            if (
-                self.game.qb_mode == QBMode.SoloForty
-                and self.player_board.lines_cleared >= 40
-            ):
-                self.kill_player()
-
-                self.high_score = {
-                    "player": os.getlogin(),
-                    "time": (self.died_frame - self.start_frame) * 1.0 / 60.0,
-                    "lines": self.player_board.lines_cleared,
-                    "pieces": self.player_board.blocks_placed,
-                    "score": self.player_board.points,
-                    "frames": self.died_frame - self.start_frame,
-                }
-
-                self.high_score_client = threading.Thread(target=self.high_score_thread)
-                self.high_score_client.start()
-
-    def check_for_death(self):
-        if self.died_at:
-            return
-
-        # check for death
-        for x in range(10):
-            for y in range(4):
-                if self.player_board.grid[y][x]:
-                    self.kill_player()
+        self.particles.update()
 
     def kill_player(self):
         self.died_at = self.elapsed()
         self.died_frame = self.game.frame_count()
         self.player_board.kill()
-        self.projected_piece = None
-
-    def place(self):
-        # place the current piece and get a new piece
-        results = self.player_board.place(self.player_piece)
-        self.drop_at = self.player_board.level_speed()
-        self.player_piece = self.next_piece
-        self.next_piece = self.next_piece_in_queue()
-        # restart the delay for down being held to slow up the next place pieced
-        # from dropping right away when just placed
-        self.held_down_for = 0
 
+        if self.game.qb_mode == QBMode.Multiplayer:
+            return
+
+        self.replay = Replay.of(self.player)
+        self.save_replay()
+
+        # a finished 40 line rush goes on the leaderboard, timed by the frames
+        # played like the server's replay check, so time paused doesn't count
+        if self.player.finished:
+            self.high_score = {
+                "player": os.getlogin(),
+                "time": self.player.frame / 60.0,
+                "lines": self.player_board.lines_cleared,
+                "pieces": self.player_board.blocks_placed,
+                "score": self.player_board.points,
+                "frames": self.player.frame,
+            }
+
+            self.high_score_client = threading.Thread(target=self.high_score_thread)
+            self.high_score_client.start()
+
+    def save_replay(self):
+        """Keep the replay in replays/ to play back with qbplayback.py"""
+        if settings.WASM:
+            return
+
+        try:
+            os.makedirs("replays", exist_ok=True)
+            name = f"{self.player.mode.name.lower()}-{time.strftime('%Y%m%d-%H%M%S')}.qbr"
+            with open(os.path.join("replays", name), "wb") as f:
+                f.write(self.replay.encode())
+        except OSError as e:
+            self.log(f"couldn't save the replay: {e}")
+
+    def placed(self, results: list[dict]):
+        # a piece was placed, with results for any lines it cleared
         if len(results):
             # self.log(f"Lines cleared: {len(lines_cleared)} {lines_cleared}")
             clear_sound = ""
@@ -571,15 +559,29 @@ class QuadBlox(Scene):
             else:
                 clear_sound = "level-up-bonus-sequence-1-186890"
 
-            # generate particles for the cleared lines
-            for row in results:
-                for col in range(10):
-                    for _ in range(len(results)):
-                        self.particle_group.add(
-                            BoxParticle(
-                                row["row"], col, row["blocks"][col], self.player_board
-                            )
-                        )
+            # generate particles for the cleared lines, every cleared block as
+            # many times over as there were lines
+            lines = len(results)
+            pos = self.player_board.pos
+            bs = self.player_board.block_size
+            rng = self.particle_rng
+
+            blocks = np.array([row["blocks"] for row in results])
+            rows, cols = np.indices(blocks.shape)
+            rows = np.array([row["row"] for row in results])[rows]
+            n = blocks.size * lines
+
+            self.particles.emit(
+                np.column_stack(
+                    [
+                        pos[0] + bs * np.tile(cols.ravel(), lines),
+                        pos[1] + bs * np.tile(rows.ravel(), lines),
+                    ]
+                ),
+                np.column_stack([rng.uniform(-0.25, 0.25, n), rng.uniform(-1.5, -0.5, n)]),
+                np.tile(blocks.ravel(), lines),
+                rng.integers(64, 64 * 3, n, endpoint=True),
+            )
 
             # self.play_sound("jsfxr-qb-lines-explode")
             self.play_sound(clear_sound)
@@ -587,16 +589,17 @@ class QuadBlox(Scene):
             self.play_sound("jsfxr-drop2")
 
     def draw_projected_piece(self):
-        if self.projected_piece is not None:
+        projected_piece = self.player.projected_piece
+        if projected_piece is not None and not self.died_at:
             for x in range(4):
                 for y in range(4):
-                    if self.projected_piece.grid[y][x]:
+                    if projected_piece.grid[y][x]:
                         pygame.draw.rect(
                             self.screen,
                             (140, 140, 140),
                             (
-                                (self.projected_piece.x + x) * 12 + 100,
-                                (self.projected_piece.y + y) * 12
+                                (projected_piece.x + x) * 12 + 100,
+                                (projected_piece.y + y) * 12
                                 + 10
                                 + math.sin(self.elapsed() * 12) * 2,
                                 12 - 1,
@@ -623,7 +626,7 @@ class QuadBlox(Scene):
 
         # draw the particle effects
 
-        self.particle_group.draw(self.screen)
+        self.particles.draw(self.screen)
 
     def draw_texts(self):
 
@@ -634,6 +637,9 @@ class QuadBlox(Scene):
         self.texts["level"].text = str(self.player_board.level)
         self.texts["next_level"].text = str(self.player_board.next_level)
 
+        if "ping" in self.texts and self.client.latency_ms is not None:
+            self.texts["ping"].text = f"{self.client.latency_ms:.0f} ms"
+
         # for text in self.texts.values():
         #     text.draw()
         self.draw_text()
@@ -675,27 +681,28 @@ class QuadBlox(Scene):
     def draw_piece_queue(self):
         y = 160
 
-        for i, piece in enumerate(self.piece_queue):
+        for i, piece in enumerate(self.player.piece_queue):
             self.draw_arbitrary_piece(piece, (10, y, 10 - i), 10 - i)
             y += 5 * (10 - i)
 
     def draw_stored_piece(self):
-        if self.stored_piece is not None:
-            self.draw_arbitrary_piece(self.stored_piece, (10, 30))
+        if self.player.stored_piece is not None:
+            self.draw_arbitrary_piece(self.player.stored_piece, (10, 30))
 
     def draw_next_piece(self):
-        self.draw_arbitrary_piece(self.next_piece, (10, 110))
+        self.draw_arbitrary_piece(self.player.next_piece, (10, 110))
 
     def draw_piece(self):
+        player_piece = self.player.piece
         for x in range(4):
             for y in range(4):
-                if self.player_piece.grid[y][x]:
+                if player_piece.grid[y][x]:
                     pygame.draw.rect(
                         self.screen,
-                        colors[self.player_piece.color],
+                        colors[player_piece.color],
                         (
-                            (self.player_piece.x + x) * 12 + 100,
-                            (self.player_piece.y + y) * 12 + 10,
+                            (player_piece.x + x) * 12 + 100,
+                            (player_piece.y + y) * 12 + 10,
                             12 - 1,
                             12 - 1,
                         ),
@@ -727,23 +734,11 @@ class QuadBlox(Scene):
                 (0.25, 0.09),
             )
 
-        # draw a red horizontal line after the first 4 rows
-        pygame.draw.line(
-            self.screen,
-            (255, 0, 0),
-            (pos[0], pos[1] + 4 * bs - 1),
-            (pos[0] + 10 * bs - 1, pos[1] + 4 * bs - 1),
-        )
-
-        # draw the board
-        for y, row in enumerate(board.grid):
-            for x, cell in enumerate(row):
-                if cell:
-                    pygame.draw.rect(
-                        self.screen,
-                        colors[cell],
-                        (pos[0] + x * bs, pos[1] + y * bs, bs - 1, bs - 1),
-                    )
+        # draw the board, and the red line after the first 4 rows
+        board_surface = self.board_surfaces.get(board)
+        if board_surface is None or board_surface.block_size != bs:
+            board_surface = self.board_surfaces[board] = BoardSurface(board)
+        self.screen.blit(board_surface.update(), pos)
 
         # draw a grey border around the board
         border_width = 4
@@ -769,10 +764,7 @@ class QuadBlox(Scene):
         # format elapsed time to a string with 3 decimal places
         # real_time = f"{self.elapsed():.3f}"
 
-        if self.died_frame:
-            fr = self.died_frame - self.start_frame
-        else:
-            fr = self.game.frame_count() - self.start_frame
+        fr = self.player.frame
         et = fr * 1.0 / 60.0
 
         lpm = 0
@@ -786,26 +778,26 @@ class QuadBlox(Scene):
         dd = 0
         dr = 0
 
-        if self.held_left_for >= self.das_startup_frames:
+        if self.player.held_left_for >= self.player.das_startup_frames:
             dl = (
-                self.held_left_for - self.das_startup_frames
-            ) % self.das_interval_frames
+                self.player.held_left_for - self.player.das_startup_frames
+            ) % self.player.das_interval_frames
         else:
-            dl = self.held_left_for
+            dl = self.player.held_left_for
 
-        if self.held_down_for >= self.das_startup_frames:
+        if self.player.held_down_for >= self.player.das_startup_frames:
             dd = (
-                self.held_down_for - self.das_startup_frames
-            ) % self.das_interval_frames
+                self.player.held_down_for - self.player.das_startup_frames
+            ) % self.player.das_interval_frames
         else:
-            dd = self.held_down_for
+            dd = self.player.held_down_for
 
-        if self.held_right_for >= self.das_startup_frames:
+        if self.player.held_right_for >= self.player.das_startup_frames:
             dr = (
-                self.held_right_for - self.das_startup_frames
-            ) % self.das_interval_frames
+                self.player.held_right_for - self.player.das_startup_frames
+            ) % self.player.das_interval_frames
         else:
-            dr = self.held_right_for
+            dr = self.player.held_right_for
 
         x = settings.RESOLUTION[0] // 2
         y = 30
@@ -830,7 +822,7 @@ class QuadBlox(Scene):
             y += 40
 
             self.texts["solo_drop"] = self.Text(
-                f"{self.drop_at} : {self.drop_count}", (x, y)
+                f"{self.player.drop_at} : {self.player.drop_count}", (x, y)
             )
             y += 40
 
@@ -843,5 +835,5 @@ class QuadBlox(Scene):
             self.texts["solo_blocks_placed"].text = str(self.player_board.blocks_placed)
             self.texts["solo_bpm"].text = f"{bpm:.1f}"
             self.texts["solo_lpm"].text = f"{lpm:.1f}"
-            self.texts["solo_drop"].text = f"{self.drop_at} : {self.drop_count}"
+            self.texts["solo_drop"].text = f"{self.player.drop_at} : {self.player.drop_count}"
             self.texts["solo_das"].text = f"{dl} : {dd} : {dr}"
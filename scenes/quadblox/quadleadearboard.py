@@ -1,8 +1,8 @@
 import pygame
 from scene import Scene
 from utils import *
+from .scripts.qbclient import QBClient
 import threading
-import requests
 
 
 class QuadLeaderboard(Scene):
@@ -26,10 +26,10 @@ class QuadLeaderboard(Scene):
     def thread_get_leaderboard(self):
         self.log("thread_get_leaderboard starting")
 
-        server = self.game.config["main"]["server"]
+        client = QBClient(self.game.config["main"]["server"])
 
         try:
-            j = requests.get(f"{server}/leaderboard").json()
+            j = client.request("GET", "/leaderboard")
             self.log(j)
             new_texts = [self.standard_text("Leaderboard", 40)]
             for i, score in enumerate(j):
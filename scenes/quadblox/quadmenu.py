@@ -7,6 +7,8 @@ import math
 
 
 class QuadMenu(Scene):
+    sounds = ["click", "jsxfr-select"]
+
     def __init__(self, game):
         super().__init__(game)
 
@@ -19,12 +21,13 @@ class QuadMenu(Scene):
         self.standard_font_size = 40
         self.text_choose = self.standard_text("Mode Selection")
         self.standard_font_size = 20
+        # copies as the shared text surfaces get their alpha changed below
         self.options = [
-            self.standard_text("Multiplayer"),
-            self.standard_text("40 Line Rush"),
-            self.standard_text("Solo Endless"),
-            self.standard_text("Leaderboard"),
-            self.standard_text("Quit"),
+            self.standard_text("Multiplayer").copy(),
+            self.standard_text("40 Line Rush").copy(),
+            self.standard_text("Solo Endless").copy(),
+            self.standard_text("Leaderboard").copy(),
+            self.standard_text("Quit").copy(),
         ]
         self.selected = 0
 
@@ -1,8 +1,12 @@
 from enum import Enum, auto
+import base64
+import itertools
 import random
 import time
 import copy
 
+import numpy as np
+
 # from https://colorkit.co/palette/ffadad-ffd6a5-fdffb6-caffbf-9bf6ff-a0c4ff-bdb2ff-ffc6ff/
 colors = [
     (0, 0, 0),
@@ -18,6 +22,17 @@ colors = [
 ]
 
 
+# board state string formats understood by Board.import_board
+CODEC_TEXT = 1  # ";" separated rows of ":" separated cells, the original format
+CODEC_PACKED = 2  # CODEC_PACKED_TAG + urlsafe base64 of a row bitmap and 4 bit cells
+CODEC_PACKED_TAG = "v2."
+CODEC_ROWS_TAG = "d2."  # like CODEC_PACKED but only the rows listed in its bitmap
+
+# every change to any board takes the next revision, so revisions from different
+# boards can be compared against a single `since` value (see qbfastapi.py)
+_revisions = itertools.count(1)
+
+
 class QBMode(Enum):
     Multiplayer = auto()
     SoloEndless = auto()
@@ -182,6 +197,9 @@ class Board:
             for _ in range(self.rows)
         ]
         self.block_size = block_size
+        self.revision = 0
+        self.row_revisions = [0] * self.rows
+        self.touch()
         self.game_over = True
         self.attacks_waiting = 0
         self.outgoing_attack_queue = 0
@@ -259,6 +277,33 @@ class Board:
     def zero_timeout(self):
         self.last_update = 0
 
+    def touch(self, rows: list[int] | None = None):
+        """Record a change to the grid by giving the changed rows and the
+        board the next revision.
+
+        Args:
+            rows (list[int] | None, optional): The rows that changed. Defaults to all rows.
+        """
+        revision = next(_revisions)
+
+        if rows is None:
+            rows = range(self.rows)
+
+        # stamp the rows before the board so anyone reading the board's revision
+        # never sees it ahead of its rows
+        for row in rows:
+            self.row_revisions[row] = revision
+
+        self.revision = revision
+
+    def rows_since(self, revision: int) -> list[int]:
+        """Returns the rows that changed after the given revision"""
+        return [
+            row
+            for row, row_revision in enumerate(self.row_revisions)
+            if row_revision > revision
+        ]
+
     def place(self, piece: Piece) -> list[dict]:
         self.blocks_placed += 1
         for row in range(piece.box_size):
@@ -266,17 +311,15 @@ class Board:
                 if piece.grid[row][col]:
                     self.grid[piece.y + row][piece.x + col] = piece.color
 
+        self.touch()
         return self.score()
 
     def score(self) -> list[dict]:
-        results = []
-        lines_cleared = 0
-        for row in range(self.rows):
-            if all(self.grid[row]):
-                lines_cleared += 1
-                results.append({"row": row, "blocks": copy.deepcopy(self.grid[row])})
-                self.grid.pop(row)
-                self.grid.insert(0, [0 for _ in range(self.cols)])
+        results = self.clear_lines()
+        lines_cleared = len(results)
+
+        if lines_cleared:
+            self.touch()
 
         self.lines_cleared += lines_cleared
 
@@ -295,6 +338,21 @@ class Board:
 
         return results
 
+    def clear_lines(self) -> list[dict]:
+        """Remove the full rows, dropping the rows above them down.
+
+        Returns:
+            list[dict]: the row number and blocks of each row cleared
+        """
+        results = []
+        for row in range(self.rows):
+            if all(self.grid[row]):
+                results.append({"row": row, "blocks": copy.deepcopy(self.grid[row])})
+                self.grid.pop(row)
+                self.grid.insert(0, [0 for _ in range(self.cols)])
+
+        return results
+
     def dead(self):
         return (
             any(self.grid[0])
@@ -306,12 +364,14 @@ class Board:
     def clear(self):
         self.attacks_waiting = 0
         self.grid = [[0 for _ in range(self.cols)] for _ in range(self.rows)]
+        self.touch()
 
     def kill(self):
         self.grid = [
             [random.randint(1, len(colors) - 1) for _ in range(self.cols)]
             for _ in range(self.rows)
         ]
+        self.touch()
 
     def reset(self):
         self.score = 0
@@ -320,24 +380,81 @@ class Board:
         self.blocks_placed = 0
         self.clear()
 
-    def export_board(self) -> str:
+    def export_board(self, version: int = CODEC_TEXT) -> str:
         """Export the board state as a string usable by the import function
 
+        Args:
+            version (int, optional): CODEC_TEXT for the original format older
+            clients and servers understand or CODEC_PACKED for the compact
+            format. Defaults to CODEC_TEXT.
+
         Returns:
-            str: _description_
+            str: the board state, safe to use in a url query string
         """
+        if version == CODEC_PACKED:
+            return CODEC_PACKED_TAG + pack_grid(self.grid)
+
         return ";".join(":".join(str(cell) for cell in row) for row in self.grid)
 
+    def export_rows(self, rows: list[int]) -> str:
+        """Export only the given rows, for sending the changes since an earlier
+        export. import_board applies it on top of the board's current grid.
+
+        Args:
+            rows (list[int]): The rows to export
+
+        Returns:
+            str: the rows in the CODEC_ROWS format
+        """
+        include = [False] * self.rows
+        for row in rows:
+            include[row] = True
+
+        return CODEC_ROWS_TAG + pack_rows(self.grid, include)
+
     def import_board(self, board_state_string: str) -> None:
-        """Import a board state from a string
+        """Import a board state from a string in any of the export formats,
+        including the partial board from export_rows
 
         Args:
             board_state_string (str): The string to import
+
+        Raises:
+            ValueError: if the string isn't a board of this size with cells from colors
         """
-        self.grid = [
-            [int(cell) for cell in row.split(":")]
-            for row in board_state_string.split(";")
-        ]
+        if board_state_string.startswith(CODEC_PACKED_TAG):
+            grid = unpack_grid(
+                board_state_string[len(CODEC_PACKED_TAG) :], self.rows, self.cols
+            )
+        elif board_state_string.startswith(CODEC_ROWS_TAG):
+            grid = [row for row in self.grid]
+            changes = unpack_rows(
+                board_state_string[len(CODEC_ROWS_TAG) :], self.rows, self.cols
+            )
+            for row, cells in changes.items():
+                grid[row] = cells
+        else:
+            grid = [
+                [int(cell) for cell in row.split(":")]
+                for row in board_state_string.split(";")
+            ]
+
+        # boards come off the network, one that's the wrong shape or has cells
+        # we have no color for would break every export of it after
+        if len(grid) != self.rows or any(
+            len(row) != self.cols or min(row) < 0 or max(row) >= len(colors)
+            for row in grid
+        ):
+            raise ValueError(
+                f"board must be {self.rows} rows of {self.cols} cells from 0 to {len(colors) - 1}"
+            )
+
+        # only bump the revision for the rows that actually changed
+        changed = [row for row in range(self.rows) if grid[row] != self.grid[row]]
+        self.grid = grid
+        if changed:
+            self.touch(changed)
+
         self.last_update = time.time()  # for server
 
     def timeout(self):
@@ -354,5 +471,106 @@ class Board:
             # empty 1 cell
             self.grid[-1][random.randint(0, self.cols - 1)] = 0
 
+        self.touch()
+
     def __str__(self):
         return "\n".join("".join(str(cell) for cell in row) for row in self.grid)
+
+
+def pack_grid(grid: list[list[int]]) -> str:
+    """Pack a board grid into the CODEC_PACKED payload (without the version tag).
+
+    The payload starts with a bitmap holding one bit per row, set for rows that
+    contain any blocks. Only those rows follow, two cells per byte with the high
+    nibble first. An empty 24x10 board packs to 4 characters and a full one to
+    164, against ~480 for the text format.
+
+    Args:
+        grid (list[list[int]]): rows of color indexes, each less than 16
+
+    Returns:
+        str: urlsafe base64 without padding
+    """
+    return pack_rows(grid, [any(row) for row in grid])
+
+
+def pack_rows(grid: list[list[int]], include: list[bool]) -> str:
+    """Pack the included rows of a grid behind a bitmap of which rows they are.
+
+    Args:
+        grid (list[list[int]]): rows of color indexes, each less than 16
+        include (list[bool]): one flag per row, True to pack the row
+
+    Returns:
+        str: urlsafe base64 without padding
+
+    Raises:
+        ValueError: if a cell doesn't fit in its 4 bits
+    """
+    cells = np.asarray(grid)
+
+    # anything past 15 would run into the next cell's nibble
+    if cells.size and (cells.min() < 0 or cells.max() > 15):
+        raise ValueError("cells must be from 0 to 15 to pack")
+
+    cells = cells.astype(np.uint8)
+    rows, cols = cells.shape
+
+    # pad odd widths so every row fills whole bytes
+    if cols % 2:
+        cells = np.pad(cells, ((0, 0), (0, 1)))
+
+    include = np.asarray(include, dtype=bool)
+    bitmap = np.packbits(include).tobytes()
+
+    kept = cells[include]
+    packed = (kept[:, 0::2] << 4) | kept[:, 1::2]
+
+    return base64.urlsafe_b64encode(bitmap + packed.tobytes()).decode().rstrip("=")
+
+
+def unpack_grid(payload: str, rows: int = 24, cols: int = 10) -> list[list[int]]:
+    """Unpack a CODEC_PACKED payload made by pack_grid back into a grid.
+
+    Args:
+        payload (str): urlsafe base64, padding optional
+        rows (int, optional): rows in the board. Defaults to 24.
+        cols (int, optional): columns in the board. Defaults to 10.
+
+    Returns:
+        list[list[int]]: the board grid
+    """
+    grid = [[0] * cols for _ in range(rows)]
+
+    for row, cells in unpack_rows(payload, rows, cols).items():
+        grid[row] = cells
+
+    return grid
+
+
+def unpack_rows(payload: str, rows: int = 24, cols: int = 10) -> dict[int, list[int]]:
+    """Unpack a payload made by pack_rows.
+
+    Args:
+        payload (str): urlsafe base64, padding optional
+        rows (int, optional): rows in the board. Defaults to 24.
+        cols (int, optional): columns in the board. Defaults to 10.
+
+    Returns:
+        dict[int, list[int]]: the cells of each included row keyed by row number
+    """
+    data = base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+    bitmap_size = (rows + 7) // 8
+    row_bytes = (cols + 1) // 2
+
+    included = np.unpackbits(np.frombuffer(data, np.uint8, bitmap_size))[:rows]
+    packed = np.frombuffer(data, np.uint8, offset=bitmap_size).reshape(-1, row_bytes)
+
+    if len(packed) != included.sum():
+        raise ValueError("packed board does not match its row bitmap")
+
+    cells = np.empty((len(packed), row_bytes * 2), dtype=np.uint8)
+    cells[:, 0::2] = packed >> 4
+    cells[:, 1::2] = packed & 0x0F
+
+    return dict(zip(np.flatnonzero(included).tolist(), cells[:, :cols].tolist()))
@@ -0,0 +1,185 @@
+# description: a bitboard take on qb's Board and Piece with the same api. each
+# board row is also kept as an int with a bit per cell, walled in on both sides,
+# and every piece's four rotations are worked out once up front, so collisions,
+# line clears and dead() are a few integer ops per row instead of walking cells.
+# the grid of colors is still there for drawing and the export formats.
+
+import random
+
+from .qb import Board, Piece, Shapes
+
+WALL = 4  # wall bits either side of a row, as wide as a piece can reach out
+
+
+def row_bits(cells) -> int:
+    """A row of cells as a bitmask, bit n set when cell n isn't empty"""
+    bits = 0
+    for col, cell in enumerate(cells):
+        if cell:
+            bits |= 1 << col
+    return bits
+
+
+# the columns set in each 4 bit piece row, for coloring in the grid
+BIT_COLUMNS = [[col for col in range(4) if bits >> col & 1] for bits in range(16)]
+
+
+def make_rotations(shape: Shapes) -> tuple[tuple[tuple[int, ...], ...], ...]:
+    """Every rotation of a shape, found by turning a Piece the way it always
+    has been. Entry n is the grid after n + 1 turns from the shape's start."""
+    piece = Piece.__new__(Piece)
+    piece.shape = shape
+    piece.box_size = 4
+    piece.grid = [[0] * 4 for _ in range(4)]
+    piece.set_shape()
+
+    rotations = []
+    for _ in range(4):
+        piece.rotate()
+        rotations.append(tuple(tuple(row) for row in piece.grid))
+    return tuple(rotations)
+
+
+ROTATIONS = {shape: make_rotations(shape) for shape in Shapes}
+ROTATION_BITS = {
+    shape: tuple(tuple(row_bits(row) for row in grid) for grid in rotations)
+    for shape, rotations in ROTATIONS.items()
+}
+
+
+class BitPiece(Piece):
+    """A Piece that looks its rotations up in ROTATIONS. grid is one of the
+    shared rotation tables, don't change it."""
+
+    def __init__(self, shape: Shapes | None = None, rotation: int | None = None):
+        if shape is None:
+            shape = random.choice(list(Shapes))
+
+        self.x = 4
+        self.y = 0
+        self.shape = shape
+        self.box_size = 4
+        self.color = int(shape.value)
+
+        # the shape's tables, kept here as hashing the enum on every lookup
+        # adds up
+        self.rotations = ROTATIONS[shape]
+        self.rotation_bits = ROTATION_BITS[shape]
+
+        # 1-4 turns from the shape's start like Piece, unless we're told
+        if rotation is None:
+            rotation = random.randint(1, 4) - 1
+        self.rotation = rotation
+
+    @property
+    def grid(self) -> tuple[tuple[int, ...], ...]:
+        return self.rotations[self.rotation]
+
+    @property
+    def bits(self) -> tuple[int, ...]:
+        """The piece's rows as bitmasks, bit 0 being its left column"""
+        return self.rotation_bits[self.rotation]
+
+    def __deepcopy__(self, memo):
+        # past the numbers there's only the shape and its shared tables, none
+        # of which ever change, so the scene's copy.deepcopy can skip them
+        piece = BitPiece.__new__(BitPiece)
+        piece.__dict__.update(self.__dict__)
+        return piece
+
+    def rotate(self):
+        self.rotation = (self.rotation + 1) % 4
+
+    def reverse_rotate_and_size(self):
+        self.rotation = (self.rotation + 3) % 4
+
+    def collides(self, board) -> bool:
+        if not isinstance(board, BitBoard):
+            return super().collides(board)
+
+        # past the left wall, no piece reaches that far out
+        shift = self.x + WALL
+        if shift < 0:
+            return True
+
+        for row, bits in enumerate(self.bits):
+            if not bits:
+                continue
+
+            y = self.y + row
+            if y >= board.rows:
+                return True
+
+            # above the board there are only the walls to hit
+            if (bits << shift) & (board.bits[y] if y >= 0 else board.walls):
+                return True
+
+        return False
+
+
+class BitBoard(Board):
+    """A Board that keeps a bitmask per row alongside the grid of colors. Only
+    change the grid through the board's methods or by assigning a whole new
+    grid, the bitmasks won't know about cells set by hand."""
+
+    @property
+    def grid(self) -> list[list[int]]:
+        return self._grid
+
+    @grid.setter
+    def grid(self, grid: list[list[int]]):
+        self._grid = grid
+        self.sync_bits()
+
+    def sync_bits(self):
+        """Work out every row's bitmask again from the grid"""
+        wall = (1 << WALL) - 1
+        self.walls = wall | wall << (WALL + self.cols)
+        self.full_row = (1 << (self.cols + WALL * 2)) - 1
+        self.bits = [row_bits(row) << WALL | self.walls for row in self._grid]
+
+    def place(self, piece: Piece) -> list[dict]:
+        self.blocks_placed += 1
+
+        if isinstance(piece, BitPiece):
+            piece_bits = piece.bits
+        else:
+            piece_bits = [row_bits(row) for row in piece.grid]
+
+        changed = []
+        for row, bits in enumerate(piece_bits):
+            if not bits:
+                continue
+
+            y = piece.y + row
+            self.bits[y] |= bits << (piece.x + WALL)
+            cells = self._grid[y]
+            for col in BIT_COLUMNS[bits]:
+                cells[piece.x + col] = piece.color
+            changed.append(y)
+
+        # only the piece's rows changed, unless it clears lines
+        self.touch(changed)
+        return self.score()
+
+    def clear_lines(self) -> list[dict]:
+        if self.full_row not in self.bits:
+            return []
+
+        full = [row for row, bits in enumerate(self.bits) if bits == self.full_row]
+
+        # the cleared rows leave the grid, so they can be handed out as is
+        results = [{"row": row, "blocks": self._grid[row]} for row in full]
+
+        kept = [row for row, bits in enumerate(self.bits) if bits != self.full_row]
+        self._grid = [[0] * self.cols for _ in full] + [self._grid[row] for row in kept]
+        self.bits = [self.walls] * len(full) + [self.bits[row] for row in kept]
+
+        return results
+
+    def dead(self):
+        return (self.bits[0] | self.bits[1] | self.bits[2] | self.bits[3]) != self.walls
+
+    def add_line_to_bottom(self, num_lines: int = 1):
+        super().add_line_to_bottom(num_lines)
+        self.sync_bits()
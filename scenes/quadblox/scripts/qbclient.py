@@ -0,0 +1,114 @@
+import asyncio
+import time
+import urllib.parse
+
+import requests
+import requests.adapters
+import websockets.exceptions
+import websockets.sync.client
+
+MAX_REDIRECTS = 3
+
+
+class QBClient:
+    """Networking for the QuadBlox scenes. Keeps a pooled requests session so
+    repeated calls reuse their connections (and TLS sessions) instead of doing
+    a fresh handshake per call, offers async wrappers so several calls can be
+    in flight at once, and tracks the round trip latency to the server.
+    """
+
+    def __init__(self, server: str, pool_size: int = 4, timeout: float = 5):
+        """Create a client for the given server.
+
+        Args:
+            server (str): The server's base url such as https://quadblox.binarydragonstudios.com
+            pool_size (int, optional): The most connections kept open to the server. Defaults to 4.
+            timeout (float, optional): Seconds to wait on a request before giving up. Defaults to 5.
+        """
+        self.server = server.rstrip("/")
+        self.timeout = timeout
+
+        # smoothed round trip time in milliseconds, None until the first reply
+        self.latency_ms: float | None = None
+
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, path: str, **kwargs):
+        """Make a blocking request to the server and return the decoded json.
+
+        Args:
+            method (str): The http method such as GET or POST
+            path (str): The path on the server such as /games/0
+
+        Returns:
+            any: The json response
+        """
+        start = time.perf_counter()
+        r = self.session.request(
+            method, self.server + path, timeout=self.timeout, **kwargs
+        )
+        self.record_latency(time.perf_counter() - start)
+
+        return r.json()
+
+    async def get(self, path: str, **params):
+        """Async GET that runs on a worker thread so other requests and the
+        event loop keep going while it waits on the server."""
+        return await asyncio.to_thread(self.request, "GET", path, params=params)
+
+    async def post(self, path: str, **params):
+        """Async POST that runs on a worker thread so other requests and the
+        event loop keep going while it waits on the server."""
+        return await asyncio.to_thread(self.request, "POST", path, params=params)
+
+    def socket(self, path: str):
+        """Open a websocket to the server that pings every second, so
+        record_latency can be fed from its latency attribute. A server that
+        redirects us to the process hosting the lobby is followed, and talked
+        to directly from then on.
+
+        Args:
+            path (str): The path on the server such as /games/0/ws
+
+        Returns:
+            websockets.sync.client.ClientConnection: the open connection
+        """
+        url = self.server.replace("https://", "wss://").replace("http://", "ws://")
+        url += path
+
+        # the sync client doesn't follow redirects itself
+        for _ in range(MAX_REDIRECTS):
+            try:
+                return websockets.sync.client.connect(
+                    url, open_timeout=self.timeout, ping_interval=1
+                )
+            except websockets.exceptions.InvalidStatus as e:
+                location = e.response.headers.get("Location")
+                if e.response.status_code not in (301, 302, 307, 308) or not location:
+                    raise
+
+            url = urllib.parse.urljoin(url, location)
+            parts = urllib.parse.urlsplit(url)
+            scheme = "https" if parts.scheme == "wss" else "http"
+            self.server = f"{scheme}://{parts.netloc}"
+
+        return websockets.sync.client.connect(
+            url, open_timeout=self.timeout, ping_interval=1
+        )
+
+    def record_latency(self, seconds: float):
+        """Fold a new round trip measurement into latency_ms"""
+        ms = seconds * 1000
+
+        if self.latency_ms is None:
+            self.latency_ms = ms
+        else:
+            self.latency_ms = self.latency_ms * 0.8 + ms * 0.2
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,365 @@
+# description: a quadblox player's game without pygame. the scene hands it the
+# keys held and pressed each frame and draws what it leaves behind, the server
+# and qbplayback.py hand it a recorded replay instead. all of its randomness
+# comes from one generator seeded up front, so the same seed and the same keys
+# always play out the same game.
+
+import copy
+import random
+
+from .qb import QBMode, Shapes
+from .qbbits import BitBoard, BitPiece
+
+# the keys the game listens to, as bits so a frame's keys fit in a byte
+LEFT = 1
+RIGHT = 2
+ROTATE = 4
+DOWN = 8
+DROP = 16
+HOLD = 32
+
+FORTY_LINES = 40  # lines to clear in a 40 line rush
+
+
+class PlayerGame:
+    """One player's falling pieces on one board, a frame at a time.
+
+    Args:
+        seed (int | None, optional): Seed for the bags and the pieces' rotations. Defaults to a random one.
+        mode (QBMode, optional): The mode being played, a 40 line rush finishes itself. Defaults to QBMode.SoloEndless.
+        board (BitBoard | None, optional): The board to play on, cleared first. Defaults to a new one.
+        project (bool, optional): Work out where the piece would land every frame for drawing, otherwise only when it's dropped. Defaults to True.
+    """
+
+    def __init__(
+        self,
+        seed: int | None = None,
+        mode: QBMode = QBMode.SoloEndless,
+        board: BitBoard | None = None,
+        project: bool = True,
+    ):
+        if seed is None:
+            seed = random.getrandbits(32)
+
+        self.seed = seed
+        self.mode = mode
+        self.rng = random.Random(seed)
+        self.project = project
+
+        self.board = board if board is not None else BitBoard()
+        self.board.clear()
+
+        self.piece_queue: list[BitPiece] = []
+
+        # start populating the queue
+        self.open_bag()
+        self.open_bag()
+
+        self.piece = self.next_piece_in_queue()
+        self.next_piece = self.next_piece_in_queue()
+        self.stored_piece = None
+        self.projected_piece = None
+
+        self.drop_at = self.board.level_speed()
+        self.drop_count = 0
+
+        self.das_startup_frames = 16
+        self.das_interval_frames = 6
+        self.held_down_for = 0
+        self.held_left_for = 0
+        self.held_right_for = 0
+
+        self.frame = 0
+        self.placed: list[dict] | None = None  # lines cleared this frame, see step
+        self.dead = False
+        self.finished = False
+
+        # the keys of every frame played, as runs of [frames, held, pressed]
+        self.inputs: list[list[int]] = []
+
+    @property
+    def over(self) -> bool:
+        return self.dead or self.finished
+
+    def open_bag(self, num_bags=1):
+        for _ in range(num_bags):
+            bag = [
+                Shapes.I,
+                Shapes.J,
+                Shapes.L,
+                Shapes.O,
+                Shapes.S,
+                Shapes.T,
+                Shapes.Z,
+            ]
+
+            self.rng.shuffle(bag)
+
+            for shape in bag:
+                self.piece_queue.append(BitPiece(shape, self.rng.randint(1, 4) - 1))
+
+    def next_piece_in_queue(self) -> BitPiece:
+        # restock the queue if we are running low
+        while len(self.piece_queue) < 10:
+            self.open_bag()
+
+        # return the next piece
+        return self.piece_queue.pop(0)
+
+    def step(self, held: int = 0, pressed: int = 0) -> list[dict] | None:
+        """Play a frame.
+
+        Args:
+            held (int, optional): The keys held down this frame, LEFT | DOWN etc. Defaults to 0.
+            pressed (int, optional): The keys that went down this frame. Defaults to 0.
+
+        Returns:
+            list[dict] | None: the lines cleared if a piece was placed this frame (see Board.place), otherwise None
+        """
+        if self.over:
+            return None
+
+        self.record(held, pressed)
+        self.frame += 1
+        self.placed = None
+        self.update(held, pressed)
+
+        # check for the end of a 40 line rush if we are still alive
+        if (
+            not self.dead
+            and self.mode == QBMode.SoloForty
+            and self.board.lines_cleared >= FORTY_LINES
+        ):
+            self.finished = True
+
+        return self.placed
+
+    def wait(self, frames: int) -> int:
+        """Play frames with no keys down, the same as calling step() for each
+        but skipping over the frames where the piece doesn't fall. Stops early
+        on the frame a piece is placed, self.placed has its lines.
+
+        Args:
+            frames (int): The most frames to play.
+
+        Returns:
+            int: the frames played
+        """
+        played = 0
+        while played < frames and not self.over:
+            # nothing but the drop count changes until gravity's next due, as
+            # long as the piece isn't already stuck and there's no landing to
+            # work out for drawing
+            idle = min(frames - played, self.drop_at - self.drop_count - 1)
+            if (
+                idle > 0
+                and not self.project
+                and not self.board.dead()
+                and not self.piece.collides(self.board)
+            ):
+                self.record(0, 0, idle)
+                self.frame += idle
+                self.drop_count += idle
+                self.held_down_for = 0
+                self.held_left_for = 0
+                self.held_right_for = 0
+                self.placed = None
+                played += idle
+                continue
+
+            played += 1
+            if self.step() is not None:
+                break
+
+        return played
+
+    def record(self, held: int, pressed: int, frames: int = 1):
+        """Add frames of keys to the runs in self.inputs"""
+        if self.inputs and self.inputs[-1][1] == held and self.inputs[-1][2] == pressed:
+            self.inputs[-1][0] += frames
+        else:
+            self.inputs.append([frames, held, pressed])
+
+    def update(self, held: int, pressed: int):
+        board = self.board
+
+        # check for death
+        self.check_for_death()
+
+        # if we are dead stop the update logic here
+        if self.dead:
+            return
+
+        # check if we are already colliding. If we are, place the piece
+        if self.piece.collides(board):
+            self.place()
+            return
+
+        # check to swap piece
+        if pressed & HOLD:
+            # swap the piece
+            if self.stored_piece is None:
+                self.stored_piece = self.piece
+                self.piece = self.next_piece
+                self.next_piece = self.next_piece_in_queue()
+            else:
+                self.piece, self.stored_piece = self.stored_piece, self.piece
+
+            # TODO: if there is a collision swap back (needs fixes with bounds checking/collision checking)
+
+            # set the new piece to the stored location
+            self.piece.x = 3
+            self.piece.y = 0
+
+        # LEFT / RIGHT MOVEMENT
+        left_held_tick = False
+        right_held_tick = False
+
+        # if player is holding both left and right reset the held counters
+        if held & LEFT and held & RIGHT:
+            self.held_left_for = 0
+            self.held_right_for = 0
+        else:
+            # left hold
+            if held & LEFT:
+                self.held_left_for += 1
+                if self.held_left_for >= self.das_startup_frames:
+                    if (
+                        self.held_left_for - self.das_startup_frames
+                    ) % self.das_interval_frames == 0:
+                        left_held_tick = True
+            else:
+                self.held_left_for = 0
+
+            # right hold
+            if held & RIGHT:
+                self.held_right_for += 1
+                if self.held_right_for >= self.das_startup_frames:
+                    if (
+                        self.held_right_for - self.das_startup_frames
+                    ) % self.das_interval_frames == 0:
+                        right_held_tick = True
+            else:
+                self.held_right_for = 0
+
+        # most frames nothing moves sideways, skip the copy then
+        move = 0
+        if pressed & LEFT or left_held_tick:
+            move -= 1
+
+        if pressed & RIGHT or right_held_tick:
+            move += 1
+
+        if move:
+            sim_left_right = copy.deepcopy(self.piece)
+            sim_left_right.x += move
+
+            # if the sim piece does not collide update our piece to it
+            if not sim_left_right.collides(board):
+                self.piece = sim_left_right
+
+        # ROTATION
+        if pressed & ROTATE:
+            sim_rotate = copy.deepcopy(self.piece)
+            sim_rotate.rotate()
+            if not sim_rotate.collides(board):
+                self.piece = sim_rotate
+            else:
+                # try right one first
+                sim_rotate.x = self.piece.x + 1
+
+                if not sim_rotate.collides(board):
+                    self.piece = sim_rotate
+                else:
+                    # try left one if that didn't work
+                    sim_rotate.x = self.piece.x - 1
+
+                    if not sim_rotate.collides(board):
+                        self.piece = sim_rotate
+                    else:
+                        # for an i piece try 2 left
+                        if sim_rotate.shape == Shapes.I:
+
+                            # try left two (from the original piece)
+                            sim_rotate.x = self.piece.x - 2
+                            if not sim_rotate.collides(board):
+                                self.piece = sim_rotate
+
+        # DOWN MOVEMENT / GRAVITY
+        # should we fall this frame?
+        try_drop = False
+        user_drop = False
+
+        # check if down has been held for a while
+        if held & DOWN:
+            self.held_down_for += 1
+            if self.held_down_for >= self.das_startup_frames:
+                if (
+                    self.held_down_for - self.das_startup_frames
+                ) % self.das_interval_frames == 0:
+                    try_drop = True
+                    user_drop = True
+
+        else:
+            self.held_down_for = 0
+
+        # check for key press down
+        if pressed & DOWN:
+            try_drop = True
+            user_drop = True
+
+        # if the user commands a down, increment the points by 1
+        if user_drop:
+            board.points += 1
+
+        # increment drop count and see if we need to drop the piece
+        self.drop_count += 1
+        if self.drop_count >= self.drop_at:
+            try_drop = True
+
+        # perform the drop if needed
+        if try_drop:
+
+            # if we are dropping the piece, reset the drop count
+            self.drop_count = 0
+            sim_drop = copy.deepcopy(self.piece)
+            sim_drop.y += 1
+            if not sim_drop.collides(board):
+                self.piece = sim_drop
+            else:
+                self.place()
+
+        # solve projected piece and move to it if commanded to, nobody's
+        # looking at it when playing a replay back so only when dropping
+        self.projected_piece = None
+        if self.project or pressed & DROP:
+            projected = copy.deepcopy(self.piece)
+            while not projected.collides(board):
+                projected.y += 1
+
+            projected.y -= 1
+
+            if projected.y > self.piece.y:
+                self.projected_piece = projected
+                if pressed & DROP:
+                    self.drop_count = 0
+                    board.points += projected.y - self.piece.y
+                    self.piece = projected
+
+        # check for death
+        self.check_for_death()
+
+    def check_for_death(self):
+        if not self.dead and self.board.dead():
+            self.dead = True
+            self.projected_piece = None
+
+    def place(self):
+        # place the current piece and get a new piece
+        self.placed = self.board.place(self.piece)
+        self.drop_at = self.board.level_speed()
+        self.piece = self.next_piece
+        self.next_piece = self.next_piece_in_queue()
+        # restart the delay for down being held to slow up the next place pieced
+        # from dropping right away when just placed
+        self.held_down_for = 0
@@ -0,0 +1,127 @@
+# description: quadblox replays. a replay is the seed and mode a PlayerGame
+# started with and the keys of every frame after, which is all it takes to
+# play the game again exactly. the keys are stored as runs of identical frames
+# so a few minutes of play packs into a few kilobytes:
+#
+#   "QBR" | version (1 byte) | mode (1 byte) | seed (4 bytes, little endian)
+#   then per run: frames (varint) | held (1 byte) | pressed (1 byte)
+
+import struct
+
+from .qb import QBMode
+from .qbgame import PlayerGame
+
+MAGIC = b"QBR"
+VERSION = 1
+HEADER = struct.Struct("<3sBBI")
+FPS = 60
+
+MAX_FRAMES = 60 * 60 * 60  # an hour of play, the most play() will run
+
+
+class ReplayError(ValueError):
+    """Raised for data that isn't a replay we can play"""
+
+
+class Replay:
+    """The seed, mode and keys of a game.
+
+    Args:
+        seed (int): The seed the game started with.
+        mode (QBMode): The mode that was played.
+        inputs (list[list[int]] | None, optional): Runs of [frames, held, pressed]. Defaults to none yet.
+    """
+
+    def __init__(self, seed: int, mode: QBMode, inputs: list[list[int]] | None = None):
+        self.seed = seed
+        self.mode = mode
+        self.inputs = inputs if inputs is not None else []
+
+    @classmethod
+    def of(cls, game: PlayerGame) -> "Replay":
+        """The replay of a game so far"""
+        return cls(game.seed, game.mode, [list(run) for run in game.inputs])
+
+    @property
+    def frames(self) -> int:
+        return sum(run[0] for run in self.inputs)
+
+    def encode(self) -> bytes:
+        data = bytearray(HEADER.pack(MAGIC, VERSION, self.mode.value, self.seed))
+        for frames, held, pressed in self.inputs:
+            # 7 bits at a time, low bits first, the top bit set while more follow
+            while frames > 0x7F:
+                data.append(frames & 0x7F | 0x80)
+                frames >>= 7
+            data.append(frames)
+            data.append(held)
+            data.append(pressed)
+        return bytes(data)
+
+    @classmethod
+    def decode(cls, data: bytes) -> "Replay":
+        if len(data) < HEADER.size:
+            raise ReplayError("too short for a replay")
+
+        magic, version, mode, seed = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError("not a replay")
+        if version != VERSION:
+            raise ReplayError(f"replay version {version}, we play {VERSION}")
+        try:
+            mode = QBMode(mode)
+        except ValueError:
+            raise ReplayError(f"unknown mode {mode}") from None
+
+        inputs = []
+        i = HEADER.size
+        try:
+            while i < len(data):
+                frames = 0
+                shift = 0
+                while data[i] & 0x80:
+                    frames |= (data[i] & 0x7F) << shift
+                    shift += 7
+                    i += 1
+                frames |= data[i] << shift
+                inputs.append([frames, data[i + 1], data[i + 2]])
+                i += 3
+        except IndexError:
+            raise ReplayError("replay cut short") from None
+
+        return cls(seed, mode, inputs)
+
+
+def play(replay: Replay, max_frames: int = MAX_FRAMES) -> PlayerGame:
+    """Play a replay back as fast as it'll go, with nothing drawn.
+
+    Args:
+        replay (Replay): The replay to play.
+        max_frames (int, optional): Stop after this many frames even if the game isn't over. Defaults to MAX_FRAMES.
+
+    Returns:
+        PlayerGame: the game as it stood at the end of the replay
+    """
+    game = PlayerGame(replay.seed, replay.mode, project=False)
+
+    for frames, held, pressed in replay.inputs:
+        for _ in range(frames):
+            if game.over or game.frame >= max_frames:
+                return game
+            game.step(held, pressed)
+
+    return game
+
+
+def results(game: PlayerGame) -> dict:
+    """What a game comes to, in the leaderboard's terms"""
+    return {
+        "mode": game.mode.name,
+        "time": game.frame / FPS,
+        "frames": game.frame,
+        "lines": game.board.lines_cleared,
+        "pieces": game.board.blocks_placed,
+        "score": game.board.points,
+        "finished": game.finished,
+        "dead": game.dead,
+    }
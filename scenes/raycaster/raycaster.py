@@ -2,14 +2,14 @@
 todo:
 * maybe after walls and floors are drawn do a pool of blood pass on any dead monsters before rendering objects for some extra gore
 * bring the animatedsprite and animation classes in to load the walk animation for the toad monster
-* better path finding for the toad monster class to locate the player
-* draw objects needs to clip out of view portions of the object. determine left and right edges of the object to clip the sprite to
 * only monsters in the view port should be able to be hit by the player's shots
 * maybe call the rifle a "grease gun"
 """
 
 from scene import Scene
 from utils import *
+import assetcache
+from collections import OrderedDict
 import math
 import numpy as np
 import os
@@ -18,9 +18,18 @@ from classes import *
 
 BASE_IMAGE_PATH = "assets/raycaster/"
 PI_2 = math.pi * 2
+SPRITE_BUDGET = 8 * 1024 * 1024  # bytes of scaled sprites to keep
+SPRITE_HEIGHT_STEP = 2  # pixels between the heights sprites are scaled to
+
+# the tiles a monster can step to from its own, straight ones first so a
+# diagonal is only taken when it's actually shorter
+FLOW_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
 
 
 class RayCaster(Scene):
+    sounds = ["death1", "death2", "death3", "death4", "jsfxr-qb-lines-4", "shoot"]
+    preload = True
+
     def __init__(self, game):
         super().__init__(game)
 
@@ -68,16 +77,27 @@ class RayCaster(Scene):
             "camera": self.command_camera,
             "monsters": self.command_monsters,
             "spawn": self.command_spawn,
+            "stress": self.command_stress,
         }
         self.move_start = 0
         self.render_scale = 1
         self.render_width = self.game.WIDTH // self.render_scale
         self.render_height = self.game.HEIGHT // self.render_scale
         self.distances = np.zeros(self.render_width)
+        self.depths = np.zeros(self.render_width)
         self.rads = np.zeros(self.render_width)
+        # each column's ray angle from the camera's
+        self.ray_offsets = np.linspace(
+            -self.fov_rad_half, self.fov_rad_half, self.render_width
+        )
         self.wall_points = np.zeros((self.render_width, 2))
         self.wall_textures = np.zeros(self.render_width)
         self.display = self.make_surface((self.render_width, self.render_height))
+        self.alpha_mask = self.display.get_masks()[3]
+        self.wall_pixels = self.make_wall_pixels()
+        self.wall_shading = False
+        self.wall_shade_distance = 24  # tiles away walls are darkest
+        self.sprites = ScaledSprites()
         self.display_scaled = self.make_surface((self.game.WIDTH, self.game.HEIGHT))
         self.inventory = ["pistol", "rifle"]
         self.ammo = 30
@@ -106,6 +126,13 @@ class RayCaster(Scene):
 
         self.level.spawn_monsters(len(self.level.monster_spawners))
 
+    def command_stress(self, args: str | None = None):
+        # fill the level with toads to see how the monster code holds up,
+        # "stress 500" for 500 of them
+        amount = int(args) if args and args.isdigit() else 300
+        spawned = self.level.spawn_crowd(amount)
+        self.log(f"Spawned {spawned} toads, {len(self.level.monsters)} monsters")
+
     def convert_radians_to_slice(self, radians):
 
         # for i in range(self.render_width):
@@ -141,6 +168,10 @@ class RayCaster(Scene):
     def move_monsters(self):
         monster_speed = 0.03
 
+        # every open tile's way to the player, only worked out again when the
+        # player steps into another tile
+        self.level.update_flow(self.camera.pos)
+
         for monster in self.level.monsters:
             # move the monster toward the player
 
@@ -153,10 +184,10 @@ class RayCaster(Scene):
             if distance_to_player < 0.5:
                 continue
 
-            # get the angle to the player
-            angle = math.atan2(
-                self.camera.pos[1] - monster.pos[1], self.camera.pos[0] - monster.pos[0]
-            )
+            # head for the next tile on the way to the player, or the player
+            # once we're in the same tile
+            target = self.level.flow_target(monster.pos, self.camera.pos)
+            angle = math.atan2(target[1] - monster.pos[1], target[0] - monster.pos[0])
 
             # move the monster toward the player
             new_pos = (
@@ -169,17 +200,17 @@ class RayCaster(Scene):
                 if not self.level.monster_collisions(
                     new_pos, radius=0.5, ignore=[monster]
                 ):
-                    monster.pos = new_pos
+                    self.level.move_monster(monster, new_pos)
             elif not self.level.wall_collision((new_pos[0], monster.pos[1])):
                 if not self.level.monster_collisions(
                     (new_pos[0], monster.pos[1]), radius=0.5, ignore=[monster]
                 ):
-                    monster.pos = (new_pos[0], monster.pos[1])
+                    self.level.move_monster(monster, (new_pos[0], monster.pos[1]))
             elif not self.level.wall_collision((monster.pos[0], new_pos[1])):
                 if not self.level.monster_collisions(
                     (monster.pos[0], new_pos[1]), radius=0.5, ignore=[monster]
                 ):
-                    monster.pos = (monster.pos[0], new_pos[1])
+                    self.level.move_monster(monster, (monster.pos[0], new_pos[1]))
 
     def animate_monsters(self):
         for monster in self.level.monsters:
@@ -351,9 +382,9 @@ class RayCaster(Scene):
 
             if d < self.weapon_spread:
 
-                self.level.monsters.remove(monster)
+                self.level.remove_monster(monster)
 
-                self.level.level_objects.append(
+                self.level.add_object(
                     LevelObject(pos=monster.pos, type="toad/die", scene=self)
                 )
 
@@ -506,340 +537,259 @@ class RayCaster(Scene):
         self.display.blit(self.assets["pistol"], (x, y))
 
     def draw_objects(self):
-        # make a list of objects in our fov
-        render_objects = []
-
-        # combine level objects and monsters into one list to check
-
-        combined = self.level.level_objects + self.level.monsters
-
-        for obj in combined:
-            rads = math.atan2(
-                obj.pos[1] - self.camera.pos[1], obj.pos[0] - self.camera.pos[0]
-            )
-            rd = abs(radian_diff(self.camera.angle, rads))
-            if abs(rd) < self.fov_rad_half or abs(rd) > PI_2 - self.fov_rad_half:
-                distance = line_distance(*self.camera.pos, *obj.pos)
-
-                # check the distance to the wall at this angle
-                # to see if it's the object is closer than the wall
-                # first compute which slice the object is in
-                x = self.convert_radians_to_slice(rads)
-
-                if distance < self.distances[x] and distance > 0.25:
-                    render_objects.append((distance, rads, x, obj))
-
-        # sort the objects by distance  so we can render them in the correct order
-        render_objects.sort(key=lambda x: x[0], reverse=True)
+        objects = self.level.level_objects + self.level.monsters
+        if not objects:
+            return
 
-        # blit the object to the display in the correct order
-        for o in render_objects:
-            d = o[0]
-            r = o[1]
-            x = o[2]
-            obj = o[3]
+        # where every level object and monster is from the camera, all at once
+        positions = np.array([obj.pos for obj in objects], dtype=float)
+        dx = positions[:, 0] - self.camera.pos[0]
+        dy = positions[:, 1] - self.camera.pos[1]
+        distances = np.hypot(dx, dy)
+        offsets = radian_diff(np.arctan2(dy, dx), self.camera.angle)
 
-            # correct for fisheye effect
-            corrected_distance = d * math.cos(r - self.camera.angle)
+        # only the ones in our fov and not right on top of us
+        visible = (np.abs(offsets) < self.fov_rad_half) & (distances > 0.25)
+        if not visible.any():
+            return
 
-            scale = 1 / (corrected_distance / 2)
-            obj_img = obj.img()
+        # furthest first so the nearer ones are drawn over them
+        order = np.flatnonzero(visible)
+        order = order[np.argsort(-distances[order], kind="stable")]
+        offsets = offsets[order]
+
+        # the slice each object is in and its distance corrected for the
+        # fisheye effect, the same as the walls
+        columns = (offsets + self.fov_rad_half) * (self.render_width - 1)
+        columns = (columns / self.fov_rad).astype(int)
+        depths = distances[order] * np.cos(offsets)
+        scales = 2 / depths
+        images = [objects[index].img() for index in order]
+        sizes = np.array([image.get_size() for image in images]) * scales[:, None]
+
+        # skip scaling the ones that are off screen or behind walls, a pixel
+        # wider each side as the scaled sprites are rounded to a size
+        widths = sizes[:, 0].astype(int) + 2
+        firsts, lasts, _, furthest = self.walls_across(columns - widths // 2, widths)
+        drawn = np.flatnonzero((firsts < lasts) & (furthest > depths))
+        if not len(drawn):
+            return
 
-            scaled = pygame.transform.scale(
-                obj_img,
-                (
-                    int(obj_img.get_width() * scale),
-                    int(obj_img.get_height() * scale),
-                ),
-            )
+        sprites = [
+            self.sprites.get(images[i], height)
+            for i, height in zip(drawn.tolist(), sizes[drawn, 1].tolist())
+        ]
+        order = order[drawn]
+        columns = columns[drawn]
+        depths = depths[drawn]
+        widths = np.array([sprite.get_width() for sprite in sprites])
+        heights = np.array([sprite.get_height() for sprite in sprites])
+        lefts = columns - widths // 2
+
+        wall_heights = np.clip(self.render_height / depths, 5, self.render_height * 4)
+        # draw the objects at bottom of the wall, chandeliers at the top
+        tops = self.render_height // 2 + wall_heights // 2 - heights
+        for i, index in enumerate(order):
+            if objects[index].type == "chandelier":
+                tops[i] = self.render_height // 2 - wall_heights[i] // 2
+
+        firsts, lasts, nearest, furthest = self.walls_across(lefts, widths)
+
+        # everything in front of the walls goes in one blits() call, numbers
+        # as plain ints as numpy's are slow to pass one at a time
+        blits = []
+        whole = (nearest > depths).tolist()
+        lefts = lefts.tolist()
+        tops = tops.astype(int).tolist()
+
+        for i in np.flatnonzero((firsts < lasts) & (furthest > depths)).tolist():
+            if whole[i]:
+                blits.append((sprites[i], (lefts[i], tops[i])))
+                continue
 
-            wall_height = (1 / corrected_distance) * self.render_height
-            wall_height = self.constrain(wall_height, 5, self.render_height * 4)
-            wh_top = (self.render_height // 2) - (wall_height // 2)
-            wh_bottom = (self.render_height // 2) + (wall_height // 2)
-            left = x - scaled.get_width() // 2
-            top = wh_bottom - scaled.get_height()
-            # draw the object at bottom of the wall
-            if obj.type == "chandelier":
-                top = wh_top
-            self.display.blit(scaled, (left, top))
-
-            # uncomment the line below to draw a green pixel
-            # where the bottom center of the sprite was determined to be
-            # self.display.set_at((x, wh_bottom), (0, 255, 0))
+            # partly behind a wall, a blit for each run of columns it's in
+            # front of
+            in_front = self.depths[firsts[i] : lasts[i]] > depths[i]
+            edges = np.flatnonzero(np.diff(in_front, prepend=False, append=False))
+            for start, end in (edges.reshape(-1, 2) + firsts[i]).tolist():
+                area = (start - lefts[i], 0, end - start, sprites[i].get_height())
+                blits.append((sprites[i], (start, tops[i]), area))
+
+        self.display.blits(blits, doreturn=False)
+
+        # uncomment the lines below to draw a green pixel
+        # where the bottom center of each sprite was determined to be
+        # for column, top, height in zip(columns, tops, heights):
+        #     self.display.set_at((column, top + height), (0, 255, 0))
+
+    def walls_across(self, lefts: np.ndarray, widths: np.ndarray) -> tuple:
+        """The nearest and furthest wall across each sprite's columns. A sprite
+        further than the furthest is hidden, one nearer than the nearest is
+        drawn whole.
+
+        Args:
+            lefts (np.ndarray): The sprites' left columns
+            widths (np.ndarray): The sprites' widths
+
+        Returns:
+            tuple: the first and last+1 columns on screen, nearest and furthest
+        """
+        firsts = np.minimum(np.maximum(lefts, 0), self.render_width)
+        lasts = np.minimum(np.maximum(lefts + widths, 0), self.render_width)
+        bounds = np.stack((firsts, lasts), axis=1).ravel()
+
+        # the extra 0 is so a sprite can end on the last column
+        walls = np.append(self.depths, 0)
+        nearest = np.minimum.reduceat(walls, bounds)[::2]
+        furthest = np.maximum.reduceat(walls, bounds)[::2]
+        return firsts, lasts, nearest, furthest
 
     def draw_walls(self):
+        self.cast_rays()
+
+        # every column's slice of wall, drawn straight into the display's
+        # pixels rather than scaling and blitting a strip of texture per column
+        height = self.render_height
+        # the distance straight ahead to each column's wall, without the
+        # fisheye effect, for the walls' heights and to clip sprites against
+        self.depths = self.distances * np.cos(self.ray_offsets)
+        wall_heights = self.render_height / self.depths
+        wall_heights = np.clip(wall_heights, 5, self.render_height * 4).astype(int)
+        tops = height // 2 - wall_heights // 2
+
+        textures = np.clip(self.wall_textures.astype(int), 0, 3)
+        _, levels, texture_width, texture_height = self.wall_pixels.shape
+
+        # where along the wall each ray hit, the column of the texture to draw
+        wall_points = self.wall_points
+        texture_x = np.abs(wall_points[:, 0] - wall_points[:, 0].astype(int))
+        texture_x += np.abs(wall_points[:, 1] - wall_points[:, 1].astype(int))
+        texture_x = np.clip(np.clip(texture_x, 0, 1) * texture_width - 1, 0, None)
+        texture_x = texture_x.astype(int)
+
+        # darker the further away the wall is
+        shades = np.zeros(self.render_width, dtype=int)
+        if self.wall_shading:
+            shades = np.minimum(
+                (self.distances / self.wall_shade_distance * levels).astype(int),
+                levels - 1,
+            )
 
-        cam_angle = self.camera.angle
-
-        x = self.camera.pos[0]
-        y = self.camera.pos[1]
-
-        for i in range(self.render_width):
-            render_x_pct = i / (self.render_width - 1)
-            render_rad = cam_angle - self.fov_rad_half + self.fov_rad * render_x_pct
-            self.rads[i] = render_rad
-            self.distances[i] = self.wall_distance(x, y, render_rad, i)
-            self.draw_slice(i)
-
-    def draw_slice(self, x):
-        distance = self.distances[x]
-
-        # correct for fisheye effect by adjusting distance based on angle from center
-        ray_angle = self.rads[x]
-        corrected_distance = distance * math.cos(ray_angle - self.camera.angle)
-
-        # determine which texture to use
-        # if the wall we intersected was type 1 use bricks
-        # if the wall is type 2 use the flag
-
-        wall_texture = self.assets["bricks"]
-        if self.wall_textures[x] == 2:
-            wall_texture = self.assets["flag"]
-        elif self.wall_textures[x] == 3:
-            wall_texture = self.assets["wood"]
-        # determine the position of the slice we need to draw
-        wp_x = self.wall_points[x, 0]
-        wp_y = self.wall_points[x, 1]
-        texture_x = abs(wp_x - int(wp_x)) + abs(wp_y - int(wp_y))
-        texture_x = self.constrain(texture_x, 0, 1)
-        texture_x = int(texture_x * wall_texture.get_width() - 1)
-
-        wall_height = (1 / corrected_distance) * self.render_height
-        wall_height = self.constrain(wall_height, 5, self.render_height * 4)
-        top = (self.render_height // 2) - (wall_height // 2)
-
-        self.display.blit(
-            pygame.transform.scale(
-                wall_texture.subsurface(texture_x, 0, 1, wall_texture.get_height()),
-                (1, int(wall_height)),
-            ),
-            (x, top),
-        )
-
-    def tile_edges(self, x, y):
-        edges = []
-        edges.append((x, y, x + 1, y))  # top
-        edges.append((x + 1, y, x + 1, y + 1))  # right
-        edges.append((x, y + 1, x + 1, y + 1))  # bottom
-        edges.append((x, y, x, y + 1))  # left
-        return edges
-
-    def wall_distance(self, x, y, radians, i) -> float:
-        distance = 9999
-        x1 = x2 = x
-        y1 = y2 = y
-        dx = math.cos(radians)
-        dy = math.sin(radians)
-
-        edges_function = None
-
-        if dx >= 0 and dy <= 0:
-            edges_function = self.edges_ne
-        elif dx >= 0 and dy > 0:
-            edges_function = self.edges_se
-        elif dx < 0 and dy <= 0:
-            edges_function = self.edges_nw
-        else:
-            edges_function = self.edges_sw
-
-        while True:
-            y2 += dy
-            x2 += dx
+        # only the rows some wall reaches need looking at
+        first = max(0, tops.min())
+        last = min(height, (tops + wall_heights).max())
+        rows = np.arange(first, last)[None, :] - tops[:, None]
+        on_wall = (rows >= 0) & (rows < wall_heights[:, None])
+
+        # the texture row for each, sampled the same way pygame.transform.scale
+        # does in 16.16 fixed point
+        steps = ((texture_height << 16) // wall_heights)[:, None]
+        texture_y = (np.clip(rows, 0, None) * steps + steps // 2) >> 16
+        np.minimum(texture_y, texture_height - 1, out=texture_y)
+
+        # one lookup into the flattened textures, from where each column's
+        # texture column starts
+        starts = ((textures * levels + shades) * texture_width + texture_x) * texture_height
+        texels = self.wall_pixels.ravel().take(starts[:, None] + texture_y)
+
+        # leave the colorkeyed pixels see through like a blit would
+        on_wall &= (texels & self.alpha_mask) != 0
+
+        pixels = pygame.surfarray.pixels2d(self.display)
+        np.copyto(pixels[:, first:last], texels, where=on_wall)
+        del pixels  # unlock the display
+
+    def make_wall_pixels(self, levels: int = 8) -> np.ndarray:
+        """The wall textures as pixel arrays in the display's format, indexed
+        by [map tile value, shade, x, y]. Each texture comes in levels shades
+        from as is to a quarter brightness for the distance shading.
+        """
+        # bricks for anything that isn't a flag or wood wall
+        names = ["bricks", "bricks", "flag", "wood"]
+        width, height = self.assets["bricks"].get_size()
+        pixels = np.zeros((len(names), levels, width, height), dtype=np.uint32)
+
+        for i, name in enumerate(names):
+            for level in range(levels):
+                shade = int(255 * (1 - 0.75 * level / max(1, levels - 1)))
+                surface = self.make_transparent_surface((width, height))
+                surface.blit(self.assets[name], (0, 0))
+                surface.fill(
+                    (shade, shade, shade, 255), special_flags=pygame.BLEND_RGBA_MULT
+                )
+                pixels[i, level] = pygame.surfarray.pixels2d(surface)
 
-            if x2 < 0 or x2 >= self.level.map_width:
-                break
+        return pixels
 
-            if y2 < 0 or y2 >= self.level.map_height:
-                break
+    def cast_rays(self):
+        """Cast the ray for every column at once with a grid dda. Each ray
+        steps across whichever tile edge, vertical or horizontal, it reaches
+        next until it enters a wall tile, so a hit is exact and costs one
+        step per tile crossed, for all the columns together in numpy.
 
-            edges = edges_function(x1, y1, x2, y2)
-            dist = self.intersect_edges(edges, x1, y1, x2, y2, i)
-            if dist:
-                distance = dist
+        Fills in self.rads, self.distances (along the ray, 9999 for rays that
+        leave the map), self.wall_points and self.wall_textures.
+        """
+        x, y = self.camera.pos
+        level_map = self.level.map
+        map_width = self.level.map_width
+        map_height = self.level.map_height
+
+        self.rads = self.camera.angle + self.ray_offsets
+        dx = np.cos(self.rads)
+        dy = np.sin(self.rads)
+
+        # how far along a ray it is from one vertical (or horizontal) edge to
+        # the next, a ray running along an axis never reaches the other kind
+        delta_x = np.abs(1 / np.where(dx == 0, 1e-30, dx))
+        delta_y = np.abs(1 / np.where(dy == 0, 1e-30, dy))
+        step_x = np.where(dx < 0, -1, 1)
+        step_y = np.where(dy < 0, -1, 1)
+
+        # the tile each ray is in and how far along it the first edges are
+        tile_x = np.full(self.render_width, int(x))
+        tile_y = np.full(self.render_width, int(y))
+        side_x = np.where(dx < 0, x - tile_x, tile_x + 1 - x) * delta_x
+        side_y = np.where(dy < 0, y - tile_y, tile_y + 1 - y) * delta_y
+
+        distances = np.full(self.render_width, 9999.0)
+        x_sides = np.zeros(self.render_width, dtype=bool)
+        textures = np.zeros(self.render_width)
+        done = np.zeros(self.render_width, dtype=bool)
+
+        # a ray crosses at most every column and row of the map
+        for _ in range(map_width + map_height):
+            x_side = side_x < side_y
+            travelled = np.where(x_side, side_x, side_y)
+
+            tile_x += np.where(x_side, step_x, 0)
+            tile_y += np.where(x_side, 0, step_y)
+            side_x += np.where(x_side, delta_x, 0)
+            side_y += np.where(x_side, 0, delta_y)
+
+            inside = (tile_x >= 0) & (tile_x < map_width)
+            inside &= (tile_y >= 0) & (tile_y < map_height)
+            tiles = level_map[
+                np.clip(tile_x, 0, map_width - 1), np.clip(tile_y, 0, map_height - 1)
+            ]
+
+            hit = inside & (tiles > 0) & ~done
+            distances[hit] = travelled[hit]
+            x_sides[hit] = x_side[hit]
+            textures[hit] = tiles[hit]
+
+            done |= hit | ~inside
+            if done.all():
                 break
 
-        return distance
-
-    def intersect_edges(self, edges, x1, y1, x2, y2, i):
-        min_dist = None
-
-        if not edges:
-            return min_dist
-        for edge in edges:
-            new_dist = False
-            intersection = line_intersection(x1, y1, x2, y2, *edge)
-            if intersection:
-                dist = line_distance(x1, y1, intersection[0], intersection[1])
-                if dist and min_dist is None:
-                    new_dist = True
-                elif dist < min_dist:
-                    new_dist = True
-
-                if new_dist:
-                    min_dist = dist
-                    self.wall_points[i, 0] = intersection[0]
-                    self.wall_points[i, 1] = intersection[1]
-
-                    # extend the wall point by 0.001 along it's
-                    # angle and then sample the texture of the
-                    # wall at that point
-                    x = intersection[0] + math.cos(self.rads[i]) * 0.001
-                    y = intersection[1] + math.sin(self.rads[i]) * 0.001
-                    x = math.floor(x)
-                    y = math.floor(y)
-                    texture = self.level.map[x, y]
-
-                    self.wall_textures[i] = texture
-        return min_dist
-
-    def edges_ne(self, x1, y1, x2, y2):
-        # working!
-        edges = []
-
-        x = int(x2)
-        y = int(y2)
-
-        a = (x, y + 1)
-        b = (a[0] + 1, a[1])
-        c = (a[0], a[1] - 1)
-        d = (a[0] - 1, a[1])
-        e = (a[0], a[1] + 1)
-
-        tile_ne = self.level.map[a[0], a[1] - 1] > 0
-        tile_nw = self.level.map[a[0] - 1, a[1] - 1] > 0
-        tile_se = self.level.map[a[0], a[1]] > 0
-        tile_sw = self.level.map[a[0] - 1, a[1]] > 0
-
-        # calculate horizontal edge
-        if tile_ne and tile_nw:
-            edges.append((*b, *d))
-        else:
-            if tile_ne:
-                edges.append((*a, *b))
-            if tile_nw:
-                edges.append((*a, *d))
-        # calculate vertical edge
-        if tile_ne and tile_se:
-            edges.append((*c, *e))
-        else:
-            if tile_ne:
-                edges.append((*a, *c))
-            if tile_se:
-                edges.append((*a, *e))
-
-        return edges
-
-    def edges_nw(self, x1, y1, x2, y2) -> float:
-
-        edges = []
-
-        x = int(x2)
-        y = int(y2)
-
-        a = (x + 1, y + 1)
-        b = (a[0] + 1, a[1])
-        c = (a[0], a[1] - 1)
-        d = (a[0] - 1, a[1])
-        e = (a[0], a[1] + 1)
-
-        tile_ne = self.level.map[a[0], a[1] - 1] > 0
-        tile_nw = self.level.map[a[0] - 1, a[1] - 1] > 0
-        tile_se = self.level.map[a[0], a[1]] > 0
-        tile_sw = self.level.map[a[0] - 1, a[1]] > 0
-
-        # calculate horizontal edge
-        if tile_ne and tile_nw:
-            edges.append((*b, *d))
-        else:
-            if tile_ne:
-                edges.append((*a, *b))
-            if tile_nw:
-                edges.append((*a, *d))
-        # calculate vertical edge
-        if tile_nw and tile_sw:
-            edges.append((*c, *e))
-        else:
-            if tile_nw:
-                edges.append((*a, *c))
-            if tile_sw:
-                edges.append((*a, *e))
-
-        return edges
-
-    def edges_sw(self, x1, y1, x2, y2) -> float:
-
-        edges = []
-
-        x = int(x2)
-        y = int(y2)
-
-        a = (x + 1, y)
-        b = (a[0] + 1, a[1])
-        c = (a[0], a[1] - 1)
-        d = (a[0] - 1, a[1])
-        e = (a[0], a[1] + 1)
-
-        tile_ne = self.level.map[a[0], a[1] - 1] > 0
-        tile_nw = self.level.map[a[0] - 1, a[1] - 1] > 0
-        tile_se = self.level.map[a[0], a[1]] > 0
-        tile_sw = self.level.map[a[0] - 1, a[1]] > 0
-
-        # calculate horizontal edge
-        if tile_se and tile_sw:
-            edges.append((*b, *d))
-        else:
-            if tile_se:
-                edges.append((*a, *b))
-            if tile_sw:
-                edges.append((*a, *d))
-        # calculate vertical edge
-        if tile_nw and tile_sw:
-            edges.append((*c, *e))
-        else:
-            if tile_nw:
-                edges.append((*a, *c))
-            if tile_sw:
-                edges.append((*a, *e))
-
-        return edges
-
-    def edges_se(self, x1, y1, x2, y2) -> float:
-
-        edges = []
+        # the points the rays hit, snapped onto the edge they crossed
+        wall_x = x + dx * distances
+        wall_y = y + dy * distances
+        self.wall_points[:, 0] = np.where(x_sides, np.round(wall_x), wall_x)
+        self.wall_points[:, 1] = np.where(x_sides, wall_y, np.round(wall_y))
 
-        x = int(x2)
-        y = int(y2)
-
-        a = (x, y)
-        b = (a[0] + 1, a[1])
-        c = (a[0], a[1] - 1)
-        d = (a[0] - 1, a[1])
-        e = (a[0], a[1] + 1)
-
-        tile_ne = self.level.map[a[0], a[1] - 1] > 0
-        tile_nw = self.level.map[a[0] - 1, a[1] - 1] > 0
-        tile_se = self.level.map[a[0], a[1]] > 0
-        tile_sw = self.level.map[a[0] - 1, a[1]] > 0
-
-        # calculate horizontal edge
-        if tile_se and tile_sw:
-            edges.append((*b, *d))
-        else:
-            if tile_se:
-                edges.append((*a, *b))
-            if tile_sw:
-                edges.append((*a, *d))
-        # calculate vertical edge
-        if tile_ne and tile_se:
-            edges.append((*c, *e))
-        else:
-            if tile_ne:
-                edges.append((*a, *c))
-            if tile_se:
-                edges.append((*a, *e))
-
-        return edges
+        self.distances = distances
+        self.wall_textures = textures
 
     def draw_map(self):
         # draw the map for reference
@@ -873,6 +823,9 @@ class LevelMap:
         self.level_objects = []
         self.monster_spawners = []
         self.monsters = []
+        # the monsters by the tile they're in, for the ones near a point
+        # without going through all of them
+        self.monster_grid = SpatialGrid()
         self.map_data = load_tpng(map_path)
 
         self.map_height = self.map_data.get_height()
@@ -882,6 +835,11 @@ class LevelMap:
 
         self.parse_map()
 
+        # the way to the player from every tile, see update_flow
+        self.flow_tile = None
+        self.flow_distances = np.full(self.map.shape, -1)
+        self.flow: list[list[list[int]]] = []  # [x][y] -> [dx, dy]
+
     def parse_map(self):
         self.map = np.zeros((self.map_width, self.map_height))
         for x in range(self.map_width):
@@ -906,20 +864,20 @@ class LevelMap:
 
                 # green is a tree
                 elif pixel_color == (0, 255, 0):
-                    self.level_objects.append(
+                    self.add_object(
                         LevelObject((x + 0.5, y + 0.5), "tree", self.scene)
                     )
 
                 # orange is a monster spawner
                 elif pixel_color == (255, 127, 39):
-                    self.level_objects.append(
+                    self.add_object(
                         LevelObject((x + 0.5, y + 0.5), "telepad", self.scene)
                     )
                     self.monster_spawners.append((x, y, "toad", self.scene))
 
                 # yellow is a chandelier
                 elif pixel_color == (255, 242, 0):
-                    self.level_objects.append(
+                    self.add_object(
                         LevelObject((x + 0.5, y + 0.5), "chandelier", self.scene)
                     )
 
@@ -957,7 +915,136 @@ class LevelMap:
             # check that this does not spawn within a tile of an existing monster
             if not self.monster_collisions(mob.pos, ignore=[mob]):
 
-                self.monsters.append(mob)
+                self.add_monster(mob)
+
+    def spawn_crowd(self, amount: int, type: str = "toad") -> int:
+        """Spawn monsters on random open tiles all over the map, away from the
+        player and a tile apart from each other.
+
+        Args:
+            amount (int): How many to try to spawn
+            type (str, optional): The kind of monster. Defaults to "toad".
+
+        Returns:
+            int: how many were spawned, fewer when the map fills up
+        """
+        player = tuple(int(n) for n in self.scene.camera.pos)
+        tiles = [tuple(tile) for tile in np.argwhere(self.map == 0).tolist()]
+        random.shuffle(tiles)
+
+        spawned = 0
+        for x, y in tiles:
+            if spawned >= amount:
+                break
+
+            pos = (x + 0.5, y + 0.5)
+            if (x, y) == player or self.monster_collisions(pos):
+                continue
+
+            self.add_monster(Monster(pos=pos, type=type, scene=self.scene))
+            spawned += 1
+
+        return spawned
+
+    def add_monster(self, monster: "Monster"):
+        self.monsters.append(monster)
+        self.monster_grid.add(monster)
+
+    def remove_monster(self, monster: "Monster"):
+        self.monsters.remove(monster)
+        self.monster_grid.remove(monster)
+
+    def move_monster(self, monster: "Monster", pos: tuple[float, float]):
+        self.monster_grid.move(monster, pos)
+
+    def add_object(self, obj: "LevelObject"):
+        self.level_objects.append(obj)
+
+    def update_flow(self, pos: tuple[float, float]):
+        """Work out the way to pos from every open tile, a breadth first search
+        out from pos's tile over the map. It isn't incremental, every run
+        searches and points the whole map again (about 3 ms on a 64x64 map).
+        Nothing is done while pos stays in the same tile and the map doesn't
+        change in play, so it only runs when the player steps into another one.
+
+        Args:
+            pos (tuple[float, float]): Where everything's heading, the player
+        """
+        tile = (int(pos[0]), int(pos[1]))
+        if tile == self.flow_tile:
+            return
+        self.flow_tile = tile
+
+        # the steps from each tile to pos, -1 for walls and tiles that can't
+        # reach it. the frontier grows a tile at a time as indices into the
+        # flattened map, with a ring of wall around it so there's always a
+        # tile either side
+        width, height = self.map.shape
+        open_tiles = self.map == 0
+        passable = np.pad(open_tiles, 1)
+        padded_height = height + 2
+        neighbours = np.array([-padded_height, padded_height, -1, 1])
+
+        passable_flat = passable.ravel()
+        distances = np.full(passable.size, -1)
+        frontier = np.array([(tile[0] + 1) * padded_height + tile[1] + 1])
+        distances[frontier] = 0
+        step = 0
+        while frontier.size:
+            step += 1
+            grown = (frontier[:, None] + neighbours).ravel()
+            grown = grown[passable_flat[grown] & (distances[grown] < 0)]
+            distances[grown] = step
+            # two tiles on the frontier can share a neighbour
+            frontier = np.unique(grown)
+
+        distances = distances.reshape(passable.shape)[1:-1, 1:-1]
+        self.flow_distances = distances
+
+        # each tile points at the neighbour closest to pos, diagonals only
+        # when both tiles beside the corner are open so nothing cuts through
+        # a wall's corner
+        far = np.where(distances < 0, np.iinfo(distances.dtype).max, distances)
+        padded = np.pad(far, 1, constant_values=np.iinfo(far.dtype).max)
+        best = far.copy()
+        flow = np.zeros((width, height, 2), dtype=int)
+
+        for dx, dy in FLOW_DIRECTIONS:
+            neighbour = padded[1 + dx : 1 + dx + width, 1 + dy : 1 + dy + height]
+            closer = neighbour < best
+            if dx and dy:
+                closer &= passable[1 + dx : 1 + dx + width, 1 : 1 + height]
+                closer &= passable[1 : 1 + width, 1 + dy : 1 + dy + height]
+            best = np.where(closer, neighbour, best)
+            flow[closer] = (dx, dy)
+
+        # plain lists as the monsters look up one tile at a time
+        self.flow = flow.tolist()
+
+    def flow_target(
+        self, pos: tuple[float, float], goal: tuple[float, float]
+    ) -> tuple[float, float]:
+        """Where something at pos should head for to reach goal, the middle
+        of the next tile along the flow or goal itself once there's no tile
+        between them. update_flow has to have been called with goal.
+
+        Args:
+            pos (tuple[float, float]): Where it is
+            goal (tuple[float, float]): Where it's going
+
+        Returns:
+            tuple[float, float]: the point to head for
+        """
+        x, y = int(pos[0]), int(pos[1])
+        if not self.flow or (x, y) == self.flow_tile:
+            return goal
+
+        dx, dy = self.flow[x][y]
+        if not dx and not dy:
+            # stuck somewhere with no way through, head straight for it
+            return goal
+
+        return (x + dx + 0.5, y + dy + 0.5)
 
     def wall_collision(self, pos=(0, 0)) -> bool:
 
@@ -972,7 +1059,8 @@ class LevelMap:
         if ignore is None:
             ignore = []
 
-        for monster in self.monsters:
+        # only the monsters in the tiles around pos can be within radius
+        for monster in self.monster_grid.near(pos, radius):
             if monster in ignore:
                 continue
 
@@ -985,6 +1073,95 @@ class LevelMap:
         return False
 
 
+class SpatialGrid:
+    """Things with a pos bucketed by the grid cell they're in, a map tile by
+    default, to find the ones near a point without checking all of them."""
+
+    def __init__(self, cell_size: float = 1.0):
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], list] = {}
+        self.where: dict = {}  # the cell each thing is in
+
+    def cell(self, pos: tuple[float, float]) -> tuple[int, int]:
+        return int(pos[0] // self.cell_size), int(pos[1] // self.cell_size)
+
+    def add(self, item):
+        cell = self.cell(item.pos)
+        self.cells.setdefault(cell, []).append(item)
+        self.where[item] = cell
+
+    def remove(self, item):
+        cell = self.where.pop(item)
+        items = self.cells[cell]
+        items.remove(item)
+        if not items:
+            del self.cells[cell]
+
+    def move(self, item, pos: tuple[float, float]):
+        """Set item's pos, moving it to another cell if it crossed into one"""
+        item.pos = pos
+        if self.cell(pos) != self.where[item]:
+            self.remove(item)
+            self.add(item)
+
+    def near(self, pos: tuple[float, float], radius: float):
+        """Everything in the cells within radius of pos. Some can be further
+        than radius, check the distance to each when it matters."""
+        left, top = self.cell((pos[0] - radius, pos[1] - radius))
+        right, bottom = self.cell((pos[0] + radius, pos[1] + radius))
+
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                yield from self.cells.get((x, y), ())
+
+
+class ScaledSprites:
+    """Sprites scaled to the heights they're drawn at, so an object drawn at
+    the same size as the frame before isn't scaled again. Heights are rounded
+    to a few pixels so a slowly moving object reuses its scaled image for a
+    while, and the least recently drawn are dropped past a memory budget."""
+
+    def __init__(self, budget: int = SPRITE_BUDGET, step: int = SPRITE_HEIGHT_STEP):
+        self.budget = budget
+        self.step = step
+        self.bytes = 0
+        # keyed by id() of the source image, fine as the scene holds its
+        # images for as long as it's around
+        self.sprites: OrderedDict[tuple[int, int], pygame.Surface] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image: pygame.Surface, height: float) -> pygame.Surface:
+        """The image scaled to about height pixels tall, keeping its shape.
+
+        Args:
+            image (pygame.Surface): The sprite's image
+            height (float): How tall to draw it
+
+        Returns:
+            pygame.Surface: the scaled image, don't change it
+        """
+        height = max(self.step, round(height / self.step) * self.step)
+        key = (id(image), height)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return sprite
+
+        self.misses += 1
+        width = max(1, round(image.get_width() * height / image.get_height()))
+        sprite = pygame.transform.scale(image, (width, height))
+        self.sprites[key] = sprite
+        self.bytes += sprite.get_pitch() * height
+
+        while self.bytes > self.budget and len(self.sprites) > 1:
+            _, dropped = self.sprites.popitem(last=False)
+            self.bytes -= dropped.get_pitch() * dropped.get_height()
+
+        return sprite
+
+
 class LevelObject:
     def __init__(self, pos=(0, 0), type="tree", scene: Scene = None):
         self.scene = scene
@@ -1033,59 +1210,27 @@ class Monster:
             self.animation.reset()
 
 
-def line_intersection(ax1, ay1, ax2, ay2, bx1, by1, bx2, by2):
-    # calculate the intersection point of two lines
-    # https://en.wikipedia.org/wiki/Line%E2%80%93line_intersection
-    # (x1, y1) (x2, y2) is the first line
-    # (x3, y3) (x4, y4) is the second line
-
-    x1, y1, x2, y2 = ax1, ay1, ax2, ay2
-    x3, y3, x4, y4 = bx1, by1, bx2, by2
-
-    d = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
-    if d == 0:
-        return None
-
-    t = ((x1 - x3) * (y3 - y4) - (y1 - y3) * (x3 - x4)) / d
-
-    u = (-((x1 - x2) * (y1 - y3) - (y1 - y2) * (x1 - x3))) / d
-
-    if 0 <= t <= 1 and 0 <= u <= 1:
-        return (x1 + t * (x2 - x1), y1 + t * (y2 - y1))
-    else:
-        return None
-
-
 def line_distance(x1, y1, x2, y2) -> float:
     return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
 
 
 def load_image(path, colorkey=(0, 0, 0), alpha=False, scale=1):
-    full_path = BASE_IMAGE_PATH + path
-    if alpha:
-        img = pygame.image.load(full_path).convert_alpha()
-    else:
-        img = pygame.image.load(full_path).convert()
-        img.set_colorkey(colorkey)
-
-    if scale != 1:
-        img = pygame.transform.scale(
-            img, (int(img.get_width() * scale), int(img.get_height() * scale))
-        )
-
-    return img
+    return assetcache.image(
+        BASE_IMAGE_PATH + path,
+        alpha=alpha,
+        scale=scale,
+        colorkey=None if alpha else colorkey,
+    )
 
 
 # load all images in a directory
 def load_images(path, colorkey=(0, 0, 0), alpha=False, scale=1):
-    images = []
-
-    for img_name in sorted(
-        os.listdir(BASE_IMAGE_PATH + path)
-    ):  # sorted is used for OS interoperability
-        images.append(load_image(path + "/" + img_name, colorkey, alpha, scale))
-
-    return images
+    return assetcache.images(
+        BASE_IMAGE_PATH + path,
+        alpha=alpha,
+        scale=scale,
+        colorkey=None if alpha else colorkey,
+    )
 
 
 # a method that will return the difference in radians between two angles
@@ -1,5 +1,6 @@
 import pygame
 import random
+import assetcache
 from scene import Scene
 from utils import *
 
@@ -43,6 +44,8 @@ class Card:
 
 
 class Solitaire(Scene):
+    sounds = ["click", "jsfxr-drop1", "jsxfr-select"]
+
     def __init__(self, game):
         super().__init__(game)
 
@@ -56,8 +59,9 @@ class Solitaire(Scene):
         self.standard_font_size = 40
         self.text_title = self.standard_text("Solitaire")
         self.standard_font_size = 20
-        self.text_easy = self.standard_text("Easy (draw 1)")
-        self.text_normal = self.standard_text("Normal (draw 3)")
+        # copies as the shared text surfaces get their alpha changed in draw
+        self.text_easy = self.standard_text("Easy (draw 1)").copy()
+        self.text_normal = self.standard_text("Normal (draw 3)").copy()
 
         # Game state
         self.deck = self.create_deck()
@@ -106,11 +110,9 @@ class Solitaire(Scene):
             3: "assets/cards/suit-spades.png"
         }
         for suit_num, filepath in suit_files.items():
-            img = pygame.image.load(filepath).convert_alpha()
-            self.suit_images[suit_num] = img
+            self.suit_images[suit_num] = assetcache.image(filepath, alpha=True)
             # Create smaller version for top-right corner
-            small_size = (img.get_width() // 2, img.get_height() // 2)
-            self.suit_images[(suit_num, 'small')] = pygame.transform.scale(img, small_size)
+            self.suit_images[(suit_num, 'small')] = assetcache.image(filepath, alpha=True, scale=0.5)
         
     def create_deck(self):
         """Create a standard 52-card deck"""
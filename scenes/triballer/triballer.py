@@ -2,6 +2,7 @@
 
 import pygame
 import random
+import assetcache
 from scene import Scene
 from .scripts.constants import (
     BUBBLE_RADIUS, BUBBLE_DIAMETER, GRID_COLS, GRID_MAX_ROWS,
@@ -20,6 +21,12 @@ from .scripts.shooter import Shooter
 class TriBaller(Scene):
     """Tri-Baller bubble shooter game scene."""
 
+    sounds = [
+        "jsfxr-drop2",
+        "level-up-bonus-sequence-1-186890",
+        "level-up-bonus-sequence-2-186891",
+    ]
+
     def __init__(self, game):
         super().__init__(game)
 
@@ -47,7 +54,7 @@ class TriBaller(Scene):
         self.standard_stroke_thickness = 1
 
         # Load background image
-        self.bg_image = pygame.image.load("assets/triballer/triballerbg.png").convert()
+        self.bg_image = assetcache.image("assets/triballer/triballerbg.png", alpha=False)
 
         # Initialize level
         self.start_new_game()
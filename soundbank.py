@@ -0,0 +1,112 @@
+# description: the game's sound effects, decoded the first time they're played
+# instead of all at startup. a scene can list the sounds it plays to have them
+# decoded on a background thread while it loads, and the least recently played
+# sounds are dropped when the decoded sounds outgrow a memory budget.
+
+import os
+import threading
+from collections import OrderedDict
+
+import pygame
+import settings
+
+SOUND_BUDGET = 4 * 1024 * 1024  # bytes of decoded samples to keep
+EXTENSIONS = (".wav", ".ogg", ".mp3")
+
+
+class SoundBank:
+    """Sound effects by name, used like the dictionary game.sfx used to be:
+    `name in game.sfx` checks the sound exists and `game.sfx[name]` decodes it
+    if it isn't already."""
+
+    def __init__(self, folder: str = "assets/sounds", budget: int = SOUND_BUDGET):
+        """Find the sounds in a folder without decoding any of them.
+
+        Args:
+            folder (str, optional): The folder to look in. Defaults to "assets/sounds".
+            budget (int, optional): Bytes of decoded sounds to keep. Defaults to SOUND_BUDGET.
+        """
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.paths: dict[str, str] = {}  # file by sound name, without the extension
+        self.sounds: OrderedDict[str, pygame.mixer.Sound] = OrderedDict()
+        self.sizes: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        for file in sorted(os.listdir(folder)):
+            if file.endswith(EXTENSIONS):
+                self.paths[file.split(".")[0]] = folder + "/" + file
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.paths
+
+    def __getitem__(self, name: str) -> pygame.mixer.Sound:
+        with self.lock:
+            sound = self.sounds.get(name)
+            if sound is not None:
+                self.hits += 1
+                self.sounds.move_to_end(name)
+                return sound
+
+        # decode outside the lock so a preload doesn't hold up a sound that's
+        # being played right now
+        sound = pygame.mixer.Sound(self.paths[name])
+
+        with self.lock:
+            self.misses += 1
+            # a preload may have beaten us to it
+            if name not in self.sounds:
+                self.sounds[name] = sound
+                self.sizes[name] = self.__size(sound)
+                self.__evict(keep=name)
+            return self.sounds[name]
+
+    def keys(self):
+        return self.paths.keys()
+
+    def __size(self, sound: pygame.mixer.Sound) -> int:
+        # the mixer keeps every sound as raw samples in its own format
+        frequency, size, channels = pygame.mixer.get_init()
+        return int(sound.get_length() * frequency) * channels * abs(size) // 8
+
+    def __evict(self, keep: str):
+        """Drop the least recently played sounds until we're under budget,
+        skipping any that are playing as freeing a sound stops it"""
+        total = sum(self.sizes.values())
+
+        for name in list(self.sounds):
+            if total <= self.budget:
+                break
+            if name == keep or self.sounds[name].get_num_channels():
+                continue
+
+            total -= self.sizes.pop(name)
+            del self.sounds[name]
+            self.evictions += 1
+
+    def preload(self, names: list[str]):
+        """Decode sounds on a background thread so they're ready when played.
+        Sounds that don't exist are skipped. The browser build has no threads,
+        there the sounds are left to decode when first played."""
+        names = [name for name in names if name in self.paths]
+        if not names or settings.WASM:
+            return
+
+        def load():
+            for name in names:
+                self[name]
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "available": len(self.paths),
+                "loaded": len(self.sounds),
+                "bytes": sum(self.sizes.values()),
+            }
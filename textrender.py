@@ -0,0 +1,123 @@
+# description: shared text rendering for the scenes and buttons. fonts are opened
+# once per (path, size) and rendered strings are kept in an lru cache, so text
+# drawn every frame only costs a dictionary lookup after the first time.
+
+import functools
+import threading
+from collections import OrderedDict
+
+import outline
+import pygame
+import settings
+
+FONT_CACHE_SIZE = 32
+TEXT_CACHE_SIZE = 512
+
+_texts: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+# scenes preloading in the background render text too, and a font can't render
+# on two threads at once
+_lock = threading.RLock()
+hits = 0
+misses = 0
+
+
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(path: str | None, size: int) -> pygame.font.Font:
+    """The font at path in the given size, None is pygame's default font"""
+    return pygame.font.Font(path, size)
+
+
+def render(
+    text: str,
+    color,
+    size: int,
+    font: str | None = None,
+    stroke: bool = False,
+    stroke_color=(0, 0, 0),
+    stroke_thickness: int = 1,
+) -> pygame.Surface:
+    """Render text, optionally with a stroke around it. The surface returned
+    is shared with every other caller rendering the same text, copy() it before
+    changing it (set_alpha, drawing on it and so on).
+
+    Args:
+        text (str): The text to render
+        color (tuple): The text color
+        size (int): The font size
+        font (str | None, optional): Path to a font file, "system-ui" for pygame's default font. Defaults to settings.FONT.
+        stroke (bool, optional): Draw a stroke around the text. Defaults to False.
+        stroke_color (tuple, optional): The stroke color. Defaults to (0, 0, 0).
+        stroke_thickness (int, optional): The stroke thickness in pixels. Defaults to 1.
+
+    Returns:
+        pygame.Surface: the rendered text
+    """
+    global hits, misses
+
+    if font is None:
+        font = "assets/fonts/" + settings.FONT
+
+    if font == "system-ui":
+        font = None
+
+    key = (
+        text,
+        tuple(color),
+        size,
+        font,
+        bool(stroke) and (tuple(stroke_color), stroke_thickness),
+    )
+
+    with _lock:
+        surface = _texts.get(key)
+        if surface is not None:
+            hits += 1
+            _texts.move_to_end(key)
+            return surface
+
+        misses += 1
+        if stroke:
+            surface = render_stroked(
+                text, color, size, font, stroke_color, stroke_thickness
+            )
+        else:
+            surface = get_font(font, size).render(text, 1, color)
+
+        _texts[key] = surface
+        if len(_texts) > TEXT_CACHE_SIZE:
+            _texts.popitem(last=False)
+
+        return surface
+
+
+def render_stroked(text, color, size, font, stroke_color, stroke_thickness):
+    surf_text = get_font(font, size).render(text, 1, color)
+    stroke = outline.silhouette(surf_text, stroke_color, stroke_thickness)
+
+    # create a transparent surface to draw the text and stroke on, keeping the
+    # extra stroke_thickness of space the old brute force stroke left
+    size = (
+        surf_text.get_width() + stroke_thickness * 3,
+        surf_text.get_height() + stroke_thickness * 3,
+    )
+    surface = pygame.Surface(size, pygame.SRCALPHA, 32).convert_alpha()
+
+    # the stroke, then the text on top of it
+    surface.blit(stroke, (0, 0))
+    surface.blit(surf_text, (stroke_thickness, stroke_thickness))
+
+    return surface
+
+
+def clear():
+    _texts.clear()
+    get_font.cache_clear()
+
+
+def stats() -> dict:
+    return {
+        "hits": hits,
+        "misses": misses,
+        "texts": len(_texts),
+        "fonts": get_font.cache_info().currsize,
+    }
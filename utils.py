@@ -4,6 +4,9 @@ from hashlib import md5
 import random
 import math
 import settings
+import assetcache
+import textrender
+import outline
 
 
 def distance_point_to_line(lx1, ly1, lx2, ly2, px, py):
@@ -41,8 +44,7 @@ def interpolate(in_value, in_min, in_max, out_min, out_max):
 
 # load a single image
 def load_tpng(assets_path) -> pygame.Surface:
-    img = pygame.image.load("assets/" + assets_path).convert_alpha()
-    return img
+    return assetcache.image("assets/" + assets_path, alpha=True)
 
 
 # load all images in a directory
@@ -116,40 +118,9 @@ class Button:  # todo remove this in favor of classes.button
         strokeColor=(0, 0, 0),
         strokeThickness=1,
     ):
-        if font is None:
-            font = "assets/fonts/" + settings.FONT
-
-        if font == "system-ui":
-            font = None
-
-        # if we aren't stroking return the text directly
-        if not stroke:
-            return pygame.font.Font(font, fontSize).render(text, 1, color)
-
-        # if we are stroking, render the text with the stroke
-        # first render the text without the stroke
-
-        # create a version of the text in the stroke color and blit it to the surface
-        surf_text = pygame.font.Font(font, fontSize).render(text, 1, color)
-        surf_text_stroke = pygame.font.Font(font, fontSize).render(text, 1, strokeColor)
-
-        # create a transparent surface to draw the text and stroke on
-        size = (
-            surf_text.get_width() + strokeThickness * 3,
-            surf_text.get_height() + strokeThickness * 3,
+        return textrender.render(
+            text, color, fontSize, font, stroke, strokeColor, strokeThickness
         )
-        surface = self.make_transparent_surface(size)
-
-        # blit the stroke text to the surface
-        for i in range(strokeThickness * 2 + 1):
-            for j in range(strokeThickness * 2 + 1):
-                surface.blit(surf_text_stroke, (i, j))
-
-        # blit the text on top of the stroke
-        surface.blit(surf_text, (strokeThickness, strokeThickness))
-
-        # return the surface
-        return surface
 
     def draw(self):
         action = False
@@ -199,14 +170,8 @@ class Button:  # todo remove this in favor of classes.button
 class SpriteSheet:
     def __init__(self, asset_path: str, colorkey: tuple = None):
         self.asset_path = "assets/" + asset_path
-        self.sheet = pygame.image.load(self.asset_path).convert_alpha()
-        if colorkey is not None:
-            if colorkey == -1:
-                colorkey = self.sheet.get_at((0, 0))
-
-            # check if color is a tuple now
-            if type(colorkey) is tuple:
-                self.sheet.set_colorkey(colorkey)
+        # a colorkey of -1 takes the top left pixel
+        self.sheet = assetcache.image(self.asset_path, alpha=True, colorkey=colorkey)
 
     def get_at(self, x, y, width, height):
         return self.sheet.subsurface(x, y, width, height)
@@ -357,19 +322,9 @@ class Seed:
 
 
 def blit_outline(source: pygame.Surface, target: pygame.Surface, dest: tuple):
-
-    mask = pygame.mask.from_surface(source)
-    mask.invert()
-    mask = mask.to_surface()
-    mask.set_colorkey((255, 255, 255))
-
-    x = dest[0]
-    y = dest[1]
-
-    target.blit(mask, (x - 1, y))
-    target.blit(mask, (x + 1, y))
-    target.blit(mask, (x, y - 1))
-    target.blit(mask, (x, y + 1))
+    # a black 1 pixel outline to the sides, above and below (not diagonal)
+    mask = outline.silhouette(source, (0, 0, 0), 1, square=False)
+    target.blit(mask, (dest[0] - 1, dest[1] - 1))
 
 
 # test our utilities if ran directly